@@ -4,5 +4,6 @@ API package for trail and weather data retrieval.
 
 from .trails_api import TrailsAPI
 from .weather_api import WeatherAPI
+from .weather_cache import WeatherCache
 
-__all__ = ['TrailsAPI', 'WeatherAPI'] 
\ No newline at end of file
+__all__ = ['TrailsAPI', 'WeatherAPI', 'WeatherCache'] 
\ No newline at end of file
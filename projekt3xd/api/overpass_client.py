@@ -0,0 +1,134 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from config import (OVERPASS_API, OVERPASS_MAX_CONCURRENCY, OVERPASS_MAX_RETRIES,
+                    OVERPASS_BACKOFF_SECONDS, OVERPASS_TIMEOUT_SECONDS)
+from api.overpass_stream import OverpassStreamParser, STREAM_CHUNK_SIZE
+
+# Kody HTTP, po których API Overpass warto odpytać ponownie (limit zapytań, przeciążenie)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class RegionResult:
+    """Wynik pobierania danych dla jednego regionu (lub dowolnego zadania)."""
+
+    def __init__(self, region: str):
+        self.region = region
+        self.trails: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return (f"RegionResult({self.region!r}, trails={len(self.trails)}, {status}, "
+                f"attempts={self.attempts}, elapsed={self.elapsed:.2f}s)")
+
+
+class OverpassFetcher:
+    """
+    Równoległe pobieranie zapytań Overpass przez współdzieloną sesję aiohttp.
+
+    Liczba jednoczesnych zapytań jest ograniczona semaforem, a odpowiedzi
+    429/5xx są ponawiane z wykładniczym opóźnieniem (z uwzględnieniem Retry-After).
+    """
+
+    def __init__(self, base_url: str = OVERPASS_API,
+                 max_concurrency: int = OVERPASS_MAX_CONCURRENCY,
+                 max_retries: int = OVERPASS_MAX_RETRIES,
+                 backoff_seconds: float = OVERPASS_BACKOFF_SECONDS,
+                 timeout_seconds: float = OVERPASS_TIMEOUT_SECONDS):
+        self.base_url = base_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Oblicza opóźnienie przed kolejną próbą."""
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        delay = self.backoff_seconds * (2 ** attempt)
+        # Losowy rozrzut zapobiega jednoczesnemu ponawianiu wszystkich regionów
+        return delay * (0.5 + random.random() / 2)
+
+    async def _fetch_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                         region: str, query: str,
+                         collector_factory: Callable[[str], Any]) -> RegionResult:
+        result = RegionResult(region)
+        started = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            retry_after = None
+            try:
+                async with semaphore:
+                    async with session.post(self.base_url, data={"data": query}) as response:
+                        if response.status in RETRY_STATUSES:
+                            retry_after = response.headers.get("Retry-After")
+                            result.error = f"HTTP {response.status}"
+                        else:
+                            response.raise_for_status()
+                            result.trails = await self._consume_stream(response, region,
+                                                                       collector_factory)
+                            result.error = None
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                result.error = str(e) or e.__class__.__name__
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES:
+                    break
+
+            if attempt < self.max_retries:
+                # Czekamy poza semaforem, żeby nie blokować innych regionów
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    async def _consume_stream(response: aiohttp.ClientResponse, region: str,
+                              collector_factory: Callable[[str], Any]) -> List[Dict[str, Any]]:
+        """Przekazuje elementy do kolektora w miarę odbierania odpowiedzi."""
+        parser = OverpassStreamParser()
+        collector = collector_factory(region)
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            for element in parser.feed(chunk):
+                collector.add(element)
+        for element in parser.close():
+            collector.add(element)
+        return collector.finish()
+
+    async def fetch_all_async(self, jobs: Dict[str, str],
+                              collector_factory: Callable[[str], Any]
+                              ) -> Dict[str, RegionResult]:
+        """
+        Pobiera wszystkie zapytania {region: zapytanie} równolegle.
+
+        collector_factory(region) musi zwracać obiekt z metodami add(element)
+        i finish() -> lista tras; odpowiedzi są parsowane strumieniowo.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(
+                self._fetch_one(session, semaphore, region, query, collector_factory)
+                for region, query in jobs.items()
+            ))
+        return {result.region: result for result in results}
+
+    def fetch_all(self, jobs: Dict[str, str],
+                  collector_factory: Callable[[str], Any]) -> Dict[str, RegionResult]:
+        """Synchroniczna wersja fetch_all_async (uruchamia własną pętlę zdarzeń)."""
+        return asyncio.run(self.fetch_all_async(jobs, collector_factory))
@@ -0,0 +1,125 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+_ELEMENTS_KEY = re.compile(r'"elements"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+_REMARK = re.compile(r'"remark"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Rozmiar fragmentu odczytywanego z odpowiedzi HTTP
+STREAM_CHUNK_SIZE = 64 * 1024
+# Błąd dekodowania bliżej końca bufora niż tyle znaków może oznaczać ucięty token
+# (najdłuższy: literał -Infinity albo sekwencja \uXXXX) - dalszy to błędny JSON
+_INCOMPLETE_WINDOW = 16
+
+
+class OverpassStreamParser:
+    """
+    Przyrostowy parser odpowiedzi JSON z API Overpass.
+
+    Dane podaje się kawałkami przez feed(); parser zwraca kompletne obiekty
+    z tablicy "elements", gdy tylko zostaną w całości odebrane. W pamięci
+    trzymany jest jedynie nieprzetworzony fragment bufora, więc zużycie
+    pamięci nie zależy od rozmiaru całej odpowiedzi. Niekompletny element
+    jest dekodowany ponownie dopiero, gdy bufor urośnie dwukrotnie (duże
+    relacje nie są parsowane od początku po każdym fragmencie), a błąd
+    składni daleko od końca bufora od razu zgłasza ValueError.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        # Nieprzetworzone fragmenty tekstu - łączone dopiero przed dekodowaniem
+        self._chunks: List[str] = []
+        self._size = 0
+        self._retry_size = 0
+        self._in_elements = False
+        self._done = False
+        self._tail = ""
+        self.remark: Optional[str] = None
+        self.element_count = 0
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Przyjmuje kolejny fragment odpowiedzi i zwraca gotowe elementy."""
+        text = self._text_decoder.decode(chunk)
+        if self._done:
+            self._tail += text
+            return []
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size < self._retry_size:
+            return []
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Kończy parsowanie i zwraca pozostałe elementy.
+
+        Zgłasza ValueError dla uciętej odpowiedzi oraz gdy Overpass dołączył
+        uwagę o błędzie wykonania (np. przekroczony limit czasu zapytania).
+        """
+        self._chunks.append(self._text_decoder.decode(b"", final=True))
+        elements = self._drain() if not self._done else []
+        if not self._done:
+            if not self._in_elements:
+                raise ValueError("Odpowiedź Overpass nie zawiera tablicy 'elements'")
+            raise ValueError("Niekompletna odpowiedź Overpass (ucięta tablica 'elements')")
+        match = _REMARK.search(self._tail)
+        if match:
+            self.remark = json.loads(f'"{match.group(1)}"')
+            if "error" in self.remark.lower():
+                raise ValueError(f"API Overpass zwróciło błąd: {self.remark}")
+        return elements
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        buffer = "".join(self._chunks)
+        if not self._in_elements:
+            match = _ELEMENTS_KEY.search(buffer)
+            if not match:
+                # Zachowujemy tylko końcówkę, w której może zaczynać się klucz "elements"
+                self._keep(buffer[-64:])
+                return []
+            self._in_elements = True
+            buffer = buffer[match.end():]
+
+        elements = []
+        position = 0
+        length = len(buffer)
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position >= length:
+                break
+            if buffer[position] == ']':
+                self._done = True
+                self._tail = buffer[position + 1:]
+                position = length
+                break
+            try:
+                element, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if e.pos < length - _INCOMPLETE_WINDOW and not e.msg.startswith("Unterminated string"):
+                    raise ValueError(f"Niepoprawny JSON w odpowiedzi Overpass: {e}") from e
+                # Element nie dotarł jeszcze w całości - kolejna próba po podwojeniu bufora
+                self._retry_size = 2 * (length - position)
+                break
+            elements.append(element)
+            position = end
+            self._retry_size = 0
+
+        # Jedno przycięcie bufora na fragment zamiast kopiowania po każdym elemencie
+        self._keep(buffer[position:])
+        self.element_count += len(elements)
+        return elements
+
+    def _keep(self, rest: str) -> None:
+        self._chunks = [rest] if rest else []
+        self._size = len(rest)
+
+
+def iter_overpass_elements(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Generator elementów Overpass z dowolnego strumienia bajtów."""
+    parser = OverpassStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,147 @@
+"""
+Lokalna atrapa zewnętrznych API (Open-Meteo i Overpass) do uruchamiania usługi bez sieci.
+
+    python -m api.stub_upstream --port 8900
+    P3XD_OPEN_METEO_API=http://127.0.0.1:8900/v1 \\
+    P3XD_OVERPASS_API=http://127.0.0.1:8900/api/interpreter python server.py
+
+Odpowiedzi są deterministyczne (zależą od współrzędnych, daty i nazwy miasta)
+i mają kształt odpowiedzi prawdziwych API, więc przechodzą przez zwykłe parsery.
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from aiohttp import web
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config import CITY_COORDINATES
+
+# Liczba tras generowanych dla jednego miasta w odpowiedzi Overpass
+STUB_TRAILS_PER_CITY = 50
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha1("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _daily(lat: float, lon: float, dates) -> dict:
+    """Dzienne zmienne Open-Meteo dla jednej lokalizacji."""
+    daily = {"time": [], "temperature_2m_max": [], "temperature_2m_min": [], "precipitation_sum": [],
+             "sunshine_duration": [], "cloudcover_mean": [], "windspeed_10m_max": [],
+             "winddirection_10m_dominant": []}
+    for date in dates:
+        rng = _rng(round(lat, 4), round(lon, 4), date)
+        temperature_min = round(rng.uniform(-5, 15), 1)
+        daily["time"].append(date)
+        daily["temperature_2m_min"].append(temperature_min)
+        daily["temperature_2m_max"].append(round(temperature_min + rng.uniform(2, 12), 1))
+        daily["precipitation_sum"].append(rng.choice([0.0, 0.0, 0.4, 2.5, 8.0]))
+        daily["sunshine_duration"].append(round(rng.uniform(0, 12) * 3600))
+        daily["cloudcover_mean"].append(rng.randint(0, 100))
+        daily["windspeed_10m_max"].append(round(rng.uniform(2, 40), 1))
+        daily["winddirection_10m_dominant"].append(rng.randint(0, 359))
+    return daily
+
+
+async def weather(request: web.Request) -> web.Response:
+    """/v1/forecast i /v1/archive: jedna lub wiele lokalizacji (współrzędne po przecinku)."""
+    try:
+        latitudes = [float(value) for value in request.query["latitude"].split(",")]
+        longitudes = [float(value) for value in request.query["longitude"].split(",")]
+        start = datetime.strptime(request.query["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(request.query["end_date"], "%Y-%m-%d")
+    except (KeyError, ValueError) as e:
+        return web.json_response({"error": True, "reason": str(e)}, status=400)
+    dates = [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range((end - start).days + 1)]
+    locations = [{"latitude": lat, "longitude": lon, "daily": _daily(lat, lon, dates)}
+                 for lat, lon in zip(latitudes, longitudes)]
+    return web.json_response(locations[0] if len(locations) == 1 else locations)
+
+
+def city_elements(city: str) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """
+    Drogi (z wersją i znacznikiem czasu) i węzły miasta; identyfikatory są unikalne między miastami.
+    """
+    center = CITY_COORDINATES.get(city, {"lat": 52.0, "lon": 19.0})
+    offset = (list(CITY_COORDINATES).index(city) + 1 if city in CITY_COORDINATES else 0) * 1_000_000
+    rng = _rng("overpass", city)
+
+    ways, nodes = [], {}
+    node_id = offset
+    for number in range(STUB_TRAILS_PER_CITY):
+        lat = center["lat"] + rng.uniform(-0.2, 0.2)
+        lon = center["lon"] + rng.uniform(-0.3, 0.3)
+        node_ids = []
+        for _ in range(rng.randint(2, 6)):
+            lat += rng.uniform(-0.01, 0.01)
+            lon += rng.uniform(-0.01, 0.01)
+            node_id += 1
+            nodes[node_id] = {"type": "node", "id": node_id, "lat": round(lat, 7), "lon": round(lon, 7)}
+            node_ids.append(node_id)
+        tags = {"name": f"Szlak testowy {city} {number + 1}", "route": "hiking",
+                rng.choice(["leisure", "natural", "waterway", "tourism"]): "yes"}
+        if rng.random() < 0.5:
+            tags["distance"] = f"{rng.uniform(1, 25):.1f} km"
+        ways.append({"type": "way", "id": offset + 500_000 + number, "nodes": node_ids, "tags": tags,
+                     "version": 1, "timestamp": "2024-01-01T00:00:00Z"})
+    return ways, nodes
+
+
+async def overpass(request: web.Request) -> web.Response:
+    """
+    /api/interpreter: nazwane drogi z węzłami w pobliżu miasta z zapytania.
+
+    Obsługuje zapytania o obszar miasta (filtr bbox jest pomijany - zwracane są
+    wszystkie drogi miasta) i o identyfikatory (`way(id:...)`). Węzły są
+    dołączane tylko przy rekurencji (`>;`), a wersje tylko przy `out meta`.
+    """
+    query = (await request.post()).get("data") or request.query.get("data", "")
+    match = re.search(r'area\["name"="([^"]+)"\]', query)
+    ids = re.search(r'way\(id:([\d,]+)\)', query)
+    if ids:
+        wanted = {int(value) for value in ids.group(1).split(",")}
+        ways, nodes = [], {}
+        for city in CITY_COORDINATES:
+            city_ways, city_nodes = city_elements(city)
+            ways += [way for way in city_ways if way["id"] in wanted]
+            nodes.update(city_nodes)
+    else:
+        ways, nodes = city_elements(match.group(1) if match else "")
+
+    meta = "out meta" in query
+    elements = [way if meta else {key: value for key, value in way.items() if key not in ("version", "timestamp")}
+                for way in ways]
+    if ">;" in query:
+        elements += [nodes[node_id] for way in ways for node_id in way["nodes"]]
+    return web.json_response({"version": 0.6, "generator": "projekt3xd stub", "elements": elements})
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/v1/forecast", weather)
+    app.router.add_get("/v1/archive", weather)
+    app.router.add_route("*", "/api/interpreter", overpass)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+    print(f"P3XD_OPEN_METEO_API=http://{args.host}:{args.port}/v1")
+    print(f"P3XD_OVERPASS_API=http://{args.host}:{args.port}/api/interpreter")
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.geo import haversine_km
+
+# Liczba odwołań do węzłów przetwarzanych w jednej wektorowej partii
+GEOMETRY_BATCH_NODES = 1 << 20
+
+
+class NodeIndex:
+    """
+    Indeks węzeł OSM -> (lat, lon) budowany w jednym przebiegu odpowiedzi.
+
+    Węzły są dopisywane do zwartych tablic (24 bajty na węzeł), a po
+    zakończeniu strumienia sortowane raz, żeby wyszukiwać je przez searchsorted.
+    """
+
+    def __init__(self):
+        self._ids = array('q')
+        self._lats = array('d')
+        self._lons = array('d')
+        self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, node_id: int, lat: float, lon: float) -> None:
+        self._ids.append(node_id)
+        self._lats.append(lat)
+        self._lons.append(lon)
+        self._sorted = None
+
+    def _build(self):
+        if self._sorted is None:
+            ids = np.frombuffer(self._ids, dtype=np.int64) if len(self._ids) else np.empty(0, np.int64)
+            lats = np.frombuffer(self._lats, dtype=np.float64) if len(self._lats) else np.empty(0)
+            lons = np.frombuffer(self._lons, dtype=np.float64) if len(self._lons) else np.empty(0)
+            order = np.argsort(ids)
+            self._sorted = (ids[order], lats[order], lons[order])
+        return self._sorted
+
+    def lookup(self, node_ids: np.ndarray):
+        """Zwraca (lat, lon, found) dla tablicy identyfikatorów węzłów."""
+        ids, lats, lons = self._build()
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if not len(ids):
+            nan = np.full(node_ids.shape, np.nan)
+            return nan, nan.copy(), np.zeros(node_ids.shape, dtype=bool)
+        # Wyszukiwanie posortowanych kluczy jest kilkukrotnie szybsze (lepsza lokalność pamięci)
+        query_order = np.argsort(node_ids)
+        positions = np.empty(node_ids.shape, dtype=np.int64)
+        positions[query_order] = np.searchsorted(ids, node_ids[query_order])
+        np.minimum(positions, len(ids) - 1, out=positions)
+        found = ids[positions] == node_ids
+        lat = np.where(found, lats[positions], np.nan)
+        lon = np.where(found, lons[positions], np.nan)
+        return lat, lon, found
+
+
+class WayNodes:
+    """Listy węzłów dróg zapisane w jednej płaskiej tablicy z przesunięciami."""
+
+    def __init__(self):
+        self._nodes = array('q')
+        self._spans: Dict[int, tuple] = {}
+
+    def __contains__(self, way_id: int) -> bool:
+        return way_id in self._spans
+
+    def add(self, way_id: int, node_ids: Sequence[int]) -> None:
+        start = len(self._nodes)
+        self._nodes.extend(node_ids)
+        self._spans[way_id] = (start, len(self._nodes))
+
+    def get(self, way_id: int) -> Optional[np.ndarray]:
+        span = self._spans.get(way_id)
+        if span is None:
+            return None
+        return np.frombuffer(self._nodes[span[0]:span[1]], dtype=np.int64)
+
+
+def _resolve_batch(trail_ways: List[List[np.ndarray]], offset: int, nodes: NodeIndex,
+                   geometries: Dict[str, np.ndarray]) -> None:
+    pieces = []
+    way_sizes = []
+    way_trail = []
+    for trail_position, ways in enumerate(trail_ways, offset):
+        for way in ways:
+            if way is not None and len(way):
+                pieces.append(way)
+                way_sizes.append(len(way))
+                way_trail.append(trail_position)
+    if not pieces:
+        return
+
+    node_ids = np.concatenate(pieces)
+    way_sizes = np.asarray(way_sizes, dtype=np.int64)
+    node_way = np.repeat(np.arange(len(way_sizes)), way_sizes)
+    node_trail = np.asarray(way_trail, dtype=np.int64)[node_way]
+    lat, lon, found = nodes.lookup(node_ids)
+
+    # Odcinek istnieje tylko między sąsiednimi, rozwiązanymi węzłami tej samej drogi
+    segment = (node_way[1:] == node_way[:-1]) & found[1:] & found[:-1]
+    lengths = haversine_km(lat[:-1][segment], lon[:-1][segment], lat[1:][segment], lon[1:][segment])
+    size = len(geometries["length_km"])
+    geometries["length_km"] += np.bincount(node_trail[:-1][segment], weights=lengths, minlength=size)
+    geometries["resolved_nodes"] += np.bincount(node_trail[found], minlength=size)
+
+    # Pierwszy rozwiązany węzeł trasy służy jako jej przybliżone położenie
+    found_positions = np.flatnonzero(found)
+    first_trails, first_index = np.unique(node_trail[found_positions], return_index=True)
+    first_positions = found_positions[first_index]
+    geometries["lat"][first_trails] = lat[first_positions]
+    geometries["lon"][first_trails] = lon[first_positions]
+
+
+def resolve_geometries(trail_ways: List[List[np.ndarray]], nodes: NodeIndex,
+                       batch_nodes: int = GEOMETRY_BATCH_NODES) -> Dict[str, np.ndarray]:
+    """
+    Rozwiązuje geometrię wielu tras naraz i liczy ich długości.
+
+    trail_ways[i] to lista tablic identyfikatorów węzłów kolejnych dróg trasy i.
+    Odcinki są liczone wektorowo (haversine) w partiach po ok. batch_nodes
+    węzłów, co ogranicza rozmiar tablic pośrednich; odcinki między różnymi
+    drogami nie są łączone.
+    Zwraca tablice kolumnowe: length_km, lat, lon (pierwszy rozwiązany węzeł,
+    NaN gdy brak) oraz resolved_nodes - po jednej pozycji na trasę.
+    """
+    trail_count = len(trail_ways)
+    geometries = {
+        "length_km": np.zeros(trail_count),
+        "lat": np.full(trail_count, np.nan),
+        "lon": np.full(trail_count, np.nan),
+        "resolved_nodes": np.zeros(trail_count, dtype=np.int64),
+    }
+    start = 0
+    batch_size = 0
+    for position, ways in enumerate(trail_ways):
+        batch_size += sum(len(way) for way in ways if way is not None)
+        if batch_size >= batch_nodes:
+            _resolve_batch(trail_ways[start:position + 1], start, nodes, geometries)
+            start = position + 1
+            batch_size = 0
+    if start < trail_count:
+        _resolve_batch(trail_ways[start:], start, nodes, geometries)
+    return geometries
+
+
+def geometry_row(geometries: Dict[str, np.ndarray], position: int) -> Dict[str, Any]:
+    """Geometria jednej trasy w postaci oczekiwanej przez _process_trail_element."""
+    lat = geometries["lat"][position]
+    lon = geometries["lon"][position]
+    coordinates = None if np.isnan(lat) else {"lat": float(lat), "lon": float(lon)}
+    return {
+        "length_km": float(geometries["length_km"][position]),
+        "coordinates": coordinates,
+        "resolved_nodes": int(geometries["resolved_nodes"][position]),
+    }
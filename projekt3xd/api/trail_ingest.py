@@ -0,0 +1,267 @@
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from config import (CITY_COORDINATES, OVERPASS_IDS_PER_QUERY, TRAILS_FULL_REFRESH_DAYS,
+                    TRAILS_INGEST_STATE_FILE, TRAILS_REGION_RADIUS_KM, TRAILS_TILE_KM)
+from api.overpass_client import RegionResult
+from utils.profiling import span, timed
+from utils.spatial_index import KM_PER_DEGREE
+
+# Wersja formatu pliku stanu - plik w innej wersji jest pomijany (pełne pobranie)
+STATE_VERSION = 1
+# Typy elementów OSM, z których powstają trasy
+ELEMENT_TYPES = ("relation", "way")
+
+# Prostokąt (south, west, north, east) w stopniach
+BBox = Tuple[float, float, float, float]
+
+
+def element_key(element_type: str, element_id: Any) -> str:
+    """Klucz elementu OSM w pliku stanu, np. "way/123" (identyfikatory relacji i dróg mogą się powtarzać)."""
+    return f"{element_type}/{element_id}"
+
+
+def region_tiles(lat: float, lon: float, radius_km: float = TRAILS_REGION_RADIUS_KM,
+                 tile_km: float = TRAILS_TILE_KM) -> Dict[str, BBox]:
+    """
+    Kafelki pokrywające kwadrat o boku 2 * radius_km wokół punktu.
+
+    Zwraca {klucz: (south, west, north, east)}; klucz zawiera rozmiar kafelka
+    i jego południowo-zachodni narożnik, więc zmiana ustawień daje nowe klucze.
+    """
+    count = max(1, math.ceil(2 * radius_km / tile_km))
+    lat_step = tile_km / KM_PER_DEGREE
+    lon_step = tile_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    south = lat - count * lat_step / 2
+    west = lon - count * lon_step / 2
+    tiles = {}
+    for row in range(count):
+        for column in range(count):
+            bbox = (south + row * lat_step, west + column * lon_step,
+                    south + (row + 1) * lat_step, west + (column + 1) * lon_step)
+            tiles[f"{tile_km:g}km:{bbox[0]:.4f},{bbox[1]:.4f}"] = bbox
+    return tiles
+
+
+def _job(*parts: Any) -> str:
+    # Klucz zadania pobierania: region|kafelek albo region|typ|numer części
+    return "|".join(str(part) for part in parts)
+
+
+class VersionCollector:
+    """Kolektor odpowiedzi `out meta`: (klucz, wersja, znacznik czasu) nazwanych relacji i dróg."""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.items: List[Tuple[str, Any, Any]] = []
+
+    def add(self, element: Dict[str, Any]) -> None:
+        if element.get("type") in ELEMENT_TYPES and (element.get("tags") or {}).get("name"):
+            self.items.append((element_key(element["type"], element.get("id")),
+                               element.get("version"), element.get("timestamp")))
+
+    def finish(self) -> List[Tuple[str, Any, Any]]:
+        return self.items
+
+
+class TrailIngest:
+    """
+    Przyrostowe pobieranie tras z API Overpass.
+
+    Region (kwadrat wokół współrzędnych z CITY_COORDINATES) jest dzielony
+    na kafelki, a każdy kafelek to osobne zapytanie ponawiane niezależnie
+    przez OverpassFetcher. Odświeżenie ma dwa etapy:
+
+    1. Sprawdzenie zmian: dla każdego kafelka pobierane są tylko nazwane
+       relacje i drogi z wersją i znacznikiem czasu (out meta, bez węzłów).
+    2. Pobranie pełnych danych (z geometrią) wyłącznie elementów nowych
+       lub zmienionych względem pliku stanu - zapytaniami po identyfikatorach.
+
+    Plik stanu (TRAILS_INGEST_STATE_FILE) przechowuje dla każdego regionu
+    wersję, znacznik czasu i gotowy rekord trasy każdego elementu oraz listę
+    elementów każdego kafelka. Odświeżenie niezmienionego regionu to więc
+    tylko etap 1. Elementy, których nie zwrócił żaden kafelek, są usuwane
+    (chyba że któryś kafelek bez zapisanej zawartości się nie pobrał).
+    Przesunięcie węzła nie zmienia wersji drogi, dlatego co
+    TRAILS_FULL_REFRESH_DAYS wszystkie elementy są przetwarzane od nowa.
+    """
+
+    def __init__(self, api, state_file: str = TRAILS_INGEST_STATE_FILE,
+                 radius_km: float = TRAILS_REGION_RADIUS_KM, tile_km: float = TRAILS_TILE_KM,
+                 ids_per_query: int = OVERPASS_IDS_PER_QUERY,
+                 full_refresh_days: float = TRAILS_FULL_REFRESH_DAYS):
+        self.api = api
+        self.state_file = state_file
+        self.radius_km = radius_km
+        self.tile_km = tile_km
+        self.ids_per_query = max(1, ids_per_query)
+        self.full_refresh_days = full_refresh_days
+
+    def _load_state(self) -> Dict[str, Any]:
+        state = None
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Błąd podczas wczytywania stanu pobierania tras: {e}")
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            state = {"version": STATE_VERSION, "regions": {}}
+        return state
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        """Atomowy zapis pliku stanu (plik tymczasowy + rename)."""
+        directory = os.path.dirname(self.state_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_file)
+
+    def _full_refresh_due(self, region_state: Dict[str, Any]) -> bool:
+        try:
+            last = datetime.fromisoformat(region_state["full_refresh_at"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now() - last >= timedelta(days=self.full_refresh_days)
+
+    @staticmethod
+    def _diff(region: str, region_state: Dict[str, Any], tiles: Dict[str, BBox],
+              checked: Dict[str, RegionResult], result: RegionResult, full: bool) -> Dict[str, Any]:
+        """Porównuje wersje z kafelków ze stanem; zwraca plan odświeżenia regionu."""
+        previous_tiles = region_state.get("tiles", {})
+        elements = region_state.get("elements", {})
+        seen: Dict[str, List[Any]] = {}
+        tile_keys: Dict[str, List[str]] = {}
+        complete = True
+        failed = 0
+        for tile in tiles:
+            tile_result = checked[_job(region, tile)]
+            result.attempts += tile_result.attempts
+            if tile_result.ok:
+                for key, version, timestamp in tile_result.trails:
+                    seen[key] = [version, timestamp]
+                tile_keys[tile] = sorted({key for key, _, _ in tile_result.trails})
+                continue
+
+            failed += 1
+            if result.error is None:
+                result.error = f"kafelek {tile}: {tile_result.error}"
+            previous = previous_tiles.get(tile)
+            if previous is None:
+                # Nie wiadomo, co było w kafelku - w tym przebiegu nic nie jest usuwane
+                complete = False
+                continue
+            # Elementy kafelka, którego nie udało się sprawdzić, zostają bez zmian
+            tile_keys[tile] = previous
+            for key in previous:
+                if key in elements and key not in seen:
+                    seen[key] = [elements[key].get("version"), elements[key].get("timestamp")]
+
+        changed = [key for key, meta in seen.items()
+                   if full or meta[0] is None or key not in elements
+                   or [elements[key].get("version"), elements[key].get("timestamp")] != meta]
+        removed = [key for key in elements if key not in seen] if complete else []
+        return {"seen": seen, "tiles": tile_keys, "changed": changed, "removed": removed, "failed": failed}
+
+    @timed("ingest.refresh")
+    def refresh(self, regions: Iterable[str], full: bool = False) -> Dict[str, RegionResult]:
+        """
+        Odświeża trasy regionów; `full=True` przetwarza wszystkie elementy od nowa.
+
+        Zwraca wynik dla każdego regionu (jak TrailsAPI.get_hiking_trails_for_regions)
+        z kompletną listą tras regionu; błąd któregokolwiek zapytania regionu
+        jest zapisany w `error`, a elementy, których nie udało się pobrać,
+        zostaną sprawdzone ponownie przy następnym odświeżeniu.
+        """
+        started = time.perf_counter()
+        state = self._load_state()
+        results: Dict[str, RegionResult] = {}
+        tiles: Dict[str, Dict[str, BBox]] = {}
+        for region in regions:
+            results[region] = RegionResult(region)
+            coordinates = CITY_COORDINATES.get(region)
+            if coordinates is None:
+                results[region].error = f"Brak współrzędnych dla regionu {region}"
+                continue
+            tiles[region] = region_tiles(coordinates["lat"], coordinates["lon"], self.radius_km, self.tile_km)
+
+        jobs = {_job(region, tile): self.api.build_tile_query(region, bbox)
+                for region, region_tiles_ in tiles.items() for tile, bbox in region_tiles_.items()}
+        print(f"\nSprawdzanie zmian tras: {len(tiles)} regionów, {len(jobs)} kafelków "
+              f"(maks. {self.api.fetcher.max_concurrency} naraz)")
+        with span("ingest.diff_check"):
+            checked = self.api.fetcher.fetch_all(jobs, VersionCollector) if jobs else {}
+
+        plans = {}
+        downloads: Dict[str, Tuple[str, str, List[int]]] = {}
+        for region, region_tiles_ in tiles.items():
+            region_state = state["regions"].setdefault(region, {})
+            region_full = full or self._full_refresh_due(region_state)
+            plan = plans[region] = self._diff(region, region_state, region_tiles_, checked,
+                                              results[region], region_full)
+            plan["full"] = region_full
+            for element_type in ELEMENT_TYPES:
+                prefix = f"{element_type}/"
+                ids = sorted(int(key[len(prefix):]) for key in plan["changed"] if key.startswith(prefix))
+                for part in range(0, len(ids), self.ids_per_query):
+                    downloads[_job(region, element_type, part // self.ids_per_query)] = (
+                        region, element_type, ids[part:part + self.ids_per_query])
+
+        downloaded = {}
+        if downloads:
+            jobs = {job: self.api.build_ids_query(element_type, ids)
+                    for job, (_, element_type, ids) in downloads.items()}
+            print(f"Pobieranie {sum(len(ids) for _, _, ids in downloads.values())} nowych lub zmienionych "
+                  f"elementów ({len(jobs)} zapytań)")
+            with span("ingest.download"):
+                downloaded = self.api.fetcher.fetch_all(
+                    jobs, lambda job: self.api._new_collector(downloads[job][0]))
+
+        for job, (region, element_type, ids) in downloads.items():
+            job_result = downloaded[job]
+            result = results[region]
+            result.attempts += job_result.attempts
+            if not job_result.ok:
+                if result.error is None:
+                    result.error = f"pobieranie elementów ({element_type}): {job_result.error}"
+                continue
+            by_id = {trail["id"]: trail for trail in job_result.trails}
+            elements = state["regions"][region].setdefault("elements", {})
+            seen = plans[region]["seen"]
+            for element_id in ids:
+                key = element_key(element_type, element_id)
+                version, timestamp = seen[key]
+                # Element bez trasy (np. bez długości) też jest zapamiętywany, żeby go nie pobierać ponownie
+                elements[key] = {"version": version, "timestamp": timestamp,
+                                 "trail": by_id.get(str(element_id))}
+
+        for region, plan in plans.items():
+            region_state = state["regions"][region]
+            elements = region_state.setdefault("elements", {})
+            for key in plan["removed"]:
+                del elements[key]
+            region_state["tiles"] = plan["tiles"]
+            result = results[region]
+            if plan["full"] and result.ok:
+                region_state["full_refresh_at"] = datetime.now().isoformat(timespec='seconds')
+            result.trails = [dict(entry["trail"]) for entry in elements.values() if entry.get("trail")]
+            result.elapsed = time.perf_counter() - started
+            print(f"{region}: kafelków {len(tiles[region])} (błędy: {plan['failed']}), "
+                  f"elementów {len(plan['seen'])}, nowe lub zmienione: {len(plan['changed'])}, "
+                  f"usunięte: {len(plan['removed'])}, tras: {len(result.trails)}")
+
+        try:
+            self._save_state(state)
+        except OSError as e:
+            # Bez zapisu stanu następne odświeżenie pobierze zmienione elementy jeszcze raz
+            print(f"Błąd podczas zapisywania stanu pobierania tras: {e}")
+        return results
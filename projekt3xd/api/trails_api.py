@@ -1,14 +1,97 @@
 import requests
 import re
+from array import array
 import os
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from functools import reduce
-from config import OVERPASS_API, OVERPASS_QUERY_TEMPLATE
+from config import OVERPASS_API, OVERPASS_QUERY_TEMPLATE, OVERPASS_QUERY_TIMEOUT
+from api.overpass_client import OverpassFetcher, RegionResult
+from api.overpass_stream import iter_overpass_elements, STREAM_CHUNK_SIZE
+from api.trail_geometry import NodeIndex, WayNodes, resolve_geometries, geometry_row
+from utils.profiling import is_verbose, timed
+
+# Tagi wybierające kandydatów na trasy (relacje i drogi): trasy piesze, parki,
+# tereny naturalne, atrakcje turystyczne, cieki wodne i wybrzeże, miejsca historyczne
+TRAIL_SELECTORS = (
+    ("route", "hiking|foot|walking|running"),
+    ("leisure", "park|nature_reserve|garden"),
+    ("natural", "wood|forest|park|heath|grassland|scrub"),
+    ("tourism", "attraction|viewpoint|picnic_site"),
+    ("waterway", "river|stream|canal"),
+    ("natural", "coastline|beach"),
+    ("historic", "monument|memorial|castle|ruins"),
+)
+
+
+class TrailCollector:
+    """
+    Zbiera trasy z elementów Overpass przekazywanych po jednym.
+
+    Elementy z nazwą (out body) są buforowane jako kandydaci, a węzły i drogi
+    z sekcji out skel trafiają do zwartych indeksów. W finish() geometria
+    wszystkich kandydatów jest odtwarzana naraz, więc trasy bez tagu długości
+    dostają długość policzoną z rzeczywistego przebiegu.
+    """
+
+    def __init__(self, api: "TrailsAPI", city: str):
+        self.api = api
+        self.city = city
+        self.candidates: List[tuple] = []
+        self.nodes = NodeIndex()
+        self.way_nodes = WayNodes()
+        self._wanted_ways = set()
+
+    def _add_way_nodes(self, element: Dict[str, Any]) -> None:
+        node_ids = element.get("nodes")
+        if node_ids and isinstance(node_ids[0], int) and element.get("id") not in self.way_nodes:
+            self.way_nodes.add(element["id"], node_ids)
+
+    def add(self, element: Dict[str, Any]) -> None:
+        element_type = element.get("type")
+        if element_type == "node":
+            if "lat" in element and "lon" in element:
+                self.nodes.add(element["id"], element["lat"], element["lon"])
+            return
+        if element_type not in ("relation", "way"):
+            return
+
+        tags = element.get("tags")
+        if tags and tags.get("name"):
+            if element_type == "relation":
+                way_ids = array('q', (member["ref"] for member in element.get("members", ())
+                                      if member.get("type") == "way" and isinstance(member.get("ref"), int)))
+                self._wanted_ways.update(way_ids)
+            else:
+                self._add_way_nodes(element)
+                way_ids = array('q', [element["id"]]) if isinstance(element.get("id"), int) else array('q')
+            # Kandydat bez list węzłów i członków - te trzymamy w zwartych indeksach
+            slim = {key: value for key, value in element.items() if key not in ("nodes", "members")}
+            self.candidates.append((slim, way_ids))
+        elif element_type == "way" and element.get("id") in self._wanted_ways:
+            # Drogi bez nazwy zapamiętujemy tylko, jeśli należą do którejś z relacji
+            self._add_way_nodes(element)
+
+    @timed("overpass.build_trails")
+    def finish(self) -> List[Dict[str, Any]]:
+        trail_ways = [[self.way_nodes.get(way_id) for way_id in way_ids]
+                      for _, way_ids in self.candidates]
+        geometries = resolve_geometries(trail_ways, self.nodes)
+        del trail_ways
+
+        trails = []
+        for position, (element, _) in enumerate(self.candidates):
+            geometry = geometry_row(geometries, position)
+            trail = self.api._process_trail_element(element, self.city, geometry)
+            if trail:
+                trails.append(trail)
+        return trails
+
 
 class TrailsAPI:
-    def __init__(self):
-        self.base_url = OVERPASS_API
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or OVERPASS_API
+        self.fetcher = OverpassFetcher(self.base_url)
         self.data_dir = "api"
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
@@ -95,80 +178,111 @@ class TrailsAPI:
         max_difficulty = reduce(lambda x, y: max(x, y), components)
         return max(1, min(3, max_difficulty))
 
-    def get_hiking_trails(self, city: str) -> List[Dict[str, Any]]:
-        """Pobiera szlaki turystyczne dla miasta używając API Overpass."""
-        print(f"\nPróba pobrania tras dla miasta: {city}")
+    def _selection(self, spatial_filter: str) -> str:
+        """Suma zapytań o relacje i drogi z TRAIL_SELECTORS ograniczonych filtrem przestrzennym."""
+        return "\n".join(f'          {kind}["{key}"~"{values}"]{spatial_filter};'
+                         for key, values in TRAIL_SELECTORS for kind in ("relation", "way"))
 
-        # Expanded Overpass query to find more trails
-        query = f"""
-        [out:json][timeout:25];
+    def _build_query(self, city: str) -> str:
+        """Buduje zapytanie Overpass wyszukujące trasy w granicach miasta."""
+        return f"""
+        [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
         area["name"="{city}"]["boundary"="administrative"]->.searchArea;
         (
-          // Main hiking and walking routes
-          relation["route"~"hiking|foot|walking|running"](area.searchArea);
-          way["route"~"hiking|foot|walking|running"](area.searchArea);
-          
-          // Parks and nature reserves
-          relation["leisure"~"park|nature_reserve|garden"](area.searchArea);
-          way["leisure"~"park|nature_reserve|garden"](area.searchArea);
-          
-          // Natural areas
-          relation["natural"~"wood|forest|park|heath|grassland|scrub"](area.searchArea);
-          way["natural"~"wood|forest|park|heath|grassland|scrub"](area.searchArea);
-          
-          // Tourist attractions
-          relation["tourism"~"attraction|viewpoint|picnic_site"](area.searchArea);
-          way["tourism"~"attraction|viewpoint|picnic_site"](area.searchArea);
-          
-          // Waterways and coastlines
-          relation["waterway"~"river|stream|canal"](area.searchArea);
-          way["waterway"~"river|stream|canal"](area.searchArea);
-          relation["natural"~"coastline|beach"](area.searchArea);
-          way["natural"~"coastline|beach"](area.searchArea);
-          
-          // Historical and cultural sites
-          relation["historic"~"monument|memorial|castle|ruins"](area.searchArea);
-          way["historic"~"monument|memorial|castle|ruins"](area.searchArea);
+{self._selection("(area.searchArea)")}
         );
         out body;
         >;
         out skel qt;
         """
 
+    def build_tile_query(self, city: str, bbox: Tuple[float, float, float, float]) -> str:
+        """
+        Zapytanie o kandydatów na trasy miasta w prostokącie bbox = (south, west, north, east).
+
+        Zwraca same relacje i drogi z tagami oraz wersją i znacznikiem czasu
+        (out meta), bez węzłów - służy do sprawdzenia, co się zmieniło.
+        """
+        south, west, north, east = bbox
+        return f"""
+        [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
+        area["name"="{city}"]["boundary"="administrative"]->.searchArea;
+        (
+{self._selection(f"(area.searchArea)({south:.6f},{west:.6f},{north:.6f},{east:.6f})")}
+        );
+        out meta;
+        """
+
+    def build_ids_query(self, element_type: str, ids: Iterable[int]) -> str:
+        """Pełne dane (z geometrią) wybranych relacji lub dróg - jak w _build_query."""
+        return f"""
+        [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
+        {element_type}(id:{",".join(str(element_id) for element_id in ids)});
+        out body;
+        >;
+        out skel qt;
+        """
+
+    def _new_collector(self, city: str) -> TrailCollector:
+        return TrailCollector(self, city)
+
+    def _parse_trails(self, elements: Iterable[Dict[str, Any]], city: str) -> List[Dict[str, Any]]:
+        """Zamienia elementy odpowiedzi API Overpass na listę tras."""
+        collector = self._new_collector(city)
+        for element in elements:
+            collector.add(element)
+        return collector.finish()
+
+    @timed("overpass.fetch")
+    def get_hiking_trails(self, city: str) -> List[Dict[str, Any]]:
+        """Pobiera szlaki turystyczne dla miasta używając API Overpass."""
+        print(f"\nPróba pobrania tras dla miasta: {city}")
+        query = self._build_query(city)
+
         try:
             print(f"Wysyłanie zapytania do API Overpass dla {city}")
-            response = requests.post(self.base_url, data={"data": query})
-            response.raise_for_status()
-            data = response.json()
-            print(f"Otrzymano odpowiedź z API dla {city}")
-
-            # Use map to process all elements
-            trails = list(map(lambda element: self._process_trail_element(element, city), 
-                            filter(lambda e: e.get("type") in ["relation", "way"], 
-                                  data.get("elements", []))))
-
-            # Filter out None values and empty trails
-            trails = list(filter(None, trails))
-            
+            with requests.post(self.base_url, data={"data": query}, stream=True) as response:
+                response.raise_for_status()
+                print(f"Otrzymano odpowiedź z API dla {city}")
+                # Odpowiedź jest parsowana strumieniowo, bez wczytywania całości do pamięci
+                elements = iter_overpass_elements(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+                trails = self._parse_trails(elements, city)
             print(f"Znaleziono łącznie {len(trails)} tras dla {city}")
             
-            # Save trails to file
-            file_path = os.path.join(self.data_dir, "trails_data.json")
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(trails, f, ensure_ascii=False, indent=2)
-                print(f"Zapisano dane o szlakach do pliku {file_path}")
-            except Exception as e:
-                print(f"Błąd podczas zapisywania danych o szlakach: {e}")
-            
             return trails
 
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             print(f"Błąd podczas pobierania danych dla {city}: {e}")
             return []
 
-    def _process_trail_element(self, element: Dict[str, Any], city: str) -> Dict[str, Any]:
-        """Przetwarza pojedynczy element szlaku."""
+    @timed("overpass.fetch_regions")
+    def get_hiking_trails_for_regions(self, regions: Iterable[str]) -> Dict[str, RegionResult]:
+        """
+        Pobiera szlaki dla wielu regionów równolegle.
+
+        Zapytania idą przez jedną sesję z pulą połączeń, a całkowity czas
+        zależy od najwolniejszego regionu, a nie od sumy wszystkich.
+        Zwraca osobny wynik (trasy albo błąd) dla każdego regionu.
+        """
+        jobs = {region: self._build_query(region) for region in regions}
+        print(f"\nPobieranie tras dla {len(jobs)} regionów (maks. {self.fetcher.max_concurrency} naraz)")
+        results = self.fetcher.fetch_all(jobs, self._new_collector)
+        for region, result in results.items():
+            if result.ok:
+                print(f"Znaleziono łącznie {len(result.trails)} tras dla {region} "
+                      f"({result.elapsed:.1f} s, prób: {result.attempts})")
+            else:
+                print(f"Błąd podczas pobierania danych dla {region}: {result.error}")
+        return results
+
+    def _process_trail_element(self, element: Dict[str, Any], city: str,
+                               geometry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Przetwarza pojedynczy element szlaku.
+
+        geometry to wynik resolve_geometries() dla elementu; używany jest,
+        gdy tagi nie podają długości lub współrzędnych.
+        """
         tags = element.get("tags", {})
         
         # Skip if no name
@@ -190,6 +304,10 @@ class TrailsAPI:
                 if length_km > 0:
                     break
         
+        # Długość z rzeczywistej geometrii, jeśli tagi jej nie podają
+        if length_km == 0 and geometry:
+            length_km = round(geometry.get("length_km", 0.0), 3)
+
         # Skip trails with unknown length
         if length_km == 0:
             return None
@@ -227,6 +345,8 @@ class TrailsAPI:
         except (KeyError, IndexError, TypeError) as e:
             print(f"Błąd podczas pobierania współrzędnych: {e}")
             coordinates = None
+        if coordinates is None and geometry:
+            coordinates = geometry.get("coordinates")
         
         trail = {
             "id": str(element.get("id")),
@@ -240,7 +360,8 @@ class TrailsAPI:
             "tags": [k for k, v in tags.items() if v == "yes"]
         }
         
-        print(f"Znaleziono trasę: {trail['name']} ({trail['length_km']:.2f} km, trudność: {trail['difficulty']})")
+        if is_verbose():
+            print(f"Znaleziono trasę: {trail['name']} ({trail['length_km']:.2f} km, trudność: {trail['difficulty']})")
         return trail
 
     def _determine_terrain_type(self, tags: Dict[str, str]) -> str:
@@ -2,9 +2,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from api.trail_ingest import TrailIngest
 from api.trails_api import TrailsAPI
 from api.weather_api import WeatherAPI
 from config import CITY_COORDINATES
+from data_handlers.trail_merge import TrailMerger, merge_trails
 import json
 from datetime import datetime, timedelta
 
@@ -14,17 +16,18 @@ def update_trails_data():
 
     print("Pobieranie danych o szlakach dla wszystkich regionów...")
     
-    for region in CITY_COORDINATES.keys():
-        print(f"\nPobieranie szlaków dla regionu: {region}")
-        try:
-            trails = api.get_hiking_trails(region)
-            if trails:
-                all_trails.extend(trails)
-                print(f"Znaleziono {len(trails)} szlaków dla {region}")
-        except Exception as e:
-            print(f"Błąd podczas pobierania szlaków dla {region}: {e}")
+    results = TrailIngest(api).refresh(CITY_COORDINATES.keys())
+    for region, result in results.items():
+        if result.ok:
+            all_trails.extend(result.trails)
+            print(f"Znaleziono {len(result.trails)} szlaków dla {region}")
+        else:
+            print(f"Błąd podczas pobierania szlaków dla {region}: {result.error}")
 
     print(f"\nŁącznie znaleziono {len(all_trails)} szlaków")
+    merger = TrailMerger()
+    all_trails = merge_trails(all_trails, merger)
+    print(merger.summary())
 
     # Initialize empty file if it doesn't exist
     if not os.path.exists('trails_data.json'):
@@ -45,18 +48,20 @@ def update_weather_data():
 
     print("\nPobieranie danych pogodowych dla wszystkich regionów...")
     
-    # Get weather for next 7 days for each region
+    # Get weather for next 7 days for all regions in one batched request
+    start_date = datetime.now().strftime("%Y-%m-%d")
+    end_date = (datetime.now() + timedelta(days=6)).strftime("%Y-%m-%d")
+    try:
+        forecasts = api.get_weather_batch(list(CITY_COORDINATES.keys()), start_date, end_date)
+    except Exception as e:
+        print(f"Błąd podczas pobierania prognozy pogody: {e}")
+        forecasts = {}
+
     for region in CITY_COORDINATES.keys():
-        print(f"\nPobieranie prognozy pogody dla regionu: {region}")
-        try:
-            for i in range(7):  # Get forecast for next 7 days
-                date = (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
-                weather = api.get_weather_forecast(region, date)
-                if weather:
-                    all_weather.append(weather)
-                    print(f"Pobrano prognozę dla {region} na {date}")
-        except Exception as e:
-            print(f"Błąd podczas pobierania prognozy pogody dla {region}: {e}")
+        print(f"\nPrognoza pogody dla regionu: {region}")
+        for date, weather in forecasts.get(region, {}).items():
+            all_weather.append(weather)
+            print(f"Pobrano prognozę dla {region} na {date}")
 
     print(f"\nŁącznie pobrano {len(all_weather)} prognoz pogody")
 
@@ -2,8 +2,10 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from api.trail_ingest import TrailIngest
 from api.trails_api import TrailsAPI
 from config import CITY_COORDINATES
+from data_handlers.trail_merge import TrailMerger, merge_trails
 import json
 
 def update_trails_data():
@@ -12,16 +14,18 @@ def update_trails_data():
 
     print("Pobieranie danych o szlakach dla wszystkich regionów...")
     
-    for region in CITY_COORDINATES.keys():
-        print(f"\nPobieranie szlaków dla regionu: {region}")
-        try:
-            trails = api.get_hiking_trails(region)
-            all_trails.extend(trails)
-            print(f"Znaleziono {len(trails)} szlaków dla {region}")
-        except Exception as e:
-            print(f"Błąd podczas pobierania szlaków dla {region}: {e}")
+    results = TrailIngest(api).refresh(CITY_COORDINATES.keys())
+    for region, result in results.items():
+        if result.ok:
+            all_trails.extend(result.trails)
+            print(f"Znaleziono {len(result.trails)} szlaków dla {region}")
+        else:
+            print(f"Błąd podczas pobierania szlaków dla {region}: {result.error}")
 
     print(f"\nŁącznie znaleziono {len(all_trails)} szlaków")
+    merger = TrailMerger()
+    all_trails = merge_trails(all_trails, merger)
+    print(merger.summary())
 
     # Save to trails_data.json
     try:
@@ -4,11 +4,27 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from functools import reduce
-from config import OPEN_METEO_API, CITY_COORDINATES
+from config import OPEN_METEO_API, CITY_COORDINATES, WEATHER_CACHE_FORECAST_TTL_HOURS
+from api.weather_cache import WeatherCache
+from api.weather_history import WeatherHistoryStore
+from utils.profiling import span, timed
+
+# Zmienne dzienne pobierane z Open-Meteo (część klucza cache)
+DAILY_VARIABLES = (
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "sunshine_duration",
+    "cloudcover_mean",
+    "windspeed_10m_max",
+    "winddirection_10m_dominant"
+)
 
 class WeatherAPI:
-    def __init__(self):
-        self.base_url = "https://api.open-meteo.com/v1"
+    FORECAST_PROVIDER = "open-meteo-forecast"
+
+    def __init__(self, cache: Optional[WeatherCache] = None):
+        self.base_url = OPEN_METEO_API
         self.forecast_url = f"{self.base_url}/forecast"
         self.history_url = f"{self.base_url}/archive"
         self.visual_crossing_url = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
@@ -18,6 +34,8 @@ class WeatherAPI:
         self.worldweather_url = "http://api.worldweatheronline.com/premium/v1/past-weather.ashx"
         self.worldweather_api_key = "YOUR_API_KEY"  # Należy zastąpić prawdziwym kluczem API
         self.weather_data_file = "api/weather_data.json"
+        self.cache = cache if cache is not None else WeatherCache.shared()
+        self.history = WeatherHistoryStore.for_file(self.weather_data_file)
 
     def _calculate_average_temperature(self, daily_data: Dict[str, List[float]]) -> float:
         """Calculate average temperature using reduce."""
@@ -44,25 +62,164 @@ class WeatherAPI:
         
         return weather_data
 
+    @timed("weather.get")
     def get_weather_forecast(self, city: str, date: str) -> Optional[Dict[str, Any]]:
-        """Get weather forecast for a specific date."""
+        """Get weather forecast for a specific date (served from cache when possible)."""
         try:
             # Convert date string to datetime
             target_date = datetime.strptime(date, "%Y-%m-%d")
             today = datetime.now().date()
-            
-            # Choose appropriate API endpoint based on date
-            if target_date.date() < today:
+            historical = target_date.date() < today
+
+            # Historical data is served from the in-memory history store
+            if historical:
                 print(f"Pobieranie historycznych danych pogodowych dla {city} na dzień {date}...")
                 return self._get_historical_weather(city, date)
-            else:
-                print(f"Pobieranie prognozy pogody dla {city} na dzień {date}...")
-                return self._get_future_weather(city, date)
+
+            # Repeated (city, date) queries are answered from cache without network calls
+            key = self._cache_key(city, date)
+            if key is not None:
+                with span("weather.cache_lookup"):
+                    cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+
+            print(f"Pobieranie prognozy pogody dla {city} na dzień {date}...")
+            weather = self._get_future_weather(city, date)
+            if weather is not None and key is not None:
+                self.cache.put(key, weather, WEATHER_CACHE_FORECAST_TTL_HOURS * 3600)
+            return weather
                 
         except Exception as e:
             print(f"Błąd podczas pobierania danych pogodowych: {e}")
             return None
 
+    def _cache_key(self, city: str, date: str) -> Optional[str]:
+        """Cache key for one (city, date) forecast record, or None for unknown cities."""
+        coordinates = self._get_city_coordinates(city)
+        if not coordinates:
+            return None
+        return WeatherCache.make_key(self.FORECAST_PROVIDER, coordinates["latitude"],
+                                     coordinates["longitude"], date, DAILY_VARIABLES)
+
+    @staticmethod
+    def _daily_record(daily: Dict[str, List[Any]], index: int) -> Dict[str, Any]:
+        """Build the per-day weather record from position `index` of the daily arrays."""
+        return {
+            "temperature_max": daily["temperature_2m_max"][index],
+            "temperature_min": daily["temperature_2m_min"][index],
+            "temperature_avg": (daily["temperature_2m_max"][index] + daily["temperature_2m_min"][index]) / 2,
+            "precipitation": daily["precipitation_sum"][index],
+            "sunshine_hours": daily["sunshine_duration"][index] / 3600,  # Convert seconds to hours
+            "cloud_cover": daily["cloudcover_mean"][index],
+            "wind_speed": daily["windspeed_10m_max"][index]
+        }
+
+    def _fetch_forecast_window(self, cities: List[str], start_date: str,
+                               end_date: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Fetch the forecast for several cities and a date window in ONE request.
+
+        Open-Meteo accepts comma-separated coordinates and a date range; the
+        response (a list with one entry per location) is split into per-day
+        records. Returns {city: {date: record}}.
+        """
+        located = [(city, self._get_city_coordinates(city)) for city in cities]
+        located = [(city, coordinates) for city, coordinates in located if coordinates]
+        if not located:
+            return {}
+
+        params = {
+            "latitude": ",".join(str(coordinates["latitude"]) for _, coordinates in located),
+            "longitude": ",".join(str(coordinates["longitude"]) for _, coordinates in located),
+            "start_date": start_date,
+            "end_date": end_date,
+            "daily": ",".join(DAILY_VARIABLES),
+            "timezone": "Europe/Warsaw"
+        }
+        print(f"Pobieranie prognozy pogody dla {len(located)} lokalizacji na dni {start_date} - {end_date}...")
+        with span("open_meteo.request"):
+            response = requests.get(self.forecast_url, params=params)
+            response.raise_for_status()
+        with span("open_meteo.parse_json"):
+            data = response.json()
+        # Dla jednej lokalizacji API zwraca obiekt, dla wielu - listę obiektów
+        locations = data if isinstance(data, list) else [data]
+
+        results = {}
+        for (city, _), location in zip(located, locations):
+            daily = location.get("daily", {})
+            records = {}
+            for index, day in enumerate(daily.get("time", [])):
+                try:
+                    records[day] = self._daily_record(daily, index)
+                except (KeyError, IndexError, TypeError):
+                    # Brak wartości (null) dla dnia poza horyzontem prognozy
+                    continue
+            results[city] = records
+        return results
+
+    @timed("weather.batch")
+    def get_weather_batch(self, cities: List[str], start_date: str,
+                          end_date: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get weather records for many cities and every day of a date range.
+
+        Past days are one range slice of the history store (only stored days
+        are returned); cached forecast days are
+        served from cache; all remaining future days are fetched with a single
+        Open-Meteo request. Returns {city: {date: record}} (days without data
+        are absent).
+        """
+        try:
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            end = datetime.strptime(end_date, "%Y-%m-%d")
+        except ValueError as e:
+            print(f"Nieprawidłowy format daty: {e}")
+            return {}
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        dates = [(start + timedelta(days=x)).strftime("%Y-%m-%d") for x in range((end - start).days + 1)]
+        past_dates = [date for date in dates if date < today]
+        future_dates = [date for date in dates if date >= today]
+        results: Dict[str, Dict[str, Dict[str, Any]]] = {city: {} for city in cities}
+        missing: Dict[str, List[str]] = {}
+
+        for city in cities:
+            if past_dates:
+                # Jeden wycinek posortowanych dat zamiast osobnego odczytu dla każdego dnia
+                for date, weather in self.history.get_range(city, past_dates[0], past_dates[-1]):
+                    results[city][date] = dict(weather)
+            for date in future_dates:
+                key = self._cache_key(city, date)
+                cached = self.cache.get(key) if key is not None else None
+                if cached is not None:
+                    results[city][date] = cached
+                else:
+                    missing.setdefault(city, []).append(date)
+
+        if missing:
+            window = sorted(date for city_dates in missing.values() for date in city_dates)
+            try:
+                fetched = self._fetch_forecast_window(list(missing), window[0], window[-1])
+            except Exception as e:
+                print(f"Błąd podczas pobierania prognozy pogody: {e}")
+                fetched = {}
+            for city, city_dates in missing.items():
+                records = fetched.get(city, {})
+                for date in city_dates:
+                    weather = records.get(date)
+                    if weather is None:
+                        continue
+                    results[city][date] = weather
+                    key = self._cache_key(city, date)
+                    if key is not None:
+                        self.cache.put(key, weather, WEATHER_CACHE_FORECAST_TTL_HOURS * 3600)
+
+        # Zachowaj kolejność dat
+        return {city: {date: records[date] for date in dates if date in records}
+                for city, records in results.items()}
+
     def _get_future_weather(self, city: str, date: str) -> Optional[Dict[str, Any]]:
         """Get weather forecast for future dates."""
         try:
@@ -77,60 +234,46 @@ class WeatherAPI:
                 "longitude": coordinates["longitude"],
                 "start_date": date,
                 "end_date": date,
-                "daily": [
-                    "temperature_2m_max",
-                    "temperature_2m_min",
-                    "precipitation_sum",
-                    "sunshine_duration",
-                    "cloudcover_mean",
-                    "windspeed_10m_max",
-                    "winddirection_10m_dominant"
-                ],
+                "daily": list(DAILY_VARIABLES),
                 "timezone": "Europe/Warsaw"
             }
 
             # Make the API request
-            response = requests.get(self.forecast_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            with span("open_meteo.request"):
+                response = requests.get(self.forecast_url, params=params)
+                response.raise_for_status()
+            with span("open_meteo.parse_json"):
+                data = response.json()
 
             # Extract and format the weather data
-            daily = data["daily"]
-            return {
-                "temperature_max": daily["temperature_2m_max"][0],
-                "temperature_min": daily["temperature_2m_min"][0],
-                "temperature_avg": (daily["temperature_2m_max"][0] + daily["temperature_2m_min"][0]) / 2,
-                "precipitation": daily["precipitation_sum"][0],
-                "sunshine_hours": daily["sunshine_duration"][0] / 3600,  # Convert seconds to hours
-                "cloud_cover": daily["cloudcover_mean"][0],
-                "wind_speed": daily["windspeed_10m_max"][0]
-            }
+            return self._daily_record(data["daily"], 0)
 
         except Exception as e:
             print(f"Błąd podczas pobierania prognozy pogody: {e}")
             return None
 
+    @timed("weather.history")
     def _get_historical_weather(self, city: str, date: str) -> Optional[Dict[str, Any]]:
-        """Get historical weather data from local JSON file."""
+        """
+        Get historical weather data from the local history store.
+
+        Returns the record for the exact date or, if it is missing, for the
+        nearest stored date within WEATHER_HISTORY_TOLERANCE_DAYS.
+        """
         try:
-            # Load weather data from file
-            with open(self.weather_data_file, 'r', encoding='utf-8') as f:
-                weather_data = json.load(f)
-
-            # Check if we have data for this city and date
-            if city in weather_data and date in weather_data[city]:
-                return weather_data[city][date]
-            else:
-                # If no exact match, return average values for the city
-                if city in weather_data:
-                    city_data = weather_data[city]
-                    dates = list(city_data.keys())
-                    if dates:
-                        # Return data from the first available date
-                        return city_data[dates[0]]
-                
-                print(f"Brak danych historycznych dla {city} na dzień {date}")
-                return None
+            weather = self.history.get_exact(city, date)
+            if weather is not None:
+                return dict(weather)
+
+            nearest = self.history.get_nearest(city, date)
+            if nearest is not None:
+                nearest_date, weather = nearest
+                print(f"Brak danych historycznych dla {city} na dzień {date}, "
+                      f"użyto najbliższej daty {nearest_date}")
+                return dict(weather)
+
+            print(f"Brak danych historycznych dla {city} na dzień {date}")
+            return None
 
         except Exception as e:
             print(f"Błąd podczas pobierania historycznych danych pogodowych: {e}")
@@ -147,23 +290,6 @@ class WeatherAPI:
         return city_coordinates.get(city)
 
     def get_weather_for_date_range(self, city: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
-        """Get weather for a date range using map."""
-        try:
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
-            
-            # Generate list of dates
-            date_list = [start + timedelta(days=x) for x in range((end - start).days + 1)]
-            
-            # Use map to get weather for each date
-            weather_data = list(map(
-                lambda date: self.get_weather_forecast(city, date.strftime("%Y-%m-%d")),
-                date_list
-            ))
-            
-            # Filter out None values
-            return list(filter(None, weather_data))
-            
-        except ValueError as e:
-            print(f"Nieprawidłowy format daty: {e}")
-            return [] 
\ No newline at end of file
+        """Get weather for a date range (one batched request for the whole range)."""
+        records = self.get_weather_batch([city], start_date, end_date).get(city, {})
+        return list(records.values())
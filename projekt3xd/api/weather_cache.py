@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from config import (WEATHER_CACHE_DIR, WEATHER_CACHE_FILE, WEATHER_CACHE_MAX_ENTRIES,
+                    WEATHER_CACHE_FORECAST_TTL_HOURS)
+from utils.data_storage import DataStorage
+
+
+class WeatherCache:
+    """
+    Dwupoziomowy cache danych pogodowych.
+
+    Pierwszy poziom to LRU w pamięci procesu (OrderedDict) z czasem ważności
+    każdego wpisu, drugi - plik JSON zapisywany przez DataStorage, dzięki
+    któremu wyniki przeżywają restart programu. Plik jest czytany raz, przy
+    pierwszym chybieniu: ważne wpisy trafiają do LRU (najwyżej max_entries),
+    więc pamięć nie rośnie z rozmiarem pliku, a wygasłe wpisy są usuwane
+    z pliku przy wczytaniu i przy każdym kompaktowaniu. Klucz to skrót z
+    (dostawca, szerokość, długość, data, zmienne).
+    """
+
+    _shared: Optional["WeatherCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage: Optional[DataStorage] = None,
+                 max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+                 default_ttl_seconds: float = WEATHER_CACHE_FORECAST_TTL_HOURS * 3600,
+                 filename: str = WEATHER_CACHE_FILE,
+                 persistent: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.default_ttl_seconds = default_ttl_seconds
+        self.filename = filename
+        if storage is None and persistent:
+            storage = DataStorage(WEATHER_CACHE_DIR)
+        self.storage = storage
+        # Wpis: (dane, czas wygaśnięcia, czy wczytany z pliku i jeszcze nieużyty)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk_loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @classmethod
+    def shared(cls) -> "WeatherCache":
+        """Wspólna instancja używana domyślnie przez wszystkie obiekty WeatherAPI."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def make_key(provider: str, lat: float, lon: float, date: str, variables: Iterable[str]) -> str:
+        """Klucz wpisu: skrót SHA-1 z dostawcy, współrzędnych, daty i listy zmiennych."""
+        raw = json.dumps([provider, round(float(lat), 4), round(float(lon), 4), date, sorted(variables)],
+                         ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _unexpired(key: str, entry: Any) -> bool:
+        """Czy wpis pliku cache jest jeszcze ważny (filtr kompaktowania pliku)."""
+        return isinstance(entry, dict) and entry.get("expires_at", 0) > time.time()
+
+    def _load_disk(self) -> None:
+        """Jednorazowo przenosi ważne wpisy pliku do LRU, za wpisami dodanymi w tym procesie."""
+        if self._disk_loaded or self.storage is None:
+            return
+        self._disk_loaded = True
+        try:
+            stored = self.storage.load_data(self.filename)
+        except (OSError, ValueError) as e:
+            print(f"Błąd podczas wczytywania cache pogody: {e}")
+            return
+
+        valid = sorted(((key, entry) for key, entry in stored.items() if self._unexpired(key, entry)),
+                       key=lambda item: item[1]["expires_at"])
+        # Najpóźniej wygasające wpisy pliku na początku kolejki LRU (najwcześniej usuwane)
+        for key, entry in reversed(valid[-self.max_entries:]):
+            if key not in self._entries:
+                self._entries[key] = (entry["data"], entry["expires_at"], True)
+                self._entries.move_to_end(key, last=False)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if len(valid) < len(stored):
+            try:
+                self.storage.compact(self.filename, keep=self._unexpired)
+            except OSError as e:
+                print(f"Błąd podczas usuwania wygasłych wpisów cache pogody: {e}")
+
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (value, expires_at, False)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Zwraca kopię zapisanych danych lub None, jeśli brak wpisu albo wygasł."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._load_disk()
+                entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if entry[2]:
+                        self.disk_hits += 1
+                        self._entries[key] = (entry[0], entry[1], False)
+                    return dict(entry[0])
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Zapisuje dane w pamięci i w pliku cache."""
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl
+        value = dict(value)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self.storage is not None:
+                entry = {"expires_at": expires_at, "data": value}
+                try:
+                    self.storage.append_data(self.filename, {key: entry}, keep=self._unexpired)
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"Błąd podczas zapisywania cache pogody: {e}")
+
+    def clear(self) -> None:
+        """Usuwa wszystkie wpisy z pamięci i z dysku; liczniki są zerowane."""
+        with self._lock:
+            self._entries.clear()
+            self._disk_loaded = True
+            self.hits = self.misses = self.disk_hits = 0
+            if self.storage is not None:
+                self.storage.clear_cache(self.filename)
+
+    def stats(self) -> Dict[str, int]:
+        """Liczniki trafień i chybień oraz rozmiar cache w pamięci."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._entries),
+            }
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date as date_type
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import WEATHER_HISTORY_TOLERANCE_DAYS
+
+
+class WeatherHistoryStore:
+    """
+    Historyczne dane pogodowe wczytywane raz do posortowanych tablic dat.
+
+    Dla każdego miasta przechowywana jest posortowana lista dat (ISO, więc
+    porządek leksykograficzny jest chronologiczny) i równoległa lista rekordów.
+    Wyszukiwanie dokładne, najbliższej daty i zakresów odbywa się przez bisect.
+    Plik jest wczytywany ponownie tylko po zmianie jego mtime/rozmiaru.
+    """
+
+    _shared: Dict[str, "WeatherHistoryStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, data_file: str, tolerance_days: int = WEATHER_HISTORY_TOLERANCE_DAYS):
+        self.data_file = data_file
+        self.tolerance_days = tolerance_days
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._cities: Dict[str, Tuple[List[str], List[Dict[str, Any]]]] = {}
+
+    @classmethod
+    def for_file(cls, data_file: str) -> "WeatherHistoryStore":
+        """Wspólna instancja dla danego pliku (plik jest parsowany raz na proces)."""
+        with cls._shared_lock:
+            store = cls._shared.get(data_file)
+            if store is None:
+                store = cls._shared[data_file] = cls(data_file)
+            return store
+
+    def _load(self) -> Dict[str, Tuple[List[str], List[Dict[str, Any]]]]:
+        try:
+            stat = os.stat(self.data_file)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        if stat_key == self._stat_key:
+            return self._cities
+
+        with self._lock:
+            if stat_key == self._stat_key:
+                return self._cities
+            cities = {}
+            if stat_key is not None:
+                try:
+                    with open(self.data_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Błąd podczas wczytywania historycznych danych pogodowych: {e}")
+                    return self._cities
+                if isinstance(data, dict):
+                    for city, by_date in data.items():
+                        if not isinstance(by_date, dict):
+                            continue
+                        dates = sorted(by_date)
+                        cities[city] = (dates, [by_date[day] for day in dates])
+            self._cities = cities
+            self._stat_key = stat_key
+            return cities
+
+    def cities(self) -> List[str]:
+        return list(self._load())
+
+    def dates(self, city: str) -> List[str]:
+        """Posortowane daty dostępne dla miasta."""
+        return list(self._load().get(city, ([], []))[0])
+
+    def get_exact(self, city: str, date: str) -> Optional[Dict[str, Any]]:
+        dates, records = self._load().get(city, ([], []))
+        position = bisect_left(dates, date)
+        if position < len(dates) and dates[position] == date:
+            return records[position]
+        return None
+
+    def get_nearest(self, city: str, date: str,
+                    tolerance_days: Optional[int] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Zwraca (data, rekord) najbliższy podanej dacie, o ile różnica nie
+        przekracza tolerance_days; przy remisie wybierana jest wcześniejsza data.
+        """
+        tolerance = self.tolerance_days if tolerance_days is None else tolerance_days
+        dates, records = self._load().get(city, ([], []))
+        if not dates:
+            return None
+        target = date_type.fromisoformat(date)
+        position = bisect_left(dates, date)
+        best = None
+        for candidate in (position - 1, position):
+            if 0 <= candidate < len(dates):
+                distance = abs((date_type.fromisoformat(dates[candidate]) - target).days)
+                if distance <= tolerance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+        if best is None:
+            return None
+        return dates[best[1]], records[best[1]]
+
+    def get_range(self, city: str, start_date: str, end_date: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Wszystkie rekordy miasta z dat w przedziale [start_date, end_date]."""
+        dates, records = self._load().get(city, ([], []))
+        start = bisect_left(dates, start_date)
+        end = bisect_right(dates, end_date)
+        return list(zip(dates[start:end], records[start:end]))
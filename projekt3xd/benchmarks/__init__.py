@@ -0,0 +1,8 @@
+"""
+Benchmarks for the trail recommendation system.
+
+Run from the project directory, e.g.:
+    python -m benchmarks.bench_overpass_stream --sizes 10 500
+
+The whole suite with regression baselines: python -m benchmarks.suite
+"""
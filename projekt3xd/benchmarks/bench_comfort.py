@@ -0,0 +1,56 @@
+"""
+Hiking comfort index for a multi-day forecast over many trails: scalar vs batch.
+
+    python -m benchmarks.bench_comfort --trails 100000 --days 7
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from utils.weather_utils import WeatherUtils
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trails', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--scalar-sample', type=int, default=50_000,
+                        help='Liczba wywołań wersji skalarnej (czas jest ekstrapolowany)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    temperature = rng.uniform(-5, 30, args.days)[:, None]
+    precipitation = rng.choice([0.0, 0.0, 0.3, 1.5, 4.0], args.days)[:, None]
+    cloud_cover = rng.uniform(0, 100, args.days)[:, None]
+    # Poprawka wysokościowa: 0.6°C na 100 m
+    adjustment = (rng.uniform(0, 1500, args.trails) / 100 * 0.6)[None, :]
+
+    started = time.perf_counter()
+    batch = WeatherUtils.calculate_hiking_comfort_batch(temperature - adjustment, precipitation, cloud_cover)
+    batch_seconds = time.perf_counter() - started
+
+    temps = (temperature - adjustment).ravel()
+    sample = min(args.scalar_sample, temps.size)
+    precs = np.broadcast_to(precipitation, batch.shape).ravel()
+    clouds = np.broadcast_to(cloud_cover, batch.shape).ravel()
+    started = time.perf_counter()
+    scalar = [WeatherUtils.calculate_hiking_comfort({'temperature': t, 'precipitation': p, 'cloud_cover': c})
+              for t, p, c in zip(temps[:sample].tolist(), precs[:sample].tolist(), clouds[:sample].tolist())]
+    scalar_seconds = (time.perf_counter() - started) * temps.size / sample
+
+    mismatches = int((np.asarray(scalar) != batch.ravel()[:sample]).sum())
+    print(f"Dni: {args.days}, trasy: {args.trails}, wyniki: {batch.size}")
+    print(f"Wersja wektorowa: {batch_seconds * 1000:.1f} ms")
+    print(f"Wersja skalarna (szacunek): {scalar_seconds * 1000:.0f} ms")
+    print(f"Różnice względem wersji skalarnej (próbka {sample}): {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Trail filtering at scale: reduce-chained filters vs compiled predicate vs NumPy mask.
+
+    python -m benchmarks.bench_filters --count 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from functools import reduce
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import generate_trails
+from data_handlers.trail_table import TrailTable
+from utils.filters import TrailCriteria
+
+
+def _chained(trails, region, min_length, max_length, difficulty, terrain_type):
+    # Dawna implementacja: osobna lista po każdym predykacie
+    filters = [
+        lambda trail: trail['region'].lower() == region.lower(),
+        lambda trail: trail['length_km'] >= min_length,
+        lambda trail: trail['length_km'] <= max_length,
+        lambda trail: trail['difficulty'] == difficulty,
+        lambda trail: trail.get('terrain_type', '').lower() == terrain_type.lower(),
+    ]
+    return reduce(lambda items, filter_func: list(filter(filter_func, items)), filters, trails)
+
+
+def _best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    trails = generate_trails(args.count, args.seed)
+    table = TrailTable.from_records(trails)
+    query = dict(region="Kraków", min_length=5.0, max_length=15.0, difficulty=2, terrain_type="park")
+    criteria = TrailCriteria(**query)
+
+    expected = len(_chained(trails, **query))
+    assert len(criteria.apply(trails)) == expected
+    assert int(criteria.mask(table).sum()) == expected
+
+    timings = [
+        ("reduce + filter (dawniej)", _best_of(args.repeat, lambda: _chained(trails, **query))),
+        ("skompilowany predykat", _best_of(args.repeat, lambda: criteria.apply(trails))),
+        ("maska NumPy (TrailTable)", _best_of(args.repeat, lambda: criteria.mask(table))),
+        ("maska + widoki wierszy", _best_of(args.repeat, lambda: criteria.apply(table))),
+    ]
+    print(f"Trasy: {args.count}, wynik: {expected}")
+    baseline = timings[0][1]
+    for name, seconds in timings:
+        print(f"{name:>28}: {seconds * 1000:9.2f} ms ({baseline / seconds:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Peak memory of parsing an Overpass response: streaming parser vs json.load.
+
+Each measurement runs in a fresh subprocess so that ru_maxrss reflects only
+that parsing mode. Fixtures are generated on first use.
+
+    python -m benchmarks.bench_overpass_stream --sizes 10 500 --modes stream full
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+
+def _peak_rss_mb() -> float:
+    # Linux zwraca ru_maxrss w KB, macOS w bajtach
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_fixture(path: str, size_mb: int, seed: int = 42) -> None:
+    """Writes a synthetic Overpass response of roughly size_mb megabytes."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    next_id = 1
+    with open(path, 'w', encoding='utf-8') as f:
+        header = '{"version":0.6,"generator":"Overpass API","osm3s":{"copyright":"synthetic"},"elements":[\n'
+        f.write(header)
+        written += len(header)
+        first = True
+        while written < target:
+            roll = rng.random()
+            if roll < 0.02:
+                element = {
+                    "type": "relation", "id": next_id,
+                    "members": [{"type": "way", "ref": rng.randrange(10 ** 9), "role": ""}
+                                for _ in range(rng.randint(2, 20))],
+                    "tags": {"name": f"Szlak {next_id}", "route": "hiking",
+                             "distance": f"{rng.uniform(1, 40):.1f} km"},
+                }
+            elif roll < 0.12:
+                element = {
+                    "type": "way", "id": next_id,
+                    "nodes": [rng.randrange(10 ** 10) for _ in range(rng.randint(5, 40))],
+                    "tags": {"name": f"Ścieżka {next_id}", "highway": "path",
+                             "length": str(rng.randint(200, 5000))},
+                }
+            else:
+                element = {"type": "node", "id": next_id,
+                           "lat": round(rng.uniform(49.0, 54.8), 7),
+                           "lon": round(rng.uniform(14.1, 24.1), 7)}
+            next_id += 1
+            line = ("" if first else ",\n") + json.dumps(element, ensure_ascii=False)
+            first = False
+            f.write(line)
+            written += len(line.encode('utf-8'))
+        f.write('\n]}\n')
+
+
+def _run_child(mode: str, path: str) -> None:
+    from api.trails_api import TrailsAPI
+    from api.overpass_stream import iter_overpass_elements, STREAM_CHUNK_SIZE
+
+    api = TrailsAPI()
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    # Komunikaty o każdej trasie zaburzałyby pomiar czasu
+    with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink), open(path, 'rb') as f:
+        if mode == "stream":
+            chunks = iter(lambda: f.read(STREAM_CHUNK_SIZE), b"")
+            trails = api._parse_trails(iter_overpass_elements(chunks), "Synthetic")
+        else:
+            data = json.load(f)
+            trails = api._parse_trails(data.get("elements", []), "Synthetic")
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"mode": mode, "trails": len(trails), "seconds": round(elapsed, 2),
+                      "baseline_rss_mb": round(baseline, 1), "peak_rss_mb": round(_peak_rss_mb(), 1)}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 500], help='Fixture sizes in MB')
+    parser.add_argument('--modes', nargs='+', default=['stream', 'full'], choices=['stream', 'full'])
+    parser.add_argument('--fixture-dir', default=os.path.join(tempfile.gettempdir(), 'overpass_fixtures'))
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(*args.child)
+        return
+
+    os.makedirs(args.fixture_dir, exist_ok=True)
+    print(f"{'rozmiar':>8} {'tryb':>7} {'trasy':>8} {'czas [s]':>9} {'RSS bazowy':>11} {'RSS szczyt':>11}")
+    for size in args.sizes:
+        path = os.path.join(args.fixture_dir, f"overpass_{size}mb.json")
+        if not os.path.exists(path):
+            print(f"Generowanie danych testowych {path}...")
+            write_fixture(path, size)
+        for mode in args.modes:
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_overpass_stream',
+                                     '--child', mode, path],
+                                    cwd=project_root, capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{size:>6}MB {mode:>7} błąd: {output.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{size:>6}MB {mode:>7} {result['trails']:>8} {result['seconds']:>9} "
+                  f"{result['baseline_rss_mb']:>9}MB {result['peak_rss_mb']:>9}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Top-K ranking of trails by weighted score: full sort vs argpartition page.
+
+    python -m benchmarks.bench_ranking --count 1000000 --limit 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import generate_trails
+from data_handlers.trail_table import TrailTable
+from utils.weight_calculator import WeightCalculator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--offset', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    table = TrailTable.from_records(generate_trails(args.count, args.seed))
+    comfort = np.random.default_rng(args.seed).uniform(0, 100, args.count).round(1)
+    calculator = WeightCalculator()
+    calculator.weights = {'trudność': 0.25, 'długość': 0.25, 'pogoda': 0.25, 'teren': 0.25}
+
+    started = time.perf_counter()
+    scores = calculator.score_trails(table, comfort)
+    scoring = time.perf_counter() - started
+
+    started = time.perf_counter()
+    full = np.lexsort((np.arange(len(scores)), -scores))[args.offset:args.offset + args.limit]
+    full_sort = time.perf_counter() - started
+
+    started = time.perf_counter()
+    page = calculator.top_positions(scores, args.offset, args.limit)
+    top_k = time.perf_counter() - started
+
+    assert page.tolist() == full.tolist()
+    print(f"Trasy: {args.count}, strona: offset {args.offset}, limit {args.limit}")
+    print(f"Wektorowe wyniki ważone: {scoring * 1000:.1f} ms")
+    print(f"Pełne sortowanie: {full_sort * 1000:.1f} ms")
+    print(f"argpartition + sortowanie K: {top_k * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
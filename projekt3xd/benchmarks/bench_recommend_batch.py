@@ -0,0 +1,120 @@
+"""
+Recommendation throughput: one recommend_trails call per query vs recommend_batch.
+
+    python -m benchmarks.bench_recommend_batch --trails 40000 --queries 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from api.weather_api import WeatherAPI
+from api.weather_cache import WeatherCache
+from benchmarks.generators import REGIONS, TERRAINS, generate_trails
+from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_store import TrailStore
+from recommendation.trail_recommender import TrailRecommender
+
+CATEGORIES = [None, "rodzinna", "widokowa", "sportowa", "ekstremalna"]
+
+
+def _weather(rng: random.Random) -> dict:
+    temperature_min = rng.uniform(0, 15)
+    temperature_max = temperature_min + rng.uniform(3, 12)
+    return {
+        "temperature_min": temperature_min,
+        "temperature_max": temperature_max,
+        "temperature_avg": (temperature_min + temperature_max) / 2,
+        "precipitation": rng.choice([0.0, 0.0, 0.5, 3.0]),
+        "sunshine_hours": rng.uniform(0, 12),
+        "cloud_cover": rng.uniform(0, 100),
+        "wind_speed": rng.uniform(0, 30),
+    }
+
+
+def _queries(count: int, dates, limit: int, rng: random.Random) -> list:
+    queries = []
+    for _ in range(count):
+        weights = [rng.randint(0, 10) for _ in range(4)]
+        total = sum(weights) or 1
+        query = {
+            "city": rng.choice(REGIONS),
+            "date": rng.choice(dates),
+            "weights": dict(zip(("trudność", "długość", "pogoda", "teren"),
+                                [weight / total for weight in weights])),
+            "difficulty": rng.choice([None, 1, 2, 3]),
+            "terrain_type": rng.choice([None, None] + TERRAINS),
+            "category": rng.choice(CATEGORIES),
+            "limit": limit,
+        }
+        if rng.random() < 0.5:
+            query["min_length"] = rng.uniform(0, 10)
+            query["max_length"] = query["min_length"] + rng.uniform(5, 20)
+        queries.append(query)
+    return queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trails', type=int, default=40_000)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--single-sample', type=int, default=200,
+                        help='Liczba zapytań wykonywanych pojedynczo przez recommend_trails')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = TrailDataHandler(refresh_policy="never")
+            handler.store = TrailStore(os.path.join(directory, "trails_data.json"))
+            handler.store.save(generate_trails(args.trails, args.seed))
+            # Prognozy w pamięciowym cache - pomiar nie zależy od sieci
+            handler.weather_api = WeatherAPI(cache=WeatherCache(persistent=False))
+        today = datetime.now()
+        dates = [(today + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(1, args.days + 1)]
+        for city in REGIONS:
+            for date in dates:
+                handler.weather_api.cache.put(handler.weather_api._cache_key(city, date), _weather(rng))
+
+        queries = _queries(args.queries, dates, args.limit, rng)
+        recommender = TrailRecommender(handler)
+        sample = queries[:min(args.single_sample, len(queries))]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Rozgrzewka: cechy tras każdego miasta liczone są raz, przy pierwszym zapytaniu
+            started = time.perf_counter()
+            recommender.recommend_batch([{"city": city, "date": dates[0], "limit": 1,
+                                          "weights": {"pogoda": 1.0}} for city in REGIONS])
+            warmup_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            single = [recommender.recommend_trails(export=False, **query) for query in sample]
+            single_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            batch = recommender.recommend_batch(queries)
+            batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for one, many in zip(single, batch)
+                     if [dict(trail) for trail in one] != [dict(trail) for trail in many])
+    print(f"Trasy: {args.trails}, zapytania: {len(queries)}, grupy (miasto, data): "
+          f"{len({(query['city'], query['date']) for query in queries})}")
+    print(f"Przygotowanie cech tras (raz na miasto): {warmup_seconds * 1000:.0f} ms")
+    print(f"recommend_trails po kolei: {len(sample) / single_seconds:.0f} zapytań/s")
+    print(f"recommend_batch: {len(queries) / batch_seconds:.0f} zapytań/s")
+    print(f"Różnice względem pojedynczych wywołań (próbka {len(sample)}): {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+HTTP service latency: concurrent /recommend and /trails requests against server.py with stubbed upstream APIs.
+
+    python -m benchmarks.bench_server --trails 40000 --requests 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Prognozy z lokalnej atrapy Open-Meteo - adres musi być ustawiony przed wczytaniem config.py
+STUB_PORT = _free_port()
+os.environ["P3XD_OPEN_METEO_API"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from aiohttp import ClientSession, web
+
+from api import stub_upstream
+from benchmarks.generators import REGION_CENTERS, REGIONS, TERRAINS, generate_trails
+from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_store import TrailStore
+from server import TrailService, create_app
+
+
+def _paths(count: int, dates, rng: random.Random) -> list:
+    paths = []
+    for _ in range(count):
+        city = rng.choice(REGIONS)
+        date = rng.choice(dates)
+        if rng.random() < 0.7:
+            path = f"/recommend?city={city}&date={date}&limit=20"
+            if rng.random() < 0.5:
+                path += f"&difficulty={rng.randint(1, 3)}"
+            if rng.random() < 0.3:
+                path += f"&terrain_type={rng.choice(TERRAINS)}"
+            if rng.random() < 0.3:
+                path += "&radius_km=5"
+        else:
+            lat, lon = REGION_CENTERS[city]
+            path = f"/trails?lat={lat + rng.uniform(-0.2, 0.2):.4f}&lon={lon + rng.uniform(-0.3, 0.3):.4f}" \
+                   f"&radius_km={rng.choice([1, 2, 5])}&limit=20"
+        paths.append(path)
+    return paths
+
+
+async def _run(args) -> None:
+    stub = web.AppRunner(stub_upstream.create_app())
+    await stub.setup()
+    await web.TCPSite(stub, "127.0.0.1", STUB_PORT).start()
+
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        handler = TrailDataHandler(refresh_policy="never")
+        handler.store = TrailStore(os.path.join(directory, "trails_data.json"),
+                                   os.path.join(directory, "trails_data.bin"))
+        handler.store.save(generate_trails(args.trails, args.seed))
+        service = TrailService(data_handler=handler, workers=args.workers)
+        runner = web.AppRunner(create_app(service))
+        started = time.perf_counter()
+        await runner.setup()
+        port = _free_port()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        startup = time.perf_counter() - started
+
+        rng = random.Random(args.seed)
+        today = datetime.now()
+        dates = [(today + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(1, args.days + 1)]
+        paths = _paths(args.requests, dates, rng)
+        latencies = np.empty(len(paths))
+        failures = 0
+        queue = iter(enumerate(paths))
+
+        async with ClientSession(f"http://127.0.0.1:{port}") as session:
+            async def worker():
+                nonlocal failures
+                for index, path in queue:
+                    request_started = time.perf_counter()
+                    async with session.get(path) as response:
+                        await response.read()
+                        failures += response.status != 200
+                    latencies[index] = time.perf_counter() - request_started
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            async with session.get("/metrics") as response:
+                metrics = await response.json()
+
+        await runner.cleanup()
+    await stub.cleanup()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"Trasy: {args.trails}, start usługi (wczytanie danych, cechy miast): {startup * 1000:.0f} ms")
+    print(f"Zapytania: {len(paths)}, równolegle: {args.concurrency}, błędy: {failures}, "
+          f"przepustowość: {len(paths) / elapsed:.0f} zapytań/s")
+    print(f"Klient: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    for endpoint, stats in metrics["endpoints"].items():
+        print(f"Usługa {endpoint:<22} zapytań {stats['requests']:6d}, "
+              f"p50 {stats['p50_ms']:7.2f} ms, p99 {stats['p99_ms']:7.2f} ms")
+    print(f"Cache pogody: {metrics['weather_cache']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trails', type=int, default=40_000)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Radius, bounding-box and nearest-trail queries: SpatialIndex vs a linear haversine scan.
+
+    python -m benchmarks.bench_spatial_index --count 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import REGION_CENTERS, generate_trails
+from data_handlers.trail_table import TrailTable
+from utils.geo import haversine_km
+from utils.spatial_index import SpatialIndex
+
+
+def _timed(function, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    table = TrailTable.from_records(generate_trails(args.count, args.seed))
+    started = time.perf_counter()
+    index = SpatialIndex(table.lat, table.lon)
+    print(f"Trasy: {len(table)}, budowa indeksu: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    rng = random.Random(args.seed)
+    centers = []
+    for _ in range(args.queries):
+        lat, lon = rng.choice(list(REGION_CENTERS.values()))
+        centers.append((lat + rng.uniform(-0.3, 0.3), lon + rng.uniform(-0.5, 0.5)))
+
+    lat, lon = centers[0]
+    scan_seconds, _ = _timed(lambda: np.flatnonzero(haversine_km(lat, lon, table.lat, table.lon) <= 5), 5)
+    print(f"Skan liniowy (haversine dla wszystkich tras): {scan_seconds * 1000:8.2f} ms/zapytanie")
+
+    cases = [(f"promień {radius:>4} km", lambda lat, lon, radius=radius: index.within_radius(lat, lon, radius)[0])
+             for radius in (1, 2, 5, 15)]
+    cases += [(f"najbliższe {k:>4}", lambda lat, lon, k=k: index.nearest(lat, lon, k)[0]) for k in (10, 100)]
+    cases.append(("prostokąt 0.05°", lambda lat, lon: index.within_bbox(lat - 0.025, lon - 0.025,
+                                                                        lat + 0.025, lon + 0.025)))
+    for label, query in cases:
+        started = time.perf_counter()
+        found = sum(len(query(lat, lon)) for lat, lon in centers)
+        seconds = (time.perf_counter() - started) / len(centers)
+        print(f"{label}: {seconds * 1e6:8.1f} µs/zapytanie, średnio {found / len(centers):9.1f} tras")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Time to resolve trail geometry (node index + vectorized haversine).
+
+    python -m benchmarks.bench_trail_geometry --nodes 1000000 --nodes-per-way 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from api.trail_geometry import NodeIndex, resolve_geometries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=1_000_000)
+    parser.add_argument('--nodes-per-way', type=int, default=50)
+    parser.add_argument('--ways-per-trail', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Losowa permutacja identyfikatorów to najgorszy przypadek dla wyszukiwania
+    node_ids = rng.permutation(args.nodes).astype(np.int64) * 7 + 1
+    lats = rng.uniform(49.0, 54.8, args.nodes)
+    lons = rng.uniform(14.1, 24.1, args.nodes)
+
+    nodes = NodeIndex()
+    started = time.perf_counter()
+    for node_id, lat, lon in zip(node_ids.tolist(), lats.tolist(), lons.tolist()):
+        nodes.add(node_id, lat, lon)
+    indexing = time.perf_counter() - started
+
+    ways = [node_ids[i:i + args.nodes_per_way] for i in range(0, args.nodes, args.nodes_per_way)]
+    trail_ways = [ways[i:i + args.ways_per_trail] for i in range(0, len(ways), args.ways_per_trail)]
+
+    started = time.perf_counter()
+    geometries = resolve_geometries(trail_ways, nodes)
+    resolving = time.perf_counter() - started
+
+    print(f"Węzły: {args.nodes}, drogi: {len(ways)}, trasy: {len(geometries['length_km'])}")
+    print(f"Dodawanie węzłów do indeksu: {indexing:.3f} s")
+    print(f"Rozwiązanie geometrii i długości: {resolving:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Deduplication of multi-region trail ingest (TrailMerger) on duplicated synthetic input.
+
+    python -m benchmarks.bench_trail_merge --count 1000000 --duplicate-share 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import REGIONS, generate_trails
+from data_handlers.trail_merge import TrailMerger, merge_trails
+
+
+def duplicate_trails(trails, share: float, seed: int = 42):
+    """
+    Input as returned by the per-region queries: every unique trail plus,
+    for `share` of them, one duplicate - a copy from a neighbouring region
+    (same id), the first member way of the relation (same start, shorter)
+    or a member way with the relation's length tag (same length, another start).
+    """
+    rng = random.Random(seed)
+    result = list(trails)
+    next_id = 900_000_000
+    for trail in trails:
+        if rng.random() >= share:
+            continue
+        kind = rng.randrange(3)
+        if kind == 0:
+            region = rng.choice([region for region in REGIONS if region != trail["region"]])
+            duplicate = dict(trail, region=region)
+        else:
+            next_id += 1
+            duplicate = dict(trail, id=str(next_id))
+            if kind == 1:
+                duplicate["length_km"] = round(trail["length_km"] * rng.uniform(0.1, 0.9), 2)
+            else:
+                coordinates = trail["coordinates"]
+                duplicate["coordinates"] = {"lat": coordinates["lat"] + rng.uniform(0.01, 0.05),
+                                            "lon": coordinates["lon"] + rng.uniform(0.01, 0.05)}
+        result.append(duplicate)
+    rng.shuffle(result)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000, help="liczba unikalnych tras")
+    parser.add_argument('--duplicate-share', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    unique = generate_trails(args.count, args.seed)
+    trails = duplicate_trails(unique, args.duplicate_share, args.seed)
+    del unique
+    print(f"Rekordy wejściowe: {len(trails)} ({args.count} unikalnych tras)")
+
+    merger = TrailMerger()
+    started = time.perf_counter()
+    merged = merge_trails(trails, merger)
+    seconds = time.perf_counter() - started
+    print(merger.summary())
+    print(f"Łączenie: {seconds * 1000:.0f} ms ({len(trails) / seconds / 1e6:.2f} mln rekordów/s)")
+    multi_region = sum(1 for trail in merged if "regions" in trail)
+    print(f"Tras z kilku regionów: {multi_region}")
+    if len(merged) != args.count:
+        print(f"Błąd: oczekiwano {args.count} tras po łączeniu, otrzymano {len(merged)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
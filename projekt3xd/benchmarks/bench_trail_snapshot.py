@@ -0,0 +1,80 @@
+"""
+Start-up cost of the trail table: parsing trails_data.json vs memory-mapping the binary snapshot.
+
+    python -m benchmarks.bench_trail_snapshot --count 1000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import generate_trails
+from data_handlers.trail_store import TrailStore
+
+
+def _resident_mb() -> float:
+    """Bieżąca pamięć rezydentna procesu (Linux), w pozostałych systemach - szczytowa."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(mode: str, data_file: str, snapshot_file: str) -> None:
+    # Pomiar w osobnym procesie: czysta pamięć i brak pamięci podręcznej magazynu
+    baseline = _resident_mb()
+    started = time.perf_counter()
+    store = TrailStore(data_file, snapshot_file if mode == "snapshot" else None)
+    table = store.table
+    loaded = time.perf_counter() - started
+    # Typowe zapytanie: maska regionu i długości - dotyka tylko dwóch kolumn
+    started = time.perf_counter()
+    mask = table.region.mask_equal("Kraków") & (table.length_km <= 10)
+    matches = int(mask.sum())
+    query = time.perf_counter() - started
+    print(f"{loaded:.3f} {query:.4f} {_resident_mb() - baseline:.1f} {matches}")
+
+
+def _run_child(mode: str, data_file: str, snapshot_file: str):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_trail_snapshot", "--child", mode, data_file, snapshot_file],
+        cwd=project_root, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), float(output[1]), float(output[2]), int(output[3])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', nargs=3, metavar=("MODE", "DATA_FILE", "SNAPSHOT_FILE"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, "trails_data.json")
+        snapshot_file = os.path.join(directory, "trails_data.bin")
+        started = time.perf_counter()
+        TrailStore(data_file, snapshot_file).save(generate_trails(args.count, args.seed))
+        print(f"Trasy: {args.count}, zapis JSON + migawki: {time.perf_counter() - started:.1f} s")
+        print(f"Rozmiar: JSON {os.path.getsize(data_file) / 2 ** 20:.1f} MB, "
+              f"migawka {os.path.getsize(snapshot_file) / 2 ** 20:.1f} MB")
+
+        results = {mode: _run_child(mode, data_file, snapshot_file) for mode in ("json", "snapshot")}
+        for mode, (loaded, query, resident, matches) in results.items():
+            print(f"{mode:>8}: wczytanie {loaded * 1000:9.2f} ms, zapytanie {query * 1000:6.1f} ms, "
+                  f"pamięć rezydentna +{resident:7.1f} MB, wyników {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Memory per trail and full-scan filter time: list of dicts vs TrailTable.
+
+    python -m benchmarks.bench_trail_table --count 100000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from benchmarks.generators import generate_trails
+from data_handlers.trail_table import TrailTable
+
+
+def _traced(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def _best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Rekordy generowane z JSON-owej postaci, tak jak po wczytaniu pliku
+    trails, dict_bytes = _traced(lambda: generate_trails(args.count, args.seed))
+    table, table_bytes = _traced(lambda: TrailTable.from_records(trails))
+
+    def scan_dicts():
+        return [trail for trail in trails
+                if trail.get("region", "").lower() == "kraków" and trail.get("difficulty") == 2
+                and 5 <= trail.get("length_km", 0) <= 15 and trail.get("terrain_type") == "park"]
+
+    def scan_table():
+        mask = (table.region.mask_equal("Kraków") & (table.difficulty == 2)
+                & (table.length_km >= 5) & (table.length_km <= 15)
+                & table.terrain_type.mask_equal("park"))
+        return mask.nonzero()[0]
+
+    assert len(scan_dicts()) == len(scan_table())
+    dict_scan = _best_of(args.repeat, scan_dicts)
+    table_scan = _best_of(args.repeat, scan_table)
+
+    print(f"Trasy: {args.count}")
+    print(f"Pamięć na trasę: dict {dict_bytes / args.count:.0f} B, "
+          f"TrailTable {table_bytes / args.count:.0f} B ({dict_bytes / table_bytes:.1f}x)")
+    print(f"Pełne skanowanie z filtrem: dict {dict_scan * 1000:.2f} ms, "
+          f"TrailTable {table_scan * 1000:.2f} ms ({dict_scan / table_scan:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Best-date planning: one recommend_batch query per day vs TripPlanner's trails x dates matrix.
+
+    python -m benchmarks.bench_trip_planner --trails 50000 --days 14
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from api.weather_api import WeatherAPI
+from api.weather_cache import WeatherCache
+from benchmarks.bench_recommend_batch import _weather
+from benchmarks.generators import generate_trails
+from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_store import TrailStore
+from recommendation.trail_recommender import TrailRecommender
+from recommendation.trip_planner import TripPlanner
+
+WEIGHTS = {"trudność": 0.2, "długość": 0.2, "pogoda": 0.4, "teren": 0.2}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trails', type=int, default=50_000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--city', default="Kraków")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = TrailDataHandler(refresh_policy="never")
+            handler.store = TrailStore(os.path.join(directory, "trails_data.json"))
+            handler.store.save(generate_trails(args.trails, args.seed, regions=[args.city]))
+            # Prognozy w pamięciowym cache - pomiar nie zależy od sieci
+            handler.weather_api = WeatherAPI(cache=WeatherCache(persistent=False))
+        today = datetime.now()
+        dates = [(today + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(1, args.days + 1)]
+        for date in dates:
+            handler.weather_api.cache.put(handler.weather_api._cache_key(args.city, date), _weather(rng))
+
+        recommender = TrailRecommender(handler)
+        planner = TripPlanner(recommender)
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender.warm_up([args.city])
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                per_day = recommender.recommend_batch([{"city": args.city, "date": date, "weights": WEIGHTS,
+                                                        "limit": args.limit} for date in dates])
+            per_day_seconds = (time.perf_counter() - started) / args.repeat
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                plan = planner.plan_trips(args.city, dates[0], dates[-1], weights=WEIGHTS, limit=args.limit)
+            plan_seconds = (time.perf_counter() - started) / args.repeat
+
+    # Najlepsze pary z osobnych rekomendacji dla każdego dnia muszą się zgadzać z planem
+    pairs = [(-trail["weighted_score"], day, trail.position, trail["id"], dates[day])
+             for day, trails in enumerate(per_day) for trail in trails]
+    expected = [(trail_id, date, -score) for score, _, _, trail_id, date in sorted(pairs)[:args.limit]]
+    actual = [(trail["id"], trail["date"], trail["weighted_score"]) for trail in plan["best"]]
+
+    print(f"Trasy: {plan['trail_count']}, dni: {len(plan['dates'])}")
+    print(f"recommend_batch, jedno zapytanie na dzień: {per_day_seconds * 1000:8.1f} ms")
+    print(f"TripPlanner (macierz dni x trasy):        {plan_seconds * 1000:8.1f} ms")
+    print(f"Najlepsze pary zgodne z rekomendacjami dziennymi: {'tak' if expected == actual else 'NIE'}")
+    best = plan["best"][0]
+    print(f"Najlepsza para: {best['name']} ({best['date']}), wynik {best['weighted_score']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Seeded generators of synthetic trail records in the trails_data.json shape
+and daily weather history in the weather_data.json shape.
+"""
+import math
+import random
+from datetime import date as date_type, timedelta
+from typing import Any, Dict, List, Optional
+
+REGIONS = ["Gdańsk", "Warszawa", "Kraków", "Wrocław"]
+TERRAINS = ["riverside", "mixed", "park", "historical", "urban"]
+TAGS = ["park", "leisure", "viewpoint", "tourism", "forest", "historic", "family", "scenic"]
+
+# Przybliżone środki regionów (jak CITY_COORDINATES w config.py)
+REGION_CENTERS = {
+    "Gdańsk": (54.3520, 18.6466),
+    "Warszawa": (52.2297, 21.0122),
+    "Kraków": (50.0647, 19.9450),
+    "Wrocław": (51.1079, 17.0385),
+}
+
+# Profile regionów: udział w zbiorze tras, wagi typów terenu (w kolejności TERRAINS)
+# i średnie przewyższenie w metrach - nad morzem i w dolinach rzek płasko, pod Krakowem więcej podejść
+REGION_PROFILES = {
+    "Gdańsk": {"share": 2, "terrain": [4, 2, 3, 1, 1], "elevation": 90},
+    "Warszawa": {"share": 3, "terrain": [3, 1, 4, 2, 4], "elevation": 40},
+    "Kraków": {"share": 3, "terrain": [2, 4, 2, 3, 1], "elevation": 380},
+    "Wrocław": {"share": 2, "terrain": [4, 1, 3, 2, 2], "elevation": 160},
+}
+DEFAULT_PROFILE = {"share": 1, "terrain": [1, 1, 1, 1, 1], "elevation": 150}
+
+# Tagi typowe dla terenu (pojawiają się często); pozostałe tagi trafiają się rzadko
+TERRAIN_TAGS = {
+    "riverside": ["leisure", "scenic"],
+    "mixed": ["forest", "viewpoint"],
+    "park": ["park", "leisure", "family"],
+    "historical": ["historic", "tourism"],
+    "urban": ["tourism"],
+}
+
+# Klimat miast: średnia roczna temperatura (°C), amplituda sezonowa, szansa na dzień z opadem
+CITY_CLIMATE = {
+    "Gdańsk": (8.0, 9.0, 0.45),
+    "Warszawa": (8.5, 11.0, 0.42),
+    "Kraków": (8.7, 10.5, 0.46),
+    "Wrocław": (9.3, 10.0, 0.42),
+}
+DEFAULT_CLIMATE = (8.5, 10.0, 0.44)
+
+
+def _difficulty(length_km: float, elevation_m: float, rng: random.Random) -> int:
+    effort = length_km / 12 + elevation_m / 500 + rng.gauss(0, 0.3)
+    return 1 if effort < 0.7 else 2 if effort < 1.5 else 3
+
+
+def generate_trails(count: int, seed: int = 42, regions: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Returns `count` deterministic synthetic trails.
+
+    Regions are drawn with REGION_PROFILES shares; terrain, elevation and tags
+    follow the region and terrain, lengths are log-normal (median ~5 km) and
+    difficulty grows with length and elevation.
+    """
+    rng = random.Random(seed)
+    regions = regions or REGIONS
+    profiles = [REGION_PROFILES.get(region, DEFAULT_PROFILE) for region in regions]
+    region_positions = rng.choices(range(len(regions)), [profile["share"] for profile in profiles], k=count)
+    trails = []
+    for position, region_position in enumerate(region_positions):
+        region = regions[region_position]
+        profile = profiles[region_position]
+        center_lat, center_lon = REGION_CENTERS.get(region, (52.0, 19.0))
+        terrain = rng.choices(TERRAINS, profile["terrain"])[0]
+        length_km = min(max(rng.lognormvariate(math.log(5.0), 0.7), 0.3), 60.0)
+        elevation_m = min(rng.expovariate(1 / profile["elevation"]), 1500.0)
+        typical = TERRAIN_TAGS[terrain]
+        tags = [tag for tag in TAGS if rng.random() < (0.6 if tag in typical else 0.05)]
+        trails.append({
+            "id": str(10_000_000 + position),
+            "name": f"Szlak {region} {position}",
+            "region": region,
+            "coordinates": {"lat": round(center_lat + rng.gauss(0, 0.12), 7),
+                            "lon": round(center_lon + rng.gauss(0, 0.2), 7)},
+            "length_km": round(length_km, 2),
+            "elevation_m": round(elevation_m, 1),
+            "difficulty": _difficulty(length_km, elevation_m, rng),
+            "terrain_type": terrain,
+            "tags": tags,
+        })
+    return trails
+
+
+def generate_weather(start_date: str, end_date: str, seed: int = 42,
+                     cities: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Returns deterministic daily weather {city: {date: record}} for [start_date, end_date].
+
+    Temperatures follow a seasonal cycle with persistent day-to-day anomalies,
+    wet days cluster (a wet day makes the next one more likely) and sunshine
+    depends on day length and cloud cover.
+    """
+    rng = random.Random(seed)
+    start = date_type.fromisoformat(start_date)
+    days = (date_type.fromisoformat(end_date) - start).days + 1
+    weather = {}
+    for city in cities or REGIONS:
+        mean, amplitude, wet_chance = CITY_CLIMATE.get(city, DEFAULT_CLIMATE)
+        anomaly = 0.0
+        wet = False
+        by_date = {}
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            season = -math.cos(2 * math.pi * (day.timetuple().tm_yday - 20) / 365.25)
+            anomaly = 0.7 * anomaly + rng.gauss(0, 2.0)
+            temperature_avg = mean + amplitude * season + anomaly
+            wet = rng.random() < (min(wet_chance + 0.25, 0.9) if wet else wet_chance)
+            cloud_cover = rng.uniform(65, 100) if wet else rng.uniform(5, 75)
+            day_length = 12 + 4 * season
+            spread = 3 + 2.5 * (season + 1) + rng.uniform(-1, 1)
+            by_date[day.isoformat()] = {
+                "temperature_max": round(temperature_avg + spread / 2, 1),
+                "temperature_min": round(temperature_avg - spread / 2, 1),
+                "temperature_avg": round(temperature_avg, 1),
+                "precipitation": round(rng.expovariate(1 / 4.0), 1) if wet else 0.0,
+                "sunshine_hours": round(day_length * (1 - cloud_cover / 100) * rng.uniform(0.7, 1.0), 1),
+                "cloud_cover": round(cloud_cover),
+                "wind_speed": round(rng.gammavariate(2.0, 6.0), 1),
+            }
+        weather[city] = by_date
+    return weather
@@ -0,0 +1,214 @@
+"""
+Benchmark suite: load, filter, categorize, score, rank and export over synthetic datasets, with regression baselines.
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --output benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.2
+
+Each stage reports the best of --repeat runs (seconds). In compare mode the
+suite runs with the sizes stored in the baseline and exits with status 1 when
+any stage is slower than the baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from api.weather_history import WeatherHistoryStore
+from benchmarks.generators import REGIONS, generate_trails, generate_weather
+from data_handlers.trail_store import TrailStore
+from data_handlers.trail_table import TrailTable
+from utils.export_results import ResultExporter
+from utils.filters import TrailsFilter
+from utils.time_calculator import TimeCalculator
+from utils.trail_categorizer import TrailCategorizer
+from utils.weather_utils import WeatherUtils
+from utils.weight_calculator import WeightCalculator
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+WEIGHTS = {"trudność": 0.2, "długość": 0.3, "pogoda": 0.3, "teren": 0.2}
+# Różnice poniżej tego progu (ms) są traktowane jako szum pomiaru, nie regresja
+NOISE_FLOOR_MS = 1.0
+
+Stages = List[Tuple[str, Callable[[], object]]]
+
+
+def _best_of(repeat: int, function: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _trail_stages(size: int, seed: int, directory: str) -> Stages:
+    """Etapy dla zbioru `size` tras; pliki danych i eksportu trafiają do `directory`."""
+    data_file = os.path.join(directory, f"trails_{size}.json")
+    snapshot_file = os.path.join(directory, f"trails_{size}.bin")
+    with contextlib.redirect_stdout(io.StringIO()):
+        TrailStore(data_file, snapshot_file).save(generate_trails(size, seed))
+    records = TrailStore(data_file).trails
+    table = TrailTable.from_records(records)
+
+    calculator = WeightCalculator()
+    calculator.set_weights(WEIGHTS)
+    weather = generate_weather("2024-06-01", "2024-06-01", seed)[REGIONS[0]]["2024-06-01"]
+    comfort = np.full(len(table), WeatherUtils.calculate_hiking_comfort(weather))
+    export_rows = max(1, size // 100)
+    exported = [dict(trail) for trail in calculator.rank_trails(table, limit=export_rows, comfort_index=comfort)]
+    query = dict(region="Kraków", min_length=3.0, max_length=15.0, difficulty=2)
+
+    return [
+        ("load_json", lambda: TrailStore(data_file).trails),
+        ("load_snapshot", lambda: TrailStore(data_file, snapshot_file).table),
+        ("filter_table", lambda: TrailsFilter.filter_by_criteria(table, **query)),
+        ("filter_records", lambda: TrailsFilter.filter_by_criteria(records, **query)),
+        ("categorize", lambda: [(TrailCategorizer.categorize(trail), TimeCalculator.calculate_time(trail))
+                                for trail in records]),
+        ("score", lambda: calculator.score_trails(table, comfort)),
+        ("rank_top20", lambda: calculator.rank_trails(table, limit=20, comfort_index=comfort)),
+        ("sort_records", lambda: calculator.sort_trails_by_weights(records, weather)),
+        # 1% najlepszych tras do TXT/JSON/CSV
+        ("export", lambda: ResultExporter.write_file_set([("Kraków", "2024-06-01", exported, weather)])),
+    ]
+
+
+def _weather_stages(years: int, seed: int, directory: str) -> Stages:
+    """Etapy dla historii pogody z `years` lat dla wszystkich regionów."""
+    data_file = os.path.join(directory, f"weather_{years}y.json")
+    end_year = 2024
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(generate_weather(f"{end_year - years + 1}-01-01", f"{end_year}-12-31", seed), f)
+    store = WeatherHistoryStore(data_file)
+    rng = random.Random(seed)
+    lookups = [(rng.choice(REGIONS), f"{rng.randint(end_year - years + 1, end_year)}-"
+                                     f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+               for _ in range(10_000)]
+
+    return [
+        ("load", lambda: WeatherHistoryStore(data_file).cities()),
+        ("nearest_10k", lambda: [store.get_nearest(city, date) for city, date in lookups]),
+        ("range_month_10k", lambda: [store.get_range(city, date[:8] + "01", date[:8] + "28")
+                                     for city, date in lookups]),
+    ]
+
+
+def run_suite(sizes: List[int], years: List[int], repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        # ResultExporter zapisuje pliki w katalogu bieżącym
+        os.chdir(directory)
+        try:
+            groups = [(f"trails_{size}", _trail_stages, size) for size in sizes]
+            groups += [(f"weather_{count}y", _weather_stages, count) for count in years]
+            for name, build, parameter in groups:
+                started = time.perf_counter()
+                stages = build(parameter, seed, directory)
+                print(f"{name}: przygotowanie danych {time.perf_counter() - started:.1f} s")
+                results[name] = {}
+                for stage, function in stages:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        seconds = _best_of(repeat, function)
+                    results[name][stage] = seconds
+                    print(f"  {stage:<16} {seconds * 1000:10.2f} ms")
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def compare(baseline: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Drukuje porównanie z bazą i zwraca listę regresji ("grupa/etap")."""
+    regressions = []
+    print(f"{'etap':<34} {'baza ms':>10} {'teraz ms':>10} {'zmiana':>8}")
+    for group, stages in current.items():
+        for stage, seconds in stages.items():
+            previous = baseline.get(group, {}).get(stage)
+            if previous is None:
+                print(f"{group + '/' + stage:<34} {'-':>10} {seconds * 1000:10.2f}      nowy")
+                continue
+            change = seconds / previous - 1 if previous > 0 else 0.0
+            slower = change > threshold and (seconds - previous) * 1000 > NOISE_FLOOR_MS
+            marker = "  REGRESJA" if slower else ""
+            if slower:
+                regressions.append(f"{group}/{stage}")
+            print(f"{group + '/' + stage:<34} {previous * 1000:10.2f} {seconds * 1000:10.2f} "
+                  f"{change * 100:+7.1f}%{marker}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', help=f'Liczby tras (domyślnie {DEFAULT_SIZES})')
+    parser.add_argument('--weather-years', type=int, nargs='+', help='Lata historii pogody (domyślnie 5)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help=f'Plik wyników JSON (bez --compare domyślnie {DEFAULT_BASELINE})')
+    parser.add_argument('--compare', metavar='BASELINE', help='Porównaj z zapisaną bazą i zgłoś regresje')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Dopuszczalne spowolnienie względem bazy (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Błąd podczas wczytywania bazy wyników: {e}")
+            sys.exit(2)
+        meta = baseline.get("meta", {})
+        sizes = args.sizes or meta.get("sizes") or DEFAULT_SIZES
+        years = args.weather_years or meta.get("weather_years") or [5]
+        if meta.get("seed", args.seed) != args.seed:
+            print(f"Uwaga: baza wyników powstała z innym ziarnem ({meta.get('seed')})")
+    else:
+        sizes = args.sizes or DEFAULT_SIZES
+        years = args.weather_years or [5]
+
+    results = run_suite(sizes, years, args.repeat, args.seed)
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()}",
+            "sizes": sizes,
+            "weather_years": years,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    output = args.output or (None if args.compare else DEFAULT_BASELINE)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Zapisano wyniki do {output}")
+
+    if baseline is not None:
+        regressions = compare(baseline.get("results", {}), results, args.threshold)
+        if regressions:
+            print(f"Regresje powyżej {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print("Brak regresji")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,53 @@
 """
 Configuration settings for the trail recommendation system.
 """
+import os
 from typing import Dict
 
-# API Endpoints
-OPEN_METEO_API = "https://api.open-meteo.com/v1"
-OVERPASS_API = "https://overpass-api.de/api/interpreter"
+# API Endpoints (overridable through the environment, e.g. to point at api/stub_upstream.py)
+OPEN_METEO_API = os.environ.get("P3XD_OPEN_METEO_API", "https://api.open-meteo.com/v1")
+OVERPASS_API = os.environ.get("P3XD_OVERPASS_API", "https://overpass-api.de/api/interpreter")
+
+# Overpass fetch settings (concurrent regions, retries with exponential backoff)
+OVERPASS_MAX_CONCURRENCY = 4
+OVERPASS_MAX_RETRIES = 4
+OVERPASS_BACKOFF_SECONDS = 1.0
+OVERPASS_TIMEOUT_SECONDS = 90
+# Server-side limit of one Overpass query ([timeout:...]) and the number of element
+# ids per query when downloading changed elements
+OVERPASS_QUERY_TIMEOUT = 25
+OVERPASS_IDS_PER_QUERY = 500
+
+# DataStorage: the JSONL change log of a cache file is merged into the base JSON
+# file once it grows beyond the base file size (but not before this many bytes)
+STORAGE_COMPACTION_MIN_BYTES = 256 * 1024
+
+# DataStorage eviction: files not written for CACHE_MAX_AGE_HOURS are removed, then the
+# least recently used files until the directory fits in CACHE_MAX_BYTES (None disables
+# a limit); the policy and the hit/miss/byte counters run every CACHE_MAINTENANCE_INTERVAL_SECONDS
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_AGE_HOURS = 7 * 24
+CACHE_MAINTENANCE_INTERVAL_SECONDS = 300
+
+# Weather cache: in-process LRU with per-entry TTL, persisted in DATA_DIR/WEATHER_CACHE_FILE
+WEATHER_CACHE_DIR = "data"
+WEATHER_CACHE_FILE = "weather_cache.json"
+WEATHER_CACHE_MAX_ENTRIES = 1024
+WEATHER_CACHE_FORECAST_TTL_HOURS = 3
+
+# Historical weather: max distance (in days) of the nearest stored date used
+# when the requested date is missing from api/weather_data.json
+WEATHER_HISTORY_TOLERANCE_DAYS = 3
+
+# Result export: formats written for each recommendation run ("txt", "json", "csv")
+# and the size of the background writer queue
+EXPORT_FORMATS = ("txt", "json", "csv")
+EXPORT_QUEUE_SIZE = 64
+
+# Trip planner (recommendation/trip_planner.py): longest date window scored at once
+# and the default number of returned (trail, date) pairs and trails with their best day
+PLANNER_MAX_DAYS = 31
+PLANNER_DEFAULT_LIMIT = 10
 
 # City coordinates for weather data
 CITY_COORDINATES: Dict[str, Dict[str, float]] = {
@@ -15,6 +57,50 @@ CITY_COORDINATES: Dict[str, Dict[str, float]] = {
     "Wrocław": {"lat": 51.1079, "lon": 17.0385}
 }
 
+# Trail data refresh policy used by TrailDataHandler at start-up:
+# "never"      - serve the existing api/trails_data.json snapshot only
+# "ttl"        - refresh in the background when the snapshot is older than TRAILS_REFRESH_TTL_HOURS
+# "background" - always refresh in the background after serving the snapshot
+TRAILS_REFRESH_POLICY = "ttl"
+TRAILS_REFRESH_TTL_HOURS = 24
+
+# Incremental trail ingest (api/trail_ingest.py): a region is the square of
+# TRAILS_REGION_RADIUS_KM around its CITY_COORDINATES entry, split into tiles of
+# TRAILS_TILE_KM that are queried and retried independently. Element versions are
+# kept in TRAILS_INGEST_STATE_FILE and only new or changed elements are downloaded
+# in full; every TRAILS_FULL_REFRESH_DAYS all elements are reprocessed, because
+# moving a node does not change the version of its way or relation
+TRAILS_REGION_RADIUS_KM = 20.0
+TRAILS_TILE_KM = 10.0
+TRAILS_INGEST_STATE_FILE = "api/trails_ingest_state.json"
+TRAILS_FULL_REFRESH_DAYS = 30
+
+# Merging the regions' trails (data_handlers/trail_merge.py): duplicates share an OSM id
+# and name, or a name with the same length or starting point; lengths are compared
+# rounded to TRAILS_MERGE_LENGTH_DECIMALS (km) and starting points to
+# TRAILS_MERGE_COORD_DECIMALS (degrees, 3 ~ 100 m)
+TRAILS_MERGE_LENGTH_DECIMALS = 2
+TRAILS_MERGE_COORD_DECIMALS = 3
+
+# Binary, memory-mapped snapshot of api/trails_data.json used for the columnar
+# trail table (rebuilt automatically when stale); None disables it
+TRAILS_SNAPSHOT_FILE = "api/trails_data.bin"
+
+# Spatial index over trail coordinates (radius, bounding-box and nearest-trail queries):
+# side of a grid cell in kilometres
+SPATIAL_INDEX_CELL_KM = 5.0
+
+# HTTP service (server.py): bind address, worker threads for scoring and data access,
+# and the number of most recent requests per endpoint used for the latency percentiles
+SERVER_HOST = os.environ.get("P3XD_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("P3XD_SERVER_PORT", "8080"))
+SERVER_WORKERS = int(os.environ.get("P3XD_SERVER_WORKERS", "4"))
+SERVER_LATENCY_WINDOW = 10000
+
+# Console output detail level (utils/profiling.py); 2 and above also prints every
+# processed trail (main.py -v)
+VERBOSITY = int(os.environ.get("P3XD_VERBOSITY", "1"))
+
 # Overpass API query template
 OVERPASS_QUERY_TEMPLATE = """
 [out:json][timeout:25];
@@ -1,8 +1,10 @@
-"""
-Data handlers for trail and weather information.
-"""
-
-from .trail_data import TrailDataHandler
-from .weather_data import WeatherDataHandler
-
-__all__ = ['TrailDataHandler', 'WeatherDataHandler'] 
\ No newline at end of file
+"""
+Data handlers for trail and weather information.
+"""
+
+from .trail_data import TrailDataHandler
+from .weather_data import WeatherDataHandler
+from .trail_store import TrailStore
+from .trail_table import TrailTable, TrailRow
+
+__all__ = ['TrailDataHandler', 'WeatherDataHandler', 'TrailStore', 'TrailTable', 'TrailRow'] 
\ No newline at end of file
@@ -1,61 +1,128 @@
 import json
 from functools import reduce
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 import os
 import sys
+import threading
 from datetime import datetime
 
+import numpy as np
+
 # Dodaj katalog projektu do ścieżki Pythona
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
+from api.trail_ingest import TrailIngest
 from api.trails_api import TrailsAPI
 from api.weather_api import WeatherAPI
-from config import CITY_COORDINATES
+from config import (CITY_COORDINATES, TRAILS_REFRESH_POLICY, TRAILS_REFRESH_TTL_HOURS,
+                    TRAILS_SNAPSHOT_FILE)
+from data_handlers.trail_merge import TrailMerger, merge_trails, trail_regions
+from data_handlers.trail_store import TrailStore, normalize_key
+from data_handlers.trail_table import TrailTable
+from utils.profiling import span, timed
+from utils.spatial_index import HALF_CIRCUMFERENCE_KM
+
+# Punkt środkowy zapytań przestrzennych: {"lat": ..., "lon": ...} (jak CITY_COORDINATES) lub (lat, lon)
+Center = Union[Dict[str, float], Tuple[float, float]]
 
 class TrailDataHandler:
-    def __init__(self):
+    REFRESH_POLICIES = ("never", "ttl", "background")
+
+    def __init__(self, refresh_policy: Optional[str] = None,
+                 refresh_ttl_hours: Optional[float] = None):
         self.api = TrailsAPI()
+        self.ingest = TrailIngest(self.api)
         self.weather_api = WeatherAPI()
         self.data_file = "api/trails_data.json"
-        print("Pobieranie danych o szlakach z API...")
-        self._update_trails_data()
-        self.trails_data = self._load_trails_data()
-
-    def _load_trails_data(self) -> List[Dict[str, Any]]:
-        """Load trails data from JSON file."""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Błąd podczas wczytywania danych o trasach: {e}")
-            return []
-
+        self.snapshot_file = TRAILS_SNAPSHOT_FILE
+        self.store = TrailStore(self.data_file, self.snapshot_file)
+        self._city_keys = {normalize_key(city) for city in CITY_COORDINATES}
+        self.refresh_policy = refresh_policy or TRAILS_REFRESH_POLICY
+        if self.refresh_policy not in self.REFRESH_POLICIES:
+            raise ValueError(f"Nieznana polityka odświeżania danych: {self.refresh_policy}")
+        self.refresh_ttl_hours = (TRAILS_REFRESH_TTL_HOURS if refresh_ttl_hours is None
+                                  else refresh_ttl_hours)
+        self._refresh_lock = threading.Lock()
+        self.refresh_thread: Optional[threading.Thread] = None
+        self._start_refresh()
+
+    @property
+    def trails_data(self) -> List[Dict[str, Any]]:
+        """All trails loaded from the data file (parsed once, shared)."""
+        return self.store.trails
+
+    def _start_refresh(self):
+        """Serve the existing snapshot and refresh it according to the policy."""
+        age = self.store.age_seconds()
+        if self.refresh_policy == "never":
+            return
+        if age is None:
+            # Brak migawki - nie ma czego serwować, więc pobieramy dane od razu
+            print("Pobieranie danych o szlakach z API...")
+            self._update_trails_data()
+            return
+        if self.refresh_policy == "ttl" and age < self.refresh_ttl_hours * 3600:
+            return
+        self.refresh_in_background()
+
+    def refresh_in_background(self) -> Optional[threading.Thread]:
+        """Start a background refresh unless one is already running."""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return self.refresh_thread
+        print("Odświeżanie danych o szlakach w tle...")
+        self.refresh_thread = threading.Thread(target=self._update_trails_data,
+                                               name="trails-refresh", daemon=True)
+        self.refresh_thread.start()
+        return self.refresh_thread
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running background refresh; returns True when none is running."""
+        if self.refresh_thread is None:
+            return True
+        self.refresh_thread.join(timeout)
+        return not self.refresh_thread.is_alive()
+
+    @timed("trails.update")
     def _update_trails_data(self):
         """Update trails data by fetching from API and saving to file."""
-        print("Aktualizacja danych o szlakach...")
-        all_trails = []
-        
-        # Get trails for all regions
-        for region in CITY_COORDINATES.keys():
-            print(f"\nPobieranie szlaków dla regionu: {region}")
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            print("Aktualizacja danych o szlakach...")
+            previous = self.store.trails
+            all_trails = []
+
+            # Get trails for all regions (tiled, only new or changed elements are downloaded)
+            results = self.ingest.refresh(CITY_COORDINATES.keys())
+            for region, result in results.items():
+                if result.ok:
+                    # Także pusta lista - region, z którego usunięto wszystkie trasy, nie ma już tras
+                    all_trails.extend(result.trails)
+                else:
+                    # Nieudane pobranie nie może nadpisać poprzednich danych regionu
+                    kept = [trail for trail in previous
+                            if normalize_key(region) in map(normalize_key, trail_regions(trail))]
+                    all_trails.extend(kept)
+                    if kept:
+                        print(f"Zachowano {len(kept)} poprzednich szlaków dla {region}")
+
+            print(f"\nŁącznie znaleziono {len(all_trails)} szlaków")
+
+            # Ta sama trasa jako relacja i jej drogi oraz z kilku regionów - jeden rekord z listą regionów
+            merger = TrailMerger()
+            with span("trails.merge"):
+                all_trails = merge_trails(all_trails, merger)
+            print(merger.summary())
+
+            # Save to trails_data.json
             try:
-                trails = self.api.get_hiking_trails(region)
-                if trails:
-                    all_trails.extend(trails)
-                    print(f"Znaleziono {len(trails)} szlaków dla {region}")
+                self.store.save(all_trails)
+                print("Dane o szlakach zostały zapisane do pliku trails_data.json")
             except Exception as e:
-                print(f"Błąd podczas pobierania szlaków dla {region}: {e}")
-
-        print(f"\nŁącznie znaleziono {len(all_trails)} szlaków")
-
-        # Save to trails_data.json
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(all_trails, f, ensure_ascii=False, indent=2)
-            print("Dane o szlakach zostały zapisane do pliku trails_data.json")
-        except Exception as e:
-            print(f"Błąd podczas zapisywania danych o szlakach: {e}")
+                print(f"Błąd podczas zapisywania danych o szlakach: {e}")
+        finally:
+            self._refresh_lock.release()
 
     def _validate_trail(self, trail: Any) -> Dict[str, Any]:
         """Validate and format trail data."""
@@ -90,86 +157,137 @@ class TrailDataHandler:
         return default_trail
 
     def get_trails(self) -> List[Dict[str, Any]]:
-        """Get all available trails."""
+        """Get all available trails (a trail merged from several cities is returned once)."""
         all_trails = []
+        seen = set()
         for city in CITY_COORDINATES.keys():
             city_trails = self.get_trails_for_city(city)
-            all_trails.extend(trail for trail in city_trails if trail is not None)
+            for trail in city_trails:
+                if trail is not None and id(trail) not in seen:
+                    seen.add(id(trail))
+                    all_trails.append(trail)
         return all_trails
 
+    @timed("trails.city")
     def get_trails_for_city(self, city: str) -> List[Dict[str, Any]]:
         """Get trails for a specific city from the data file."""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_trails = json.load(f)
-                city_trails = [trail for trail in all_trails if trail.get("region", "").lower() == city.lower()]
-                print(f"Znaleziono {len(city_trails)} szlaków dla miasta {city}")
-                return city_trails
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Błąd podczas wczytywania danych o szlakach: {e}")
-            return []
+        city_trails = self.store.get_by_region(city)
+        print(f"Znaleziono {len(city_trails)} szlaków dla miasta {city}")
+        return city_trails
+
+    @timed("trails.table")
+    def get_trail_table(self, city: Optional[str] = None, center: Optional[Center] = None,
+                        radius_km: Optional[float] = None) -> TrailTable:
+        """
+        Get trails (all or for one city) as a columnar TrailTable.
+
+        With `radius_km` the table holds the trails within that distance of
+        `center` (by default the coordinates of `city`) instead of the
+        trails whose region matches the city.
+        """
+        if radius_km is None:
+            return self.store.get_table(city)
+        table = self.store.table
+        lat, lon = self.get_center(city, center)
+        positions, _ = self.store.get_spatial_index(table).within_radius(lat, lon, radius_km)
+        return table.take(positions)
+
+    @staticmethod
+    def get_center(city: Optional[str] = None, center: Optional[Center] = None) -> Tuple[float, float]:
+        """(lat, lon) of `center`, or of `city` from CITY_COORDINATES when no center is given."""
+        if center is not None:
+            if isinstance(center, dict):
+                return float(center["lat"]), float(center["lon"])
+            lat, lon = center
+            return float(lat), float(lon)
+        for name, coordinates in CITY_COORDINATES.items():
+            if normalize_key(name) == normalize_key(city):
+                return coordinates["lat"], coordinates["lon"]
+        raise ValueError(f"Brak współrzędnych dla miasta: {city}")
+
+    @timed("trails.near")
+    def get_trails_near(self, city: Optional[str] = None, center: Optional[Center] = None,
+                        radius_km: Optional[float] = None,
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get trails around a point, nearest first, with `distance_km` added.
+
+        `radius_km` alone returns every trail within that distance, `limit`
+        alone the `limit` nearest trails, both - the nearest trails within
+        the radius. The point defaults to the coordinates of `city`.
+        """
+        if radius_km is None and limit is None:
+            raise ValueError("Podaj promień wyszukiwania (radius_km) lub liczbę tras (limit)")
+        table = self.store.table
+        index = self.store.get_spatial_index(table)
+        lat, lon = self.get_center(city, center)
+        if limit is None:
+            positions, distances = index.within_radius(lat, lon, radius_km)
+            order = np.lexsort((positions, distances))
+            positions, distances = positions[order], distances[order]
+        else:
+            positions, distances = index.nearest(
+                lat, lon, limit, HALF_CIRCUMFERENCE_KM if radius_km is None else radius_km)
+
+        trails = []
+        for position, distance in zip(positions.tolist(), distances.tolist()):
+            trail = table.record(position)
+            trail["distance_km"] = round(distance, 2)
+            trails.append(trail)
+        print(f"Znaleziono {len(trails)} szlaków w pobliżu punktu ({lat:.4f}, {lon:.4f})")
+        return trails
+
+    @timed("trails.bbox")
+    def get_trails_in_bbox(self, min_lat: float, min_lon: float,
+                           max_lat: float, max_lon: float) -> List[Dict[str, Any]]:
+        """Get trails whose coordinates lie in the bounding box (file order)."""
+        table = self.store.table
+        positions = self.store.get_spatial_index(table).within_bbox(min_lat, min_lon, max_lat, max_lon)
+        print(f"Znaleziono {len(positions)} szlaków w zadanym obszarze")
+        return [table.record(position) for position in positions.tolist()]
 
     def get_trail_by_id(self, trail_id: str) -> Dict[str, Any]:
         """Get a specific trail by its ID from the data file."""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_trails = json.load(f)
-                for trail in all_trails:
-                    if trail.get("id") == trail_id:
-                        return trail
-                return None
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Błąd podczas wczytywania danych o szlakach: {e}")
-            return None
+        return self.store.get_by_id(trail_id)
 
     def get_trails_by_difficulty(self, difficulty: int) -> List[Dict[str, Any]]:
         """Get trails with specific difficulty level from the data file."""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_trails = json.load(f)
-                difficulty_trails = [trail for trail in all_trails if trail.get("difficulty") == difficulty]
-                print(f"Znaleziono {len(difficulty_trails)} szlaków o trudności {difficulty}")
-                return difficulty_trails
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Błąd podczas wczytywania danych o szlakach: {e}")
-            return []
+        difficulty_trails = self.store.get_by_difficulty(difficulty)
+        print(f"Znaleziono {len(difficulty_trails)} szlaków o trudności {difficulty}")
+        return difficulty_trails
 
     def get_trails_by_terrain(self, terrain_type: str) -> List[Dict[str, Any]]:
         """Get trails with specific terrain type from the data file."""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_trails = json.load(f)
-                terrain_trails = [trail for trail in all_trails if trail.get("terrain_type", "").lower() == terrain_type.lower()]
-                print(f"Znaleziono {len(terrain_trails)} szlaków o typie terenu {terrain_type}")
-                return terrain_trails
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Błąd podczas wczytywania danych o szlakach: {e}")
-            return []
+        terrain_trails = self.store.get_by_terrain(terrain_type)
+        print(f"Znaleziono {len(terrain_trails)} szlaków o typie terenu {terrain_type}")
+        return terrain_trails
+
+    def _is_city_trail(self, trail: Dict[str, Any]) -> bool:
+        """Check whether a trail belongs to one of the configured cities."""
+        return any(normalize_key(region) in self._city_keys for region in trail_regions(trail))
 
     def filter_by_region(self, region: str) -> List[Dict[str, Any]]:
         """Filter trails by region."""
-        return [trail for trail in self.get_trails() 
-                if isinstance(trail, dict) and 
-                trail.get('region', '').lower() == region.lower()]
+        if normalize_key(region) not in self._city_keys:
+            return []
+        return self.store.get_by_region(region)
 
     def filter_by_length(self, min_length: float, max_length: float) -> List[Dict[str, Any]]:
         """Filter trails by length range."""
-        return [trail for trail in self.get_trails()
-                if isinstance(trail, dict) and
-                min_length <= trail.get('length_km', 0) <= max_length]
+        return [trail for trail in self.store.get_by_length(min_length, max_length)
+                if self._is_city_trail(trail)]
 
     def filter_by_difficulty(self, difficulty: int) -> List[Dict[str, Any]]:
         """Filter trails by difficulty level."""
-        return [trail for trail in self.get_trails()
-                if isinstance(trail, dict) and
-                trail.get('difficulty') == difficulty]
+        return [trail for trail in self.store.get_by_difficulty(difficulty)
+                if self._is_city_trail(trail)]
 
     def get_average_length(self) -> float:
         """Calculate average length of all trails."""
-        trails = [trail for trail in self.get_trails() if isinstance(trail, dict)]
-        if not trails:
+        count = sum(self.store.count_by_region(city) for city in CITY_COORDINATES)
+        if not count:
             return 0
-        return sum(trail.get('length_km', 0) for trail in trails) / len(trails)
+        return sum(self.store.length_sum_by_region(city) for city in CITY_COORDINATES) / count
 
     def save_trails(self, filename: str):
         """Save all trails to a JSON file."""
@@ -189,7 +307,7 @@ class TrailDataHandler:
                 print(f"Brak danych pogodowych dla {city} na dzień {date}")
                 return []
             
-            # Calculate hiking comfort index
+            # Calculate hiking comfort index (once - it depends only on the weather)
             from utils.weather_utils import WeatherUtils
             comfort_index = WeatherUtils.calculate_hiking_comfort(weather)
 
@@ -213,7 +331,7 @@ class TrailDataHandler:
                 
                 # Add comfort index to trail data
                 trail_with_comfort = trail.copy()
-                trail_with_comfort['comfort_index'] = WeatherUtils.calculate_hiking_comfort(weather)
+                trail_with_comfort['comfort_index'] = comfort_index
                 filtered_trails.append(trail_with_comfort)
 
             print(f"Znaleziono {len(filtered_trails)} szlaków spełniających kryteria pogodowe")
@@ -235,7 +353,7 @@ class TrailDataHandler:
         """Get trails filtered by all criteria."""
         try:
             # Filter trails by city
-            city_trails = [trail for trail in self.trails_data if trail.get('region', '').lower() == city.lower()]
+            city_trails = self.store.get_by_region(city)
             print(f"Znaleziono {len(city_trails)} szlaków dla miasta {city}")
 
             if not city_trails:
@@ -249,34 +367,17 @@ class TrailDataHandler:
                 print(f"Brak danych pogodowych dla {city} na dzień {date}")
                 return []
 
-            # Filter trails by all criteria
-            filtered_trails = []
-            for trail in city_trails:
-                # Check difficulty
-                if difficulty is not None and trail.get('difficulty') != difficulty:
-                    continue
-
-                # Check terrain type
-                if terrain_type and trail.get('terrain_type', '').lower() != terrain_type.lower():
-                    continue
-
-                # Check length
-                if min_length is not None and trail.get('length_km', 0) < min_length:
-                    continue
-                if max_length is not None and trail.get('length_km', 0) > max_length:
-                    continue
-
-                # Check weather conditions
-                if max_precipitation is not None and weather.get('precipitation', 0) > max_precipitation:
-                    continue
-                if min_temperature is not None and weather.get('temperature_min', 0) < min_temperature:
-                    continue
-                if max_temperature is not None and weather.get('temperature_max', 0) > max_temperature:
-                    continue
-                if min_sunshine is not None and weather.get('sunshine_hours', 0) < min_sunshine:
-                    continue
-
-                filtered_trails.append(trail)
+            # Trail criteria in a single compiled pass, weather criteria checked once
+            from utils.filters import TrailCriteria, TrailsFilter
+            criteria = TrailCriteria(difficulty=difficulty, terrain_type=terrain_type or None,
+                                     min_length=min_length, max_length=max_length)
+            filtered_trails = TrailsFilter.filter_by_weather(
+                criteria.apply(city_trails), weather,
+                max_precipitation=max_precipitation,
+                min_temperature=min_temperature,
+                max_temperature=max_temperature,
+                min_sunshine=min_sunshine
+            )
 
             if not filtered_trails:
                 print("Nie znaleziono tras spełniających podane kryteria")
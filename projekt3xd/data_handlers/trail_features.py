@@ -0,0 +1,33 @@
+from typing import Any, Dict, List
+
+from utils.time_calculator import TimeCalculator
+from utils.trail_categorizer import TrailCategorizer
+
+# Wersja reguł, którymi policzono zapisane pola pochodne (kategoria.czas)
+FEATURES_RULES_VERSION = f"{TrailCategorizer.RULES_VERSION}.{TimeCalculator.RULES_VERSION}"
+
+# Pola pochodne zapisywane w rekordzie trasy obok danych źródłowych
+DERIVED_FIELDS = ("category", "estimated_time", "rules_version")
+
+
+def is_current(trail: Dict[str, Any]) -> bool:
+    """True, gdy pola pochodne trasy policzono aktualną wersją reguł."""
+    return trail.get("rules_version") == FEATURES_RULES_VERSION
+
+
+def precompute_trail_features(trails: List[Dict[str, Any]]) -> int:
+    """
+    Uzupełnia w miejscu kategorię i szacowany czas przejścia tras.
+
+    Przeliczane są tylko rekordy bez pól pochodnych lub policzone starszą
+    wersją reguł (FEATURES_RULES_VERSION). Zwraca liczbę zmienionych tras.
+    """
+    updated = 0
+    for trail in trails:
+        if not isinstance(trail, dict) or is_current(trail):
+            continue
+        trail["category"] = TrailCategorizer.categorize(trail)
+        trail["estimated_time"] = TimeCalculator.calculate_time(trail)
+        trail["rules_version"] = FEATURES_RULES_VERSION
+        updated += 1
+    return updated
@@ -0,0 +1,176 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import TRAILS_MERGE_COORD_DECIMALS, TRAILS_MERGE_LENGTH_DECIMALS
+from data_handlers.trail_table import normalize_key, trail_regions
+
+# Zaokrąglanie przez mnożenie i round() bez miejsc po przecinku jest kilka razy szybsze od round(x, n)
+_LENGTH_SCALE = 10.0 ** TRAILS_MERGE_LENGTH_DECIMALS
+_COORD_SCALE = 10.0 ** TRAILS_MERGE_COORD_DECIMALS
+
+
+def trail_fingerprints(trail: Dict[str, Any], name: Optional[str] = None) -> List[int]:
+    """
+    Geometry/name fingerprints of a trail: name + rounded length and
+    name + rounded starting point (when the trail has coordinates).
+    """
+    if name is None:
+        name = normalize_key(trail.get("name"))
+    if not name:
+        return []
+    fingerprints = []
+    length = trail.get("length_km")
+    if length:
+        fingerprints.append(hash(("length", name, round(float(length) * _LENGTH_SCALE))))
+    coordinates = trail.get("coordinates")
+    if isinstance(coordinates, dict):
+        lat, lon = coordinates.get("lat"), coordinates.get("lon")
+        if lat is not None and lon is not None:
+            fingerprints.append(hash(("start", name, round(float(lat) * _COORD_SCALE),
+                                      round(float(lon) * _COORD_SCALE))))
+    return fingerprints
+
+
+def _preference(trail: Dict[str, Any]) -> tuple:
+    # Kanoniczny rekord: ze współrzędnymi, potem najdłuższy (relacja jest
+    # zwykle dłuższa od swoich dróg); przy remisie wygrywa pierwszy
+    return (trail.get("coordinates") is not None, trail.get("length_km") or 0)
+
+
+class TrailMerger:
+    """
+    Merges trails fetched for several regions into one list without duplicates.
+
+    Overpass returns the same route both as a relation and as its member
+    ways, and neighbouring regions return the same elements. Two records
+    are duplicates when they share the OSM id and name, or the name and the
+    length or starting point (trail_fingerprints). Matching is transitive:
+    groups are kept in a union-find over input positions, so records joined
+    through different keys end up in one group.
+
+    Each group becomes one canonical record (the preferred copy) whose
+    `region` is the first region it was found in; `regions` lists all of
+    them and is present only for trails found in more than one region.
+    Unique records are returned as they are, without copying.
+
+    The key sets are dicts of 64-bit hashes mapped to input positions, so
+    millions of records cost tens of bytes per key instead of key tuples;
+    at this size a hash collision (a false merge) has a probability of the
+    order of 1e-6.
+    """
+
+    def __init__(self):
+        self._trails: List[Dict[str, Any]] = []
+        self._parent: List[int] = []
+        self._by_id: Dict[int, int] = {}
+        self._by_fingerprint: Dict[int, int] = {}
+        self.duplicates_by_id = 0
+        self.duplicates_by_fingerprint = 0
+
+    def _find(self, position: int) -> int:
+        parent = self._parent
+        while parent[position] != position:
+            # Skracanie ścieżki o połowę
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    def _union(self, first: int, second: int) -> bool:
+        first, second = self._find(first), self._find(second)
+        if first == second:
+            return False
+        # Korzeniem zostaje najwcześniejsza pozycja - zachowuje kolejność wejścia
+        if second < first:
+            first, second = second, first
+        self._parent[second] = first
+        return True
+
+    def add(self, trail: Dict[str, Any]) -> None:
+        self.extend((trail,))
+
+    def extend(self, trails: Iterable[Dict[str, Any]]) -> None:
+        # Lokalne referencje w pętli - przy milionach rekordów liczy się każde wyszukanie atrybutu
+        records = self._trails
+        parent = self._parent
+        id_setdefault = self._by_id.setdefault
+        fingerprint_setdefault = self._by_fingerprint.setdefault
+        for trail in trails:
+            if not isinstance(trail, dict):
+                continue
+            position = len(records)
+            records.append(trail)
+            parent.append(position)
+
+            # Ten sam identyfikator OSM i nazwa (relacja i droga mogą mieć ten sam numer)
+            name = normalize_key(trail.get("name"))
+            other = id_setdefault(hash((str(trail.get("id")), name)), position)
+            if other != position:
+                # Nowa pozycja jest jeszcze osobną grupą - wystarczy ją podpiąć
+                parent[position] = self._find(other)
+                self.duplicates_by_id += 1
+            for fingerprint in trail_fingerprints(trail, name):
+                other = fingerprint_setdefault(fingerprint, position)
+                if other != position and self._union(other, position):
+                    self.duplicates_by_fingerprint += 1
+
+    def _canonical(self, position: int, following: List[int]) -> Dict[str, Any]:
+        trails = []
+        while position >= 0:
+            trails.append(self._trails[position])
+            position = following[position]
+        regions: Dict[str, None] = {}
+        for trail in trails:
+            regions.update(dict.fromkeys(trail_regions(trail)))
+        canonical = dict(max(trails, key=_preference))
+        canonical.pop("regions", None)
+        regions = list(regions)
+        if regions:
+            canonical["region"] = regions[0]
+        if len(regions) > 1:
+            canonical["regions"] = regions
+        return canonical
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Canonical records in the order of their first occurrence."""
+        # Rodzic ma zawsze mniejszą pozycję niż dziecko, więc korzenie liczymy w jednym
+        # przebiegu. Członkowie grupy tworzą listę jednokierunkową w tablicy liczb
+        # (following), a nie osobne listy - przy milionach grup to mniej obiektów dla GC.
+        roots = self._parent[:]
+        following = [-1] * len(roots)
+        last: Dict[int, int] = {}
+        for position, parent in enumerate(roots):
+            if parent != position:
+                root = roots[position] = roots[parent]
+                following[last.get(root, root)] = position
+                last[root] = position
+
+        merged = []
+        for position, root in enumerate(roots):
+            if root != position:
+                continue
+            trail = self._trails[position]
+            if following[position] >= 0 or "regions" in trail:
+                trail = self._canonical(position, following)
+            merged.append(trail)
+        return merged
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "input": len(self._trails),
+            "output": len(self._trails) - self.duplicates_by_id - self.duplicates_by_fingerprint,
+            "duplicates_by_id": self.duplicates_by_id,
+            "duplicates_by_fingerprint": self.duplicates_by_fingerprint,
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"Po usunięciu duplikatów: {stats['output']} z {stats['input']} szlaków "
+                f"(ten sam identyfikator: {stats['duplicates_by_id']}, "
+                f"ta sama nazwa i geometria: {stats['duplicates_by_fingerprint']})")
+
+
+def merge_trails(trails: Iterable[Dict[str, Any]],
+                 merger: Optional[TrailMerger] = None) -> List[Dict[str, Any]]:
+    """Deduplicated trails (see TrailMerger); pass `merger` to read its stats afterwards."""
+    merger = merger if merger is not None else TrailMerger()
+    merger.extend(trails)
+    return merger.finish()
@@ -0,0 +1,159 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from data_handlers.trail_table import DictColumn, StringColumn, TagsColumn, TrailTable
+
+# Nagłówek pliku: magia, wersja formatu, długość nagłówka JSON
+SNAPSHOT_MAGIC = b"P3XDTRL\0"
+SNAPSHOT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+# Początek każdej kolumny jest wyrównany do 8 bajtów (wymóg np.frombuffer dla float64)
+_ALIGNMENT = 8
+
+
+def _column_arrays(table: TrailTable) -> Dict[str, Any]:
+    """Kolumny tabeli jako (nazwa -> tablica NumPy lub bajty) do zapisania w migawce."""
+    return {
+        "ids.offsets": table.ids.offsets,
+        "ids.blob": bytes(table.ids.blob),
+        "names.offsets": table.names.offsets,
+        "names.blob": bytes(table.names.blob),
+        "region.codes": table.region.codes,
+        "lat": table.lat,
+        "lon": table.lon,
+        "length_km": table.length_km,
+        "elevation_m": table.elevation_m,
+        "difficulty": table.difficulty,
+        "terrain_type.codes": table.terrain_type.codes,
+        "tags.offsets": table.tags.offsets,
+        "tags.codes": table.tags.values.codes,
+        "category.codes": table.category.codes,
+        "estimated_time": table.estimated_time,
+        "rules_version.codes": table.rules_version.codes,
+    }
+
+
+def write_snapshot(table: TrailTable, path: str, source_key: Optional[Sequence[int]] = None,
+                   rules_version: Optional[str] = None) -> None:
+    """
+    Zapisuje TrailTable jako binarną migawkę (atomowo, przez plik tymczasowy).
+
+    Układ pliku: preambuła (magia, wersja, długość nagłówka), nagłówek JSON
+    (liczba tras, opis kolumn, tablice napisów dla kolumn słownikowych,
+    dodatkowe pola rekordów, klucz pliku źródłowego) i kolumny o stałej
+    szerokości wyrównane do 8 bajtów. Nazwy i identyfikatory zapisane są
+    jako jeden blok UTF-8 z przesunięciami.
+    """
+    columns = _column_arrays(table)
+    layout = {}
+    offset = 0
+    for name, data in columns.items():
+        size = len(data) if isinstance(data, bytes) else data.nbytes
+        dtype = None if isinstance(data, bytes) else data.dtype.str
+        layout[name] = {"offset": offset, "size": size, "dtype": dtype}
+        offset += -(-size // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({
+        "rows": len(table),
+        "source_key": list(source_key) if source_key is not None else None,
+        "rules_version": rules_version,
+        "columns": layout,
+        "strings": {
+            "region": table.region.categories,
+            "terrain_type": table.terrain_type.categories,
+            "tags": table.tags.values.categories,
+            "category": table.category.categories,
+            "rules_version": table.rules_version.categories,
+        },
+        "extras": {str(position): extra for position, extra in table.extras.items()},
+    }, ensure_ascii=False).encode('utf-8')
+    # Dane kolumn zaczynają się od wyrównanej pozycji
+    header += b" " * (-(_PREAMBLE.size + len(header)) % _ALIGNMENT)
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for name, data in columns.items():
+            raw = data if isinstance(data, bytes) else np.ascontiguousarray(data).tobytes()
+            f.write(raw)
+            f.write(b"\0" * (-len(raw) % _ALIGNMENT))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, source_key: Optional[Sequence[int]] = None,
+                  rules_version: Optional[str] = None) -> Optional[TrailTable]:
+    """
+    Otwiera migawkę przez mmap i zwraca TrailTable oparte na widokach pliku.
+
+    Kolumny nie są kopiowane - system operacyjny wczytuje strony pliku
+    dopiero przy pierwszym dostępie. Zwraca None, gdy pliku brak, ma inny
+    format lub wersję albo nie odpowiada podanemu kluczowi pliku źródłowego
+    lub wersji reguł pól pochodnych, a także gdy plik jest ucięty lub uszkodzony
+    (tabela jest wtedy budowana od nowa z pliku JSON).
+    """
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, header_size = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_size]).decode('utf-8'))
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        print(f"Błąd podczas wczytywania migawki danych o szlakach: {e}")
+        return None
+    if source_key is not None and header.get("source_key") != list(source_key):
+        return None
+    if rules_version is not None and header.get("rules_version") != rules_version:
+        return None
+
+    data_start = _PREAMBLE.size + header_size
+    view = memoryview(buffer)
+
+    def column(name: str):
+        spec = layout[name]
+        start = data_start + spec["offset"]
+        if spec["offset"] < 0 or spec["size"] < 0 or start + spec["size"] > len(buffer):
+            raise ValueError(f"kolumna {name} wykracza poza plik")
+        if spec["dtype"] is None:
+            return view[start:start + spec["size"]]
+        dtype = np.dtype(spec["dtype"])
+        return np.frombuffer(buffer, dtype=dtype, count=spec["size"] // dtype.itemsize, offset=start)
+
+    try:
+        layout = header["columns"]
+        strings = header["strings"]
+        return TrailTable(
+            ids=StringColumn(column("ids.offsets"), column("ids.blob")),
+            names=StringColumn(column("names.offsets"), column("names.blob")),
+            region=DictColumn(column("region.codes"), strings["region"]),
+            lat=column("lat"),
+            lon=column("lon"),
+            length_km=column("length_km"),
+            elevation_m=column("elevation_m"),
+            difficulty=column("difficulty"),
+            terrain_type=DictColumn(column("terrain_type.codes"), strings["terrain_type"]),
+            tags=TagsColumn(column("tags.offsets"), DictColumn(column("tags.codes"), strings["tags"])),
+            category=DictColumn(column("category.codes"), strings["category"]),
+            estimated_time=column("estimated_time"),
+            rules_version=DictColumn(column("rules_version.codes"), strings["rules_version"]),
+            extras={int(position): extra for position, extra in header["extras"].items()},
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        # Ucięta lub uszkodzona migawka - None oznacza odbudowę z pliku JSON
+        print(f"Błąd podczas wczytywania migawki danych o szlakach: {e}")
+        return None
@@ -0,0 +1,290 @@
+import json
+import os
+import hashlib
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional
+
+from data_handlers.trail_features import FEATURES_RULES_VERSION, precompute_trail_features
+from data_handlers.trail_snapshot import read_snapshot, write_snapshot
+from data_handlers.trail_table import TrailTable, coerce_length, normalize_key, trail_regions
+from utils.profiling import span
+from utils.spatial_index import SpatialIndex
+
+
+def _coerce_lengths(trails: List[Dict[str, Any]]) -> None:
+    """Zamienia w miejscu nieliczbowe długości (np. "5 km") na float, a nieczytelne na 0.0."""
+    for trail in trails:
+        if isinstance(trail, dict):
+            length = trail.get("length_km")
+            if length is not None and not isinstance(length, (int, float)):
+                trail["length_km"] = coerce_length(length)
+
+
+class _TrailIndex:
+    """Immutable set of hash indexes built from one parsed trails file."""
+
+    def __init__(self, trails: List[Dict[str, Any]]):
+        self.trails = trails
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.by_region: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_difficulty: Dict[Any, List[Dict[str, Any]]] = {}
+        self.by_terrain: Dict[str, List[Dict[str, Any]]] = {}
+        self.region_length_sum: Dict[str, float] = {}
+
+        lengths = []
+        for position, trail in enumerate(trails):
+            if not isinstance(trail, dict):
+                continue
+            # Pierwszy rekord o danym id wygrywa, tak jak przy liniowym przeszukiwaniu
+            self.by_id.setdefault(trail.get("id"), trail)
+
+            self.by_difficulty.setdefault(trail.get("difficulty"), []).append(trail)
+            self.by_terrain.setdefault(normalize_key(trail.get("terrain_type")), []).append(trail)
+
+            length = coerce_length(trail.get("length_km"))
+            # Trasa połączona z kilku regionów jest indeksowana w każdym z nich
+            regions = dict.fromkeys(normalize_key(region) for region in trail_regions(trail)) or {"": None}
+            for region in regions:
+                self.by_region.setdefault(region, []).append(trail)
+                self.region_length_sum[region] = self.region_length_sum.get(region, 0.0) + length
+            lengths.append((length, position))
+
+        # Posortowane długości pozwalają odpowiadać na zakresy przez bisect
+        lengths.sort()
+        self.sorted_lengths = [length for length, _ in lengths]
+        self.sorted_positions = [position for _, position in lengths]
+        self._table = None
+
+    @property
+    def table(self) -> TrailTable:
+        """Columnar copy of the snapshot, built on first use."""
+        if self._table is None:
+            self._table = TrailTable.from_records(self.trails)
+        return self._table
+
+
+class TrailStore:
+    """
+    In-memory trail store that parses the trails file once.
+
+    The file is re-read only when its mtime/size changes and its content
+    hash differs from the one already loaded. Derived fields (category,
+    estimated time) are computed and written by save(). Records loaded
+    with missing or outdated fields (rules version) are recomputed in
+    memory only: the read path never writes the file, so a reader cannot
+    replace a newer file written by another process (update_data.py).
+
+    With `snapshot_file` the columnar table is served from a binary
+    snapshot (data_handlers/trail_snapshot.py) opened with mmap, so
+    table-only callers never parse the JSON file. The snapshot is rebuilt
+    whenever it does not match the JSON file (mtime/size) or the rules version.
+    """
+
+    def __init__(self, data_file: str, snapshot_file: Optional[str] = None):
+        self.data_file = data_file
+        self.snapshot_file = snapshot_file
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: Optional[tuple] = None
+        self._spatial: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._index = _TrailIndex([])
+        self._stat_key = None
+        self._content_hash = None
+
+    def _read_stat_key(self):
+        try:
+            stat = os.stat(self.data_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _ensure_fresh(self) -> _TrailIndex:
+        """Return the current index, reloading it if the file has changed."""
+        stat_key = self._read_stat_key()
+        if stat_key == self._stat_key:
+            return self._index
+
+        with self._lock:
+            if stat_key == self._stat_key:
+                return self._index
+            if stat_key is None:
+                print(f"Błąd podczas wczytywania danych o szlakach: brak pliku {self.data_file}")
+                self._stat_key = None
+                return self._index
+
+            try:
+                with span("trails.read_file"), open(self.data_file, 'rb') as f:
+                    raw = f.read()
+            except OSError as e:
+                print(f"Błąd podczas wczytywania danych o szlakach: {e}")
+                return self._index
+
+            content_hash = hashlib.blake2b(raw, digest_size=16).hexdigest()
+            if content_hash != self._content_hash:
+                try:
+                    with span("trails.parse_json"):
+                        trails = json.loads(raw.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    print(f"Błąd podczas wczytywania danych o szlakach: {e}")
+                    return self._index
+                if not isinstance(trails, list):
+                    trails = []
+                with span("trails.precompute"):
+                    _coerce_lengths(trails)
+                    updated = precompute_trail_features(trails)
+                with span("trails.index"):
+                    self._index = _TrailIndex(trails)
+                self._content_hash = content_hash
+                if updated:
+                    # Tylko w pamięci - do pliku pola trafią przy następnym save() (aktualizacji danych)
+                    print(f"Przeliczono kategorie i czasy przejścia dla {updated} szlaków")
+
+            self._stat_key = stat_key
+            return self._index
+
+    def reload(self) -> None:
+        """Force the next lookup to re-check the file."""
+        with self._lock:
+            self._stat_key = None
+
+    @property
+    def trails(self) -> List[Dict[str, Any]]:
+        """All trail records in file order."""
+        return self._ensure_fresh().trails
+
+    @property
+    def table(self) -> TrailTable:
+        """All trails as a columnar TrailTable (shared, do not modify)."""
+        if self.snapshot_file is not None:
+            table = self._snapshot_table()
+            if table is not None:
+                return table
+        return self._ensure_fresh().table
+
+    def _snapshot_table(self) -> Optional[TrailTable]:
+        """Table memory-mapped from the snapshot, rebuilt from JSON when stale."""
+        stat_key = self._read_stat_key()
+        if stat_key is None:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == stat_key:
+            return snapshot[1]
+
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == stat_key:
+                return snapshot[1]
+            with span("trails.snapshot_read"):
+                table = read_snapshot(self.snapshot_file, stat_key, FEATURES_RULES_VERSION)
+            if table is None:
+                # Migawka nieaktualna lub jej brak - jednorazowe wczytanie JSON i zapis nowej migawki
+                index = self._ensure_fresh()
+                if self._stat_key is None:
+                    return None
+                stat_key = self._stat_key
+                table = index.table
+                self._write_snapshot(table, stat_key)
+            self._snapshot = (stat_key, table)
+            return table
+
+    def _write_snapshot(self, table: TrailTable, stat_key) -> None:
+        try:
+            write_snapshot(table, self.snapshot_file, stat_key, FEATURES_RULES_VERSION)
+        except OSError as e:
+            # Bez migawki tabela jest nadal budowana z pliku JSON
+            print(f"Błąd podczas zapisywania migawki danych o szlakach: {e}")
+
+    def get_spatial_index(self, table: Optional[TrailTable] = None) -> SpatialIndex:
+        """
+        Grid index over the coordinates of `table` (the current table by default).
+
+        Positions returned by the index refer to rows of that table; the
+        index is built once and rebuilt only when the table changes.
+        """
+        if table is None:
+            table = self.table
+        spatial = self._spatial
+        if spatial is not None and spatial[0] is table:
+            return spatial[1]
+        with span("trails.spatial_index"):
+            index = SpatialIndex(table.lat, table.lon)
+        self._spatial = (table, index)
+        return index
+
+    def get_table(self, region: Optional[str] = None) -> TrailTable:
+        """TrailTable of all trails or only those of one region (including merged trails' `regions`)."""
+        table = self.table
+        if region is None:
+            return table
+        return table.take(table.region_mask(region))
+
+    def get_by_id(self, trail_id: Any) -> Optional[Dict[str, Any]]:
+        return self._ensure_fresh().by_id.get(trail_id)
+
+    def get_by_region(self, region: str) -> List[Dict[str, Any]]:
+        return list(self._ensure_fresh().by_region.get(normalize_key(region), ()))
+
+    def get_by_difficulty(self, difficulty: Any) -> List[Dict[str, Any]]:
+        return list(self._ensure_fresh().by_difficulty.get(difficulty, ()))
+
+    def get_by_terrain(self, terrain_type: str) -> List[Dict[str, Any]]:
+        return list(self._ensure_fresh().by_terrain.get(normalize_key(terrain_type), ()))
+
+    def get_by_length(self, min_length: float, max_length: float) -> List[Dict[str, Any]]:
+        """Trails with min_length <= length_km <= max_length, in file order."""
+        index = self._ensure_fresh()
+        start = bisect_left(index.sorted_lengths, min_length)
+        end = bisect_right(index.sorted_lengths, max_length)
+        positions = sorted(index.sorted_positions[start:end])
+        return [index.trails[position] for position in positions]
+
+    def count_by_region(self, region: str) -> int:
+        return len(self._ensure_fresh().by_region.get(normalize_key(region), ()))
+
+    def length_sum_by_region(self, region: str) -> float:
+        return self._ensure_fresh().region_length_sum.get(normalize_key(region), 0.0)
+
+    def save(self, trails: List[Dict[str, Any]]) -> None:
+        """
+        Atomically replace the trails file and the in-memory indexes.
+
+        The data is written to a temporary file and renamed over the old one,
+        so readers never see a partially written snapshot. Derived fields
+        are computed before writing.
+        """
+        _coerce_lengths(trails)
+        precompute_trail_features(trails)
+        content_hash = self._write(trails)
+
+        index = _TrailIndex(trails)
+        with self._lock:
+            self._index = index
+            self._content_hash = content_hash
+            self._stat_key = self._read_stat_key()
+
+        if self.snapshot_file is not None:
+            with self._snapshot_lock:
+                self._write_snapshot(index.table, self._stat_key)
+                self._snapshot = (self._stat_key, index.table)
+
+    def _write(self, trails: List[Dict[str, Any]]) -> str:
+        """Atomically write the trails file; returns the content hash."""
+        raw = json.dumps(trails, ensure_ascii=False, indent=2).encode('utf-8')
+        directory = os.path.dirname(self.data_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.data_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.data_file)
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def age_seconds(self) -> Optional[float]:
+        """Age of the trails file in seconds, or None if it does not exist."""
+        try:
+            return max(0.0, time.time() - os.path.getmtime(self.data_file))
+        except OSError:
+            return None
@@ -0,0 +1,442 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_key(value: Any) -> str:
+    """Normalize a text attribute (region, terrain) used as an index key."""
+    return str(value or "").strip().lower()
+
+
+def trail_regions(trail: Mapping[str, Any]) -> List[str]:
+    """All regions of a (possibly merged) trail; the first one is `region`."""
+    regions = trail.get("regions")
+    if regions:
+        return list(regions)
+    region = trail.get("region")
+    return [region] if region is not None else []
+
+
+def coerce_length(value: Any) -> float:
+    """Trail length in km as float; unparsable values (e.g. "5 km") count as 0.0."""
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _offsets(sizes: Sequence[int]) -> np.ndarray:
+    """Offsets (n + 1) for a CSR-style column; int32 unless the data is huge."""
+    sizes = np.asarray(sizes, dtype=np.int64)
+    dtype = np.int32 if sizes.sum() < 2 ** 31 else np.int64
+    offsets = np.zeros(len(sizes) + 1, dtype=dtype)
+    if len(sizes):
+        np.cumsum(sizes, out=offsets[1:])
+    return offsets
+
+
+def _take_slices(offsets: np.ndarray, positions: np.ndarray):
+    """
+    Offsets and flat element indices of the selected rows of a CSR-style column.
+
+    Rows are glued without a Python loop: consecutive indices shifted by the
+    difference between the old and the new start of each row.
+    """
+    starts = offsets[positions].astype(np.int64)
+    lengths = offsets[positions + 1].astype(np.int64) - starts
+    new_offsets = _offsets(lengths)
+    index = np.arange(int(new_offsets[-1]), dtype=np.int64) + np.repeat(starts - new_offsets[:-1], lengths)
+    return new_offsets, index
+
+
+def _code_dtype(category_count: int):
+    # Najmniejszy typ mieszczący kody (oraz -1 dla braku wartości)
+    if category_count < 2 ** 7:
+        return np.int8
+    if category_count < 2 ** 15:
+        return np.int16
+    return np.int32
+
+
+class StringColumn:
+    """Column of strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, offsets: np.ndarray, blob: bytes):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "StringColumn":
+        encoded = [str(value if value is not None else "").encode('utf-8') for value in values]
+        return cls(_offsets([len(value) for value in encoded]), b"".join(encoded))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        return bytes(self.blob[self.offsets[position]:self.offsets[position + 1]]).decode('utf-8')
+
+    def take(self, positions: np.ndarray) -> "StringColumn":
+        offsets, index = _take_slices(self.offsets, positions)
+        return StringColumn(offsets, np.frombuffer(self.blob, dtype=np.uint8)[index].tobytes())
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + len(self.blob)
+
+
+class DictColumn:
+    """Dictionary-encoded text column: small integer codes into a list of distinct values."""
+
+    def __init__(self, codes: np.ndarray, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "DictColumn":
+        lookup: Dict[str, int] = {}
+        categories: List[str] = []
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(categories)
+                categories.append(value)
+            codes.append(code)
+        return cls(np.asarray(codes, dtype=_code_dtype(len(categories))), categories)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        code = self.codes[position]
+        return None if code < 0 else self.categories[code]
+
+    def matching_codes(self, value: str) -> np.ndarray:
+        """Codes of all categories equal to value after normalization."""
+        key = normalize_key(value)
+        return np.asarray([code for code, category in enumerate(self.categories)
+                           if normalize_key(category) == key], dtype=np.int32)
+
+    def mask_equal(self, value: str) -> np.ndarray:
+        """Boolean mask of rows whose (normalized) value equals value."""
+        codes = self.matching_codes(value)
+        if len(codes) == 1:
+            return self.codes == codes[0]
+        return np.isin(self.codes, codes)
+
+    def take(self, positions: np.ndarray) -> "DictColumn":
+        return DictColumn(self.codes[positions], self.categories)
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(len(category) for category in self.categories)
+
+
+class TagsColumn:
+    """List-of-strings column in CSR form: offsets plus dictionary-encoded tags."""
+
+    def __init__(self, offsets: np.ndarray, values: DictColumn):
+        self.offsets = offsets
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values: Iterable[Optional[Sequence[str]]]) -> "TagsColumn":
+        flat = []
+        sizes = []
+        for tags in values:
+            tags = tags or []
+            flat.extend(tags)
+            sizes.append(len(tags))
+        return cls(_offsets(sizes), DictColumn.from_values(flat))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> List[str]:
+        start, end = self.offsets[position], self.offsets[position + 1]
+        categories = self.values.categories
+        return [categories[code] for code in self.values.codes[start:end].tolist()]
+
+    def take(self, positions: np.ndarray) -> "TagsColumn":
+        # Kody tagów są kopiowane razem ze słownikiem - bez dekodowania na napisy
+        offsets, index = _take_slices(self.offsets, positions)
+        return TagsColumn(offsets, self.values.take(index))
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.values.nbytes()
+
+
+# Pola rekordu przechowywane w kolumnach; pozostałe trafiają do `extras`
+CORE_FIELDS = ("id", "name", "region", "coordinates", "length_km", "elevation_m",
+               "difficulty", "terrain_type", "tags", "category", "estimated_time", "rules_version")
+
+# Pola kolumnowe, których może brakować w rekordzie (brak = NaN lub kod -1); pole
+# podane jako null (albo współrzędne bez lat/lon) zostaje dosłownie w `extras`
+OPTIONAL_FIELDS = ("coordinates", "length_km", "elevation_m", "difficulty",
+                   "category", "estimated_time", "rules_version")
+
+
+class TrailTable:
+    """
+    Columnar representation of a list of trails.
+
+    Numeric attributes are typed NumPy arrays, region/terrain/category and
+    tags are dictionary-encoded and names/ids live in one UTF-8 blob each.
+    Fields outside CORE_FIELDS are kept in the sparse `extras` mapping
+    (row position -> dict), so rows without them cost nothing. Missing
+    optional values are NaN / -1 in the columns and absent from row views;
+    scoring code treats them like the dict defaults. Category and
+    estimated time precomputed at ingest (with their rules version) are
+    regular columns. Trails merged from several regions keep their other
+    regions in `regions` (extras); region_mask() matches all of them.
+    """
+
+    def __init__(self, ids: StringColumn, names: StringColumn, region: DictColumn,
+                 lat: np.ndarray, lon: np.ndarray, length_km: np.ndarray,
+                 elevation_m: np.ndarray, difficulty: np.ndarray, terrain_type: DictColumn,
+                 tags: TagsColumn, category: DictColumn,
+                 estimated_time: Optional[np.ndarray] = None,
+                 rules_version: Optional[DictColumn] = None,
+                 extras: Optional[Dict[int, Dict[str, Any]]] = None):
+        self.ids = ids
+        self.names = names
+        self.region = region
+        self.lat = lat
+        self.lon = lon
+        self.length_km = length_km
+        self.elevation_m = elevation_m
+        self.difficulty = difficulty
+        self.terrain_type = terrain_type
+        self.tags = tags
+        self.category = category
+        count = len(length_km)
+        self.estimated_time = (estimated_time if estimated_time is not None
+                               else np.full(count, np.nan))
+        self.rules_version = (rules_version if rules_version is not None
+                              else DictColumn(np.full(count, -1, dtype=np.int8), []))
+        self.extras = extras if extras is not None else {}
+        self._region_members: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def from_records(cls, trails: Sequence[Dict[str, Any]]) -> "TrailTable":
+        """Build a table from today's JSON shape (list of trail dicts)."""
+        trails = [trail for trail in trails if isinstance(trail, dict)]
+        count = len(trails)
+        lat = np.full(count, np.nan)
+        lon = np.full(count, np.nan)
+        for position, trail in enumerate(trails):
+            coordinates = trail.get("coordinates")
+            if isinstance(coordinates, dict) and coordinates.get("lat") is not None \
+                    and coordinates.get("lon") is not None:
+                lat[position] = coordinates["lat"]
+                lon[position] = coordinates["lon"]
+
+        extras = {}
+        for position, trail in enumerate(trails):
+            extra = {key: value for key, value in trail.items()
+                     if key not in CORE_FIELDS or (key in OPTIONAL_FIELDS and value is None)}
+            if "coordinates" in trail and np.isnan(lat[position]):
+                extra["coordinates"] = trail["coordinates"]
+            if extra:
+                extras[position] = extra
+
+        return cls(
+            ids=StringColumn.from_values(trail.get("id") for trail in trails),
+            names=StringColumn.from_values(trail.get("name") for trail in trails),
+            region=DictColumn.from_values(trail.get("region") for trail in trails),
+            lat=lat,
+            lon=lon,
+            length_km=np.asarray([np.nan if trail.get("length_km") is None
+                                  else coerce_length(trail["length_km"]) for trail in trails],
+                                 dtype=np.float64),
+            elevation_m=np.asarray([np.nan if trail.get("elevation_m") is None
+                                    else trail["elevation_m"] for trail in trails], dtype=np.float64),
+            difficulty=np.asarray([-1 if trail.get("difficulty") is None
+                                   else trail["difficulty"] for trail in trails], dtype=np.int8),
+            terrain_type=DictColumn.from_values(trail.get("terrain_type") for trail in trails),
+            tags=TagsColumn.from_values(trail.get("tags") for trail in trails),
+            category=DictColumn.from_values(trail.get("category") for trail in trails),
+            estimated_time=np.asarray([np.nan if trail.get("estimated_time") is None
+                                       else trail["estimated_time"] for trail in trails],
+                                      dtype=np.float64),
+            rules_version=DictColumn.from_values(trail.get("rules_version") for trail in trails),
+            extras=extras,
+        )
+
+    def __len__(self) -> int:
+        return len(self.length_km)
+
+    def __iter__(self) -> Iterator["TrailRow"]:
+        return (TrailRow(self, position) for position in range(len(self)))
+
+    def row(self, position: int) -> "TrailRow":
+        return TrailRow(self, position)
+
+    def rows(self, positions: Optional[Iterable[int]] = None) -> List["TrailRow"]:
+        """Row views for the given positions (all rows by default)."""
+        if positions is None:
+            positions = range(len(self))
+        elif isinstance(positions, np.ndarray):
+            positions = positions.tolist()
+        return [TrailRow(self, position) for position in positions]
+
+    def region_mask(self, value: str) -> np.ndarray:
+        """Boolean mask of rows whose region, or any entry of `regions`, equals value."""
+        mask = self.region.mask_equal(value)
+        if self._region_members is None:
+            # Tras z kilku regionów jest niewiele - odwrotny indeks pola `regions` budujemy raz
+            members: Dict[str, List[int]] = {}
+            for position, extra in self.extras.items():
+                for region in extra.get("regions") or ():
+                    members.setdefault(normalize_key(region), []).append(position)
+            self._region_members = members
+        positions = self._region_members.get(normalize_key(value))
+        if positions:
+            mask[positions] = True
+        return mask
+
+    def coordinates(self, position: int) -> Optional[Dict[str, float]]:
+        lat = self.lat[position]
+        if np.isnan(lat):
+            return None
+        return {"lat": float(lat), "lon": float(self.lon[position])}
+
+    def value(self, position: int, field: str) -> Any:
+        """Single field of one row in the JSON representation."""
+        if field == "id":
+            return self.ids[position]
+        if field == "name":
+            return self.names[position]
+        if field == "region":
+            return self.region[position]
+        if field == "terrain_type":
+            return self.terrain_type[position]
+        if field == "tags":
+            return self.tags[position]
+        if field in OPTIONAL_FIELDS and self._has_value(position, field):
+            if field == "coordinates":
+                return self.coordinates(position)
+            if field in ("length_km", "elevation_m", "estimated_time"):
+                return float(getattr(self, field)[position])
+            if field == "difficulty":
+                return int(self.difficulty[position])
+            return getattr(self, field)[position]
+        # Brak wartości w kolumnie: pole podane jako null jest w extras, inaczej go nie ma
+        extra = self.extras.get(position)
+        if extra is None or field not in extra:
+            raise KeyError(field)
+        return extra[field]
+
+    def fields(self, position: int) -> List[str]:
+        extra = self.extras.get(position) or {}
+        fields = [field for field in CORE_FIELDS
+                  if field not in OPTIONAL_FIELDS or field in extra or self._has_value(position, field)]
+        fields.extend(field for field in extra if field not in CORE_FIELDS)
+        return fields
+
+    def _has_value(self, position: int, field: str) -> bool:
+        if field == "coordinates":
+            return not np.isnan(self.lat[position])
+        if field in ("length_km", "elevation_m", "estimated_time"):
+            return not np.isnan(getattr(self, field)[position])
+        if field == "difficulty":
+            return self.difficulty[position] >= 0
+        return getattr(self, field).codes[position] >= 0
+
+    def record(self, position: int) -> Dict[str, Any]:
+        return {field: self.value(position, field) for field in self.fields(position)}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Convert back to today's JSON shape."""
+        return [self.record(position) for position in range(len(self))]
+
+    def take(self, positions: Sequence[int]) -> "TrailTable":
+        """New table with the selected rows (mask or positions)."""
+        positions = np.asarray(positions)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        return TrailTable(
+            ids=self.ids.take(positions),
+            names=self.names.take(positions),
+            region=self.region.take(positions),
+            lat=self.lat[positions],
+            lon=self.lon[positions],
+            length_km=self.length_km[positions],
+            elevation_m=self.elevation_m[positions],
+            difficulty=self.difficulty[positions],
+            terrain_type=self.terrain_type.take(positions),
+            tags=self.tags.take(positions),
+            category=self.category.take(positions),
+            estimated_time=self.estimated_time[positions],
+            rules_version=self.rules_version.take(positions),
+            extras={new: self.extras[old] for new, old in enumerate(positions.tolist())
+                    if old in self.extras},
+        )
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns (without the extras mapping)."""
+        arrays = (self.lat, self.lon, self.length_km, self.elevation_m, self.difficulty,
+                  self.estimated_time)
+        columns = (self.ids, self.names, self.region, self.terrain_type, self.tags, self.category,
+                   self.rules_version)
+        return sum(array.nbytes for array in arrays) + sum(column.nbytes() for column in columns)
+
+
+class TrailRow(MutableMapping):
+    """
+    Dict-like view of one TrailTable row for existing callers.
+
+    Reads go straight to the columns; assignments (e.g. comfort_index)
+    are kept in a small per-row overlay and never modify the table.
+    """
+
+    __slots__ = ("_table", "_position", "_overlay")
+
+    def __init__(self, table: TrailTable, position: int):
+        self._table = table
+        self._position = position
+        self._overlay: Optional[Dict[str, Any]] = None
+
+    @property
+    def position(self) -> int:
+        return self._position
+
+    def __getitem__(self, key: str) -> Any:
+        if self._overlay is not None and key in self._overlay:
+            return self._overlay[key]
+        return self._table.value(self._position, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if self._overlay is None:
+            self._overlay = {}
+        self._overlay[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if self._overlay is None or key not in self._overlay:
+            raise KeyError(key)
+        del self._overlay[key]
+
+    def __iter__(self) -> Iterator[str]:
+        fields = self._table.fields(self._position)
+        yield from fields
+        if self._overlay:
+            yield from (key for key in self._overlay if key not in fields)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def snapshot(self) -> "TrailRow":
+        """Independent view of the same row (overlay copied) without building a dict."""
+        row = TrailRow(self._table, self._position)
+        if self._overlay:
+            row._overlay = dict(self._overlay)
+        return row
+
+    def __repr__(self) -> str:
+        return f"TrailRow({dict(self)!r})"
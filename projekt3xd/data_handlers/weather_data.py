@@ -1,5 +1,5 @@
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any, Optional
 import os
 import sys
@@ -53,8 +53,12 @@ class WeatherDataHandler:
         return default_weather
 
     def get_weather(self, city: str, date: str = None) -> Dict[str, Any]:
-        """Get weather for a specific city and date, always fetching from API."""
-        print(f"Pobieranie prognozy pogody dla miasta {city} z API...")
+        """
+        Get weather for a specific city and date.
+
+        Results are served from the WeatherAPI cache (memory, then disk), so
+        repeated calls for the same city and date do not hit the API again.
+        """
         weather = self.api.get_weather_forecast(city, date)
         return self._validate_weather(weather)
 
@@ -69,17 +73,18 @@ class WeatherDataHandler:
         return weather_data
 
     def get_weather_for_date_range(self, city: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
-        """Get weather for a date range."""
+        """Get weather for a date range (fetched with one batched API request)."""
+        try:
+            records = self.api.get_weather_batch([city], start_date, end_date).get(city, {})
+        except Exception as e:
+            print(f"Błąd podczas pobierania danych pogodowych: {e}")
+            return []
+
         weather_data = []
-        current_date = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        while current_date <= end_date:
-            weather = self.get_weather(city, current_date.strftime("%Y-%m-%d"))
+        for date, weather in records.items():
+            weather = self._validate_weather({**weather, "date": date, "city": city})
             if weather:
                 weather_data.append(weather)
-            current_date += timedelta(days=1)
-            
         return weather_data
 
     def get_average_temperature(self, city: str, date: str = None) -> float:
@@ -95,17 +100,11 @@ class WeatherDataHandler:
     def get_weather_forecast(self, city: str, date: str) -> Optional[Dict[str, Any]]:
         """Get weather forecast for a specific date."""
         try:
-            # Convert date string to datetime
-            target_date = datetime.strptime(date, "%Y-%m-%d")
-            today = datetime.now().date()
-            
-            # Choose appropriate API endpoint based on date
-            if target_date.date() < today:
-                print(f"Pobieranie historycznych danych pogodowych dla {city} na dzień {date}...")
-                weather_data = self.api._get_historical_weather(city, date)
-            else:
-                print(f"Pobieranie prognozy pogody dla {city} na dzień {date}...")
-                weather_data = self.api._get_future_weather(city, date)
+            # Validate the date format
+            datetime.strptime(date, "%Y-%m-%d")
+
+            # WeatherAPI chooses the endpoint and caches the result
+            weather_data = self.api.get_weather_forecast(city, date)
             
             if weather_data:
                 return weather_data
@@ -1,7 +1,8 @@
+import argparse
 import os
 import sys
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Dodaj katalog projektu do ścieżki Pythona
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -11,10 +12,48 @@ from data_handlers.trail_data import TrailDataHandler
 from data_handlers.weather_data import WeatherDataHandler
 from utils.trail_filter import TrailFilter
 from utils.storage import save_results_to_file
-from config import CITY_COORDINATES
+from config import CITY_COORDINATES, VERBOSITY
 from recommendation.trail_recommender import TrailRecommender
+from recommendation.trip_planner import TripPlanner
+from utils.export_results import BackgroundExporter
+from utils.profiling import PROFILER, PROFILE_FORMATS, set_verbosity
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="System rekomendacji szlaków turystycznych")
+    parser.add_argument('--profile', action='store_true',
+                        help='Mierz czas etapów (Overpass, Open-Meteo, wczytanie danych, filtrowanie, '
+                             'ocena, eksport) i wypisz podsumowanie na końcu')
+    parser.add_argument('--profile-output', metavar='PLIK',
+                        help='Zapisz metryki do pliku (.json - JSON, inne - tekst Prometheus); włącza --profile')
+    parser.add_argument('--profile-format', choices=PROFILE_FORMATS,
+                        help='Format pliku metryk (domyślnie według rozszerzenia)')
+    parser.add_argument('--days', type=int, default=1, metavar='N',
+                        help='Zaplanuj wycieczkę: najlepsze trasy i dni w oknie N dni od podanej daty')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='Więcej komunikatów (-v: także każda znaleziona trasa)')
+    return parser.parse_args(argv)
+
+def print_plan(plan):
+    """Wypisuje wynik TripPlanner.plan_trips: najlepsze pary (trasa, dzień) i najlepszy dzień tras."""
+    print(f"\n=== Plan wycieczek: {plan['city']}, {plan['start_date']} - {plan['end_date']} ===")
+    for date, reason in plan["skipped"].items():
+        print(f"Pominięto {date}: {reason}")
+    if not plan["best"]:
+        print("Nie znaleziono tras ani dni spełniających podane kryteria.")
+        return
+    print(f"Ocenione dni: {len(plan['dates'])}, trasy spełniające kryteria: {plan['trail_count']}")
+
+    print("\nNajlepsze trasy i dni:")
+    for i, trail in enumerate(plan["best"], 1):
+        print(f"{i}. {trail['date']} - {trail['name']} ({trail['length_km']:.1f} km, "
+              f"trudność {trail['difficulty']}/3), indeks komfortu {trail['comfort_index']:.1f}/100, "
+              f"wynik {trail['weighted_score']:.2f}")
+
+    print("\nNajlepszy dzień dla tras:")
+    for i, trail in enumerate(plan["best_days"], 1):
+        print(f"{i}. {trail['name']}: {trail['date']} (wynik {trail['weighted_score']:.2f})")
+
+def main(days=1):
     recommender = TrailRecommender()
     
     print("\n=== System rekomendacji szlaków turystycznych ===")
@@ -100,25 +139,58 @@ def main():
     }
     chosen_category = category_map.get(category_choice) if category_choice else None
 
+    # Wagi kryteriów pobieramy raz, wspólnie dla wszystkich miast
+    weights = recommender.weight_calculator.get_weights_from_user()
+
+    if days > 1:
+        # Jedno przeliczenie macierzy trasy x dni zamiast osobnej rekomendacji dla każdego dnia
+        planner = TripPlanner(recommender)
+        end_date = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        for current_city in cities:
+            try:
+                plan = planner.plan_trips(
+                    city=current_city,
+                    start_date=date,
+                    end_date=end_date,
+                    difficulty=difficulty,
+                    terrain_type=terrain_type,
+                    min_length=min_length,
+                    max_length=max_length,
+                    min_sunshine=min_sunshine,
+                    max_precipitation=max_precipitation,
+                    min_temperature=min_temperature,
+                    max_temperature=max_temperature,
+                    category=chosen_category,
+                    weights=weights
+                )
+            except ValueError as e:
+                print(f"Błąd podczas planowania wycieczki: {e}")
+                return
+            print_plan(plan)
+        return
+
     # Pobierz rekomendacje dla każdego wybranego miasta
     all_trails = []
-    for current_city in cities:
-        print(f"\nPobieranie rekomendacji dla miasta {current_city}...")
-        trails = recommender.recommend_trails(
-            city=current_city,
-            date=date,
-            difficulty=difficulty,
-            terrain_type=terrain_type,
-            min_length=min_length,
-            max_length=max_length,
-            min_sunshine=min_sunshine,
-            max_precipitation=max_precipitation,
-            min_temperature=min_temperature,
-            max_temperature=max_temperature,
-            category=chosen_category
-        )
-        if trails:
-            all_trails.extend(trails)
+    # Wyniki wszystkich miast trafiają do jednego zestawu plików, zapisywanego w tle
+    with recommender.exporter.run():
+        for current_city in cities:
+            print(f"\nPobieranie rekomendacji dla miasta {current_city}...")
+            trails = recommender.recommend_trails(
+                city=current_city,
+                date=date,
+                difficulty=difficulty,
+                terrain_type=terrain_type,
+                min_length=min_length,
+                max_length=max_length,
+                min_sunshine=min_sunshine,
+                max_precipitation=max_precipitation,
+                min_temperature=min_temperature,
+                max_temperature=max_temperature,
+                category=chosen_category,
+                weights=weights
+            )
+            if trails:
+                all_trails.extend(trails)
 
     # Wyświetl statystyki pogodowe przed trasami
     if weather := recommender.data_handler.weather_api.get_weather_forecast(cities[0], date):
@@ -175,4 +247,20 @@ def main():
         print(f"   ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    set_verbosity(VERBOSITY + args.verbose)
+    if args.profile or args.profile_output:
+        PROFILER.enable()
+    try:
+        main(days=args.days)
+    finally:
+        # Zapisz wyniki oczekujące w kolejce eksportu przed zakończeniem programu
+        BackgroundExporter.shared().close()
+        if PROFILER.enabled:
+            print("\n" + PROFILER.report())
+            if args.profile_output:
+                try:
+                    PROFILER.write(args.profile_output, args.profile_format)
+                    print(f"Metryki zapisano do pliku {args.profile_output}")
+                except (OSError, ValueError) as e:
+                    print(f"Błąd podczas zapisywania metryk: {e}")
\ No newline at end of file
@@ -1,6 +1,23 @@
 from utils.data_storage import DataStorage
+from config import WEATHER_CACHE_FILE, CACHE_MAX_BYTES, CACHE_MAX_AGE_HOURS
+from datetime import datetime
 import argparse
 
+
+def print_stats(stats):
+    counters = stats['counters']
+    hit_ratio = f"{stats['hit_ratio']:.1%}" if stats['hit_ratio'] is not None else "n/a"
+    print(f"Hits: {counters['hits']}, misses: {counters['misses']}, hit ratio: {hit_ratio}")
+    print(f"Bytes read: {counters['bytes_read']}, written: {counters['bytes_written']}")
+    print(f"Evictions: {counters['evictions']} files, {counters['evicted_bytes']} bytes")
+    print(f"Total size: {stats['total_bytes']} bytes (limit: {stats['max_bytes']}, "
+          f"max age: {stats['max_age_hours']} h)")
+    for file in stats['files']:
+        accessed = datetime.fromtimestamp(file['accessed']).strftime('%Y-%m-%d %H:%M')
+        modified = datetime.fromtimestamp(file['modified']).strftime('%Y-%m-%d %H:%M')
+        print(f"  {file['name']:<40} {file['bytes']:>12} B  accessed {accessed}  modified {modified}")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Manage API cache files')
     parser.add_argument('--clear', action='store_true', help='Clear all cache files')
@@ -8,24 +25,39 @@ def main():
     parser.add_argument('--clear-trails', action='store_true', help='Clear trails cache files')
     parser.add_argument('--merge', action='store_true', help='Merge all cache files into one')
     parser.add_argument('--output', type=str, default='all_data.json', help='Output file for merged data')
+    parser.add_argument('--stats', action='store_true', help='Show cache hit/miss/byte counters and file sizes')
+    parser.add_argument('--evict', action='store_true',
+                        help='Remove expired and least recently used files above the size limit')
+    parser.add_argument('--max-bytes', type=int, default=CACHE_MAX_BYTES,
+                        help='Cache size limit in bytes used by --evict')
+    parser.add_argument('--max-age-hours', type=float, default=CACHE_MAX_AGE_HOURS,
+                        help='Remove files not written for this many hours (--evict)')
     args = parser.parse_args()
 
-    storage = DataStorage()
+    storage = DataStorage(max_bytes=args.max_bytes, max_age_hours=args.max_age_hours)
 
     if args.clear:
         storage.clear_cache()
         print("All cache files cleared.")
     elif args.clear_weather:
-        for city in ["gdansk", "warszawa", "krakow", "wroclaw"]:
-            storage.clear_cache(f"weather_{city}.json")
+        for filename in storage.get_all_files():
+            if filename.startswith("weather_"):
+                storage.clear_cache(filename)
+        storage.clear_cache(WEATHER_CACHE_FILE)
         print("Weather cache files cleared.")
     elif args.clear_trails:
-        for city in ["gdansk", "warszawa", "krakow", "wroclaw"]:
-            storage.clear_cache(f"trails_{city}.json")
+        for filename in storage.get_all_files():
+            if filename.startswith("trails_"):
+                storage.clear_cache(filename)
         print("Trails cache files cleared.")
     elif args.merge:
         storage.merge_json_files(args.output)
         print(f"All data merged into {args.output}")
+    elif args.stats:
+        print_stats(storage.stats())
+    elif args.evict:
+        evicted = storage.evict()
+        print(f"Evicted {len(evicted)} cache files: {', '.join(evicted) if evicted else '-'}")
     else:
         print("No action specified. Use --help for usage information.")
 
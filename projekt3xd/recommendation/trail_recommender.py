@@ -1,73 +1,47 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from functools import reduce
 from datetime import datetime
 import os
 import sys
 
+import numpy as np
+
 # Dodaj katalog projektu do ścieżki Pythona
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_data import Center, TrailDataHandler
+from data_handlers.trail_table import TrailTable, normalize_key
 from utils.weather_utils import WeatherUtils
 from utils.weight_calculator import WeightCalculator
-from utils.time_calculator import TimeCalculator
+from utils.trail_categorizer import TrailCategorizer
+from utils.filters import TrailCriteria
+from utils.export_results import BackgroundExporter
+from utils.profiling import span, timed
+from config import CITY_COORDINATES
+
+# Klucze zapytania przyjmowane przez recommend_batch (jak parametry recommend_trails)
+QUERY_FIELDS = ("city", "date", "difficulty", "terrain_type", "min_length", "max_length",
+                "min_sunshine", "max_precipitation", "min_temperature", "max_temperature",
+                "category", "weights", "limit", "center", "radius_km")
 
 class TrailRecommender:
-    def __init__(self):
+    def __init__(self, data_handler: Optional[TrailDataHandler] = None,
+                 exporter: Optional[BackgroundExporter] = None):
         """Inicjalizuje obiekt TrailRecommender z obsługą danych."""
-        self.data_handler = TrailDataHandler()
+        self.data_handler = data_handler if data_handler is not None else TrailDataHandler()
+        self.exporter = exporter if exporter is not None else BackgroundExporter.shared()
         self.weight_calculator = WeightCalculator()
+        # Cechy tras liczone raz na miasto: miasto -> (tabela magazynu, cechy)
+        self._city_features: Dict[str, Tuple[TrailTable, Dict[str, Any]]] = {}
 
     def _categorize_trail(self, trail: Dict[str, Any]) -> str:
         """
-        Kategoryzuje trasę na podstawie jej charakterystyki.
-        
-        Kryteria:
-        - rodzinna: łatwe (trudność 1), krótkie trasy (<5km), małe przewyższenie (<200m)
-        - widokowa: punkty widokowe, trasy turystyczne ze sceneriami
-        - sportowa: średnie/długie trasy (5-15km), średnia trudność
-        - ekstremalna: trudne trasy, duże przewyższenie, długie dystanse
+        Kategoryzuje trasę na podstawie jej charakterystyki (reguły: TrailCategorizer).
+
+        Kategorie tras z magazynu są liczone raz, przy wczytaniu danych.
         """
-        difficulty = trail.get('difficulty', 1)
-        length = trail.get('length_km', 0)
-        elevation = trail.get('elevation_m', 0)
-        tags = trail.get('tags', [])
-        description = str(trail.get('description', '')).lower()
-        
-        # Zaczynamy od sprawdzenia trasy rodzinnej (najprostsze kryteria)
-        if difficulty == 1 and length < 5 and elevation < 200:
-            if (any(tag in ['leisure', 'park', 'playground', 'family'] for tag in tags) or
-                any(keyword in description for keyword in ['rodzin', 'łatw', 'spokojna', 'dziec'])):
-                return "rodzinna"
-            
-        # Następnie sprawdzamy trasę widokową
-        if (length < 15 and  # Trasy widokowe zazwyczaj nie są zbyt długie
-            (any(tag in ['viewpoint', 'scenic', 'tourism', 'view_point', 'panorama'] for tag in tags) or
-             any(keyword in description for keyword in ['widok', 'panoram', 'scenic', 'krajobraz', 'punkt widokowy']))):
-            return "widokowa"
-            
-        # Sprawdzamy trasę ekstremalną
-        if (difficulty == 3 or length > 15 or elevation > 800 or
-            any(tag in ['climbing', 'alpine', 'via_ferrata', 'extreme'] for tag in tags) or
-            any(keyword in description for keyword in ['ekstre', 'trudna', 'wymagając', 'alpejsk'])):
-            return "ekstremalna"
-            
-        # Jeśli trasa ma średnią trudność i długość, klasyfikujemy jako sportową
-        if ((difficulty == 2 and 5 <= length <= 15) or
-            any(keyword in description for keyword in ['sport', 'aktyw', 'kondycyj', 'wysiłk'])):
-            return "sportowa"
-            
-        # Jeśli nie pasuje do żadnej kategorii, przypisujemy na podstawie długości i trudności
-        if length < 5:
-            return "rodzinna"
-        elif length > 15 or difficulty == 3:
-            return "ekstremalna"
-        elif difficulty == 2 or 5 <= length <= 15:
-            return "sportowa"
-        else:
-            # Jeśli naprawdę nie możemy określić, dajemy widokową jako najbezpieczniejszą opcję
-            return "widokowa"
+        return TrailCategorizer.categorize(trail)
 
     def _calculate_comfort_indices(self, trails: List[Dict[str, Any]], 
                                 weather: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -81,27 +55,146 @@ class TrailRecommender:
         Returns:
             List[Dict[str, Any]]: Lista tras z dodanym indeksem komfortu
         """
-        if not weather:
+        if not weather or not trails:
             return trails
 
-        # Dla każdej trasy oblicz indywidualny indeks komfortu
-        for trail in trails:
-            # Dostosuj warunki pogodowe do specyfiki trasy
-            trail_weather = weather.copy()
-            
-            # Modyfikuj warunki w zależności od typu terenu i wysokości
-            if trail.get('terrain_type') == 'górski':
-                # W górach temperatura jest niższa (średnio o 0.6°C na 100m wysokości)
-                elevation = trail.get('elevation', 0)
-                temp_adjustment = (elevation / 100) * 0.6
-                trail_weather['temperature_2m_mean'] = weather.get('temperature_2m_mean', 0) - temp_adjustment
-                # W górach więcej opadów
-                trail_weather['precipitation_sum'] = weather.get('precipitation_sum', 0) * 1.2
-            
-            # Oblicz indeks komfortu dla konkretnej trasy
-            trail['comfort_index'] = WeatherUtils.calculate_hiking_comfort(trail_weather)
+        mountain = np.array([trail.get('terrain_type') == 'górski' for trail in trails])
+        elevation = np.array([trail.get('elevation_m') or 0 for trail in trails], dtype=np.float64)
+        comfort = self._comfort_index_array(mountain, elevation, weather)
+        for trail, comfort_index in zip(trails, comfort.tolist()):
+            trail['comfort_index'] = comfort_index
             
         return trails
+
+    @staticmethod
+    def _comfort_index_array(mountain: np.ndarray, elevation: np.ndarray,
+                             weather: Dict[str, Any]) -> np.ndarray:
+        """Indeksy komfortu dla tablic cech tras (teren górski, wysokość) przy danej pogodzie."""
+        return TrailRecommender._comfort_from_inputs(mountain, elevation,
+                                                     *WeatherUtils.comfort_inputs(weather))
+
+    @staticmethod
+    def _comfort_from_inputs(mountain: np.ndarray, elevation: np.ndarray, temperature,
+                             precipitation, cloud_cover) -> np.ndarray:
+        """
+        Indeksy komfortu dla cech tras przy warunkach z WeatherUtils.comfort_inputs.
+
+        Warunki mogą być tablicami o kształcie (dni, 1) - wynikiem jest wtedy
+        macierz dni x trasy liczona w jednym wektorowym przebiegu.
+        """
+        # Modyfikuj warunki w zależności od typu terenu i wysokości (poprawka, której
+        # wersja skalarna nie stosowała - zmieniała klucze nieczytane przez ocenę komfortu)
+        # W górach temperatura jest niższa (średnio o 0.6°C na 100m wysokości);
+        # brak wysokości (NaN w TrailTable) liczony jak 0 m
+        elevation = np.where(np.isnan(elevation), 0.0, elevation)
+        temperatures = np.where(mountain, temperature - (elevation / 100) * 0.6, temperature)
+        # W górach więcej opadów
+        precipitations = np.where(mountain, precipitation * 1.2, precipitation)
+
+        # Indeksy komfortu wszystkich tras w jednym wektorowym wywołaniu
+        return WeatherUtils.calculate_hiking_comfort_batch(temperatures, precipitations, cloud_cover)
+
+    def _get_city_features(self, city: Optional[str]) -> Dict[str, Any]:
+        """
+        Tabela tras miasta (None - wszystkich tras) z cechami potrzebnymi do rekomendacji, liczona raz.
+
+        Kategoria i czas przejścia są już kolumnami tabeli (liczone przy
+        wczytaniu danych), tutaj dochodzą punkty za teren i maska tras
+        górskich. Cechy są przeliczane dopiero po przeładowaniu danych o trasach.
+        """
+        source = self.data_handler.store.table
+        key = normalize_key(city)
+        cached = self._city_features.get(key)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+
+        with span("recommend.features"):
+            table = self.data_handler.get_trail_table(city)
+            terrain_codes = np.asarray([code for code, terrain in enumerate(table.terrain_type.categories)
+                                        if terrain == 'górski'], dtype=np.int32)
+            features = {
+                "table": table,
+                "terrain_score": WeightCalculator.terrain_scores(table),
+                "mountain": np.isin(table.terrain_type.codes, terrain_codes),
+            }
+        self._city_features[key] = (source, features)
+        return features
+
+    def warm_up(self, cities: Optional[List[str]] = None) -> None:
+        """
+        Wczytuje dane o trasach i liczy cechy tras miast (domyślnie z CITY_COORDINATES)
+        oraz indeks przestrzenny, żeby pierwsze zapytania nie płaciły za przygotowanie danych.
+        """
+        for city in (cities if cities is not None else CITY_COORDINATES):
+            self._get_city_features(city)
+        self.data_handler.store.get_spatial_index(self._get_city_features(None)["table"])
+
+    def _area_comfort(self, features: Dict[str, Any],
+                      weather: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Indeksy komfortu tras z `features` przy danej pogodzie (None bez pogody)."""
+        if not weather:
+            return None
+        with span("recommend.comfort"):
+            return self._comfort_index_array(features["mountain"], features["table"].elevation_m, weather)
+
+    def _get_area_features(self, city: str, center: Optional[Center] = None,
+                           radius_km: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Cechy tras w promieniu radius_km od center (domyślnie współrzędnych miasta).
+
+        Bez promienia - cechy tras miasta. Trasy w promieniu wybiera indeks
+        przestrzenny magazynu, a cechy są wycinkiem cech wszystkich tras,
+        uzupełnionym o odległości od środka (distance_km).
+        """
+        if radius_km is None:
+            return self._get_city_features(city)
+        features = self._get_city_features(None)
+        table = features["table"]
+        lat, lon = self.data_handler.get_center(city, center)
+        positions, distances = self.data_handler.store.get_spatial_index(table).within_radius(
+            lat, lon, radius_km)
+        return {
+            "table": table.take(positions),
+            "terrain_score": features["terrain_score"][positions],
+            "mountain": features["mountain"][positions],
+            "distance_km": distances,
+        }
+
+    def _rank(self, features: Dict[str, Any], comfort: Optional[np.ndarray],
+              weight_calculator: WeightCalculator, difficulty: Optional[int] = None,
+              terrain_type: Optional[str] = None, min_length: Optional[float] = None,
+              max_length: Optional[float] = None, category: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Filtruje i sortuje trasy miasta maskami NumPy; zwraca widoki wierszy."""
+        table = features["table"]
+        with span("recommend.filter"):
+            positions = np.flatnonzero(TrailCriteria(
+                difficulty=difficulty,
+                terrain_type=terrain_type,
+                min_length=min_length,
+                max_length=max_length,
+                category=category
+            ).mask(table))
+
+        with span("recommend.score"):
+            scores = weight_calculator.calculate_weighted_scores(
+                table.difficulty[positions], table.length_km[positions],
+                features["terrain_score"][positions],
+                comfort[positions] if comfort is not None else None
+            )
+        with span("recommend.rank"):
+            order = weight_calculator.top_positions(scores, 0, limit)
+            selected = positions[order].tolist()
+
+        trails = table.rows(selected)
+        distances = features.get("distance_km")
+        for trail, position, score in zip(trails, selected, scores[order].tolist()):
+            if comfort is not None:
+                trail['comfort_index'] = float(comfort[position])
+            trail['weighted_score'] = score
+            if distances is not None:
+                trail['distance_km'] = round(float(distances[position]), 2)
+        return trails
     
     def _calculate_trail_time(self, trail: Dict[str, Any]) -> float:
         """
@@ -140,6 +233,7 @@ class TrailRecommender:
         
         return round(total_time, 1)
 
+    @timed("recommend.trails")
     def recommend_trails(
         self,
         city: str,
@@ -152,62 +246,147 @@ class TrailRecommender:
         max_precipitation: Optional[float] = None,
         min_temperature: Optional[float] = None,
         max_temperature: Optional[float] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+        limit: Optional[int] = None,
+        export: bool = True,
+        center: Optional[Center] = None,
+        radius_km: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Rekomenduje trasy na podstawie różnych kryteriów."""
+        """
+        Rekomenduje trasy na podstawie różnych kryteriów.
+
+        Bez `weights` wagi są pobierane od użytkownika; `limit` ogranicza
+        liczbę zwróconych najlepszych tras, a `export=False` pomija zapis
+        wyników do plików. Zapis odbywa się w tle (BackgroundExporter).
+        Z `radius_km` brane są trasy w tej odległości od `center`
+        (domyślnie współrzędnych miasta) zamiast tras regionu miasta;
+        pogoda jest nadal pobierana dla miasta. Dzień, którego prognoza nie
+        spełnia kryteriów pogodowych (min_sunshine, max_precipitation,
+        min_temperature, max_temperature), daje pustą listę.
+        """
         try:
-            # Pobierz wszystkie trasy dla danego miasta
-            trails = self.data_handler.get_trails_for_city(city)
-            if not trails:
-                print(f"Nie znaleziono tras dla miasta {city}")
+            # Pobierz wszystkie trasy dla danego miasta (lub w promieniu od punktu)
+            # Widoki wierszy tabeli kolumnowej - zmiany (czas, indeks komfortu) nie modyfikują
+            # współdzielonych danych magazynu tras
+            features = self._get_area_features(city, center, radius_km)
+            table = features["table"]
+            area = f"miasta {city}" if radius_km is None else f"promienia {radius_km} km"
+            if not len(table):
+                print(f"Nie znaleziono tras dla {area}")
                 return []
 
-            print(f"\nZnaleziono {len(trails)} szlaków dla miasta {city}")
+            print(f"\nZnaleziono {len(table)} szlaków dla {area}")
 
             # Pobieranie prognozy pogody
             print(f"\nPobieranie danych pogodowych dla {city} na dzień {date}...")
             weather = self.data_handler.weather_api.get_weather_forecast(city, date)
-            
-            # Dodaj kategorię i szacowany czas przejścia do każdej trasy
-            for trail in trails:
-                trail['category'] = self._categorize_trail(trail)
-                trail['estimated_time'] = TimeCalculator.calculate_time(trail)
-            
-            # Filtrowanie tras używając wyrażenia lambda
-            filtered_trails = list(filter(
-                lambda trail: (
-                    (difficulty is None or trail.get('difficulty') == difficulty) and
-                    (terrain_type is None or trail.get('terrain_type') == terrain_type) and
-                    (min_length is None or trail.get('length_km', 0) >= min_length) and
-                    (max_length is None or trail.get('length_km', 0) <= max_length) and
-                    (category is None or trail.get('category') == category)
-                ),
-                trails
-            ))
-
-            # Dodawanie indeksu komfortu do tras
-            if weather:
-                filtered_trails = self._calculate_comfort_indices(filtered_trails, weather)
-                
-            # Get weights from user and sort trails
-            weights = self.weight_calculator.get_weights_from_user()            
-            filtered_trails = self.weight_calculator.sort_trails_by_weights(filtered_trails, weather or {})
+            reason = WeatherUtils.weather_rejection(weather, min_sunshine, max_precipitation,
+                                                    min_temperature, max_temperature)
+            if reason is not None:
+                print(f"Dzień {date} nie spełnia kryteriów pogodowych dla {city}: {reason}")
+                return []
+            comfort = self._area_comfort(features, weather)
+
+            if weights is None:
+                self.weight_calculator.get_weights_from_user()
+            else:
+                self.weight_calculator.set_weights(weights)
+
+            # Kryteria (także kategoria) sprawdzane maską na kolumnach tabeli, wyniki liczone wektorowo
+            filtered_trails = self._rank(features, comfort, self.weight_calculator,
+                                         difficulty=difficulty, terrain_type=terrain_type,
+                                         min_length=min_length, max_length=max_length,
+                                         category=category, limit=limit)
             
             # Informacja o liczbie znalezionych tras
             if filtered_trails:
                 print(f"\nZnaleziono {len(filtered_trails)} tras spełniających kryteria.")
                 
-                # Zapisz wyniki do różnych formatów
-                from utils.export_results import ResultExporter
-                ResultExporter.export_results(city, date, filtered_trails, weather)
-                print("\nWyświetlam szczegóły znalezionych tras:")
-                print("=" * 50)
+                if export:
+                    # Zapisz wyniki do wybranych formatów w tle - bez czekania na dysk
+                    self.exporter.submit(city, date, filtered_trails, weather)
+                    print("\nWyświetlam szczegóły znalezionych tras:")
+                    print("=" * 50)
 
             return filtered_trails
 
         except Exception as e:
             print(f"Błąd podczas rekomendacji tras: {e}")
             return []
+
+    @timed("recommend.batch")
+    def recommend_batch(self, queries: List[Dict[str, Any]],
+                        errors: Optional[Dict[int, str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Rekomendacje dla wielu zapytań bez interakcji z użytkownikiem.
+
+        Każde zapytanie to słownik z kluczami QUERY_FIELDS (city i date są
+        wymagane, `weights` jak w WeightCalculator.set_weights, `limit`
+        ogranicza liczbę zwróconych tras, `center`/`radius_km` jak
+        w recommend_trails). Zapytania są grupowane po (miasto, data): cechy
+        tras miasta są liczone raz, pogoda pobierana raz na grupę, a indeks
+        komfortu liczony raz dla wszystkich tras miasta (dla zapytań
+        z promieniem - dla tras w promieniu). Kryteria pogodowe odrzucają
+        cały dzień (pusta lista) jak w recommend_trails, a zapytania bez
+        `weights` używają wag rekomendatora (domyślnie DEFAULT_WEIGHTS).
+        Wyniki nie są eksportowane do plików.
+
+        Returns:
+            Lista wyników w kolejności zapytań; błędne zapytanie daje pustą
+            listę, a opis błędu trafia do `errors` (numer zapytania -> komunikat).
+        """
+        errors = errors if errors is not None else {}
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for index, query in enumerate(queries):
+            unknown = set(query) - set(QUERY_FIELDS)
+            if unknown or not query.get("city") or not query.get("date"):
+                print(f"Nieprawidłowe zapytanie nr {index}: {query}")
+                errors[index] = ("Nieznane pola zapytania: " + ", ".join(sorted(unknown)) if unknown
+                                 else "Pola city i date są wymagane")
+                continue
+            groups.setdefault((query["city"], query["date"]), []).append(index)
+
+        for (city, date), indices in groups.items():
+            try:
+                weather = self.data_handler.weather_api.get_weather_forecast(city, date)
+                city_features = city_comfort = None
+                if any(queries[index].get("radius_km") is None for index in indices):
+                    city_features = self._get_city_features(city)
+                    city_comfort = self._area_comfort(city_features, weather)
+            except Exception as e:
+                print(f"Błąd podczas przygotowania danych dla {city} na dzień {date}: {e}")
+                errors.update(dict.fromkeys(indices, f"Błąd podczas przygotowania danych: {e}"))
+                continue
+
+            weight_calculator = WeightCalculator()
+            for index in indices:
+                query = queries[index]
+                try:
+                    reason = WeatherUtils.weather_rejection(
+                        weather, query.get("min_sunshine"), query.get("max_precipitation"),
+                        query.get("min_temperature"), query.get("max_temperature"))
+                    if reason is not None:
+                        continue
+                    weight_calculator.set_weights(query.get("weights") or self.weight_calculator.weights)
+                    if query.get("radius_km") is None:
+                        features, comfort = city_features, city_comfort
+                    else:
+                        features = self._get_area_features(city, query.get("center"), query["radius_km"])
+                        comfort = self._area_comfort(features, weather)
+                    results[index] = self._rank(features, comfort, weight_calculator,
+                                                difficulty=query.get("difficulty"),
+                                                terrain_type=query.get("terrain_type"),
+                                                min_length=query.get("min_length"),
+                                                max_length=query.get("max_length"),
+                                                category=query.get("category"),
+                                                limit=query.get("limit"))
+                except Exception as e:
+                    print(f"Błąd podczas rekomendacji dla zapytania nr {index}: {e}")
+                    errors[index] = f"Błąd podczas rekomendacji: {e}"
+
+        return results
             
     def _save_recommendations_to_file(self, city: str, date: str, trails: List[Dict[str, Any]], 
                                     weather: Optional[Dict[str, Any]] = None):
@@ -0,0 +1,178 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+import os
+import sys
+
+import numpy as np
+
+# Dodaj katalog projektu do ścieżki Pythona
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from data_handlers.trail_data import Center
+from recommendation.trail_recommender import TrailRecommender
+from utils.filters import TrailCriteria
+from utils.weather_utils import WeatherUtils
+from utils.weight_calculator import WeightCalculator
+from utils.profiling import span, timed
+from config import PLANNER_DEFAULT_LIMIT, PLANNER_MAX_DAYS
+
+# Parametry przyjmowane przez plan_trips (poza `weather`)
+PLAN_FIELDS = ("city", "start_date", "end_date", "difficulty", "terrain_type", "min_length", "max_length",
+               "min_sunshine", "max_precipitation", "min_temperature", "max_temperature",
+               "category", "weights", "limit", "trail_limit", "center", "radius_km")
+
+
+class TripPlanner:
+    """
+    Wybór najlepszego dnia na wycieczkę w oknie dat.
+
+    Zamiast osobnej rekomendacji dla każdego dnia pogoda całego okna jest
+    pobierana jednym zapytaniem (WeatherAPI.get_weather_batch), a indeksy
+    komfortu i ważone wyniki wszystkich tras spełniających kryteria liczone
+    są naraz jako macierz dni x trasy. Wyniki dla pojedynczego dnia są
+    identyczne z recommend_trails dla tej daty.
+    """
+
+    def __init__(self, recommender: Optional[TrailRecommender] = None):
+        self.recommender = recommender if recommender is not None else TrailRecommender()
+
+    @staticmethod
+    def _dates(start_date: str, end_date: str) -> List[str]:
+        """Kolejne dni okna [start_date, end_date]; ValueError dla błędnego okna."""
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        days = (end - start).days + 1
+        if days < 1:
+            raise ValueError(f"Data końcowa {end_date} jest wcześniejsza niż początkowa {start_date}")
+        if days > PLANNER_MAX_DAYS:
+            raise ValueError(f"Okno dat jest za długie: {days} dni (maks. {PLANNER_MAX_DAYS})")
+        return [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days)]
+
+    @staticmethod
+    def _weather_arrays(records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Warunki komfortu kolejnych dni jako kolumny (dni, 1) - do rozgłaszania na trasy."""
+        inputs = [WeatherUtils.comfort_inputs(weather) for weather in records]
+        return tuple(np.array([values[index] for values in inputs], dtype=np.float64)[:, None]
+                     for index in range(3))
+
+    @timed("plan.trips")
+    def plan_trips(
+        self,
+        city: str,
+        start_date: str,
+        end_date: str,
+        difficulty: Optional[int] = None,
+        terrain_type: Optional[str] = None,
+        min_length: Optional[float] = None,
+        max_length: Optional[float] = None,
+        min_sunshine: Optional[float] = None,
+        max_precipitation: Optional[float] = None,
+        min_temperature: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        category: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+        limit: Optional[int] = PLANNER_DEFAULT_LIMIT,
+        trail_limit: Optional[int] = PLANNER_DEFAULT_LIMIT,
+        center: Optional[Center] = None,
+        radius_km: Optional[float] = None,
+        weather: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Najlepsze pary (trasa, dzień) i najlepszy dzień każdej trasy w oknie dat.
+
+        Kryteria tras, `weights` (domyślnie wagi rekomendatora, początkowo
+        DEFAULT_WEIGHTS), `center` i `radius_km` jak w recommend_trails. Kryteria pogodowe wykluczają
+        całe dni, podobnie jak dni bez danych pogodowych. `weather`
+        ({data: rekord}) zastępuje pobieranie pogody dla miasta.
+
+        Returns:
+            Słownik z kluczami: dates (ocenione dni), skipped ({data: powód}),
+            weather ({data: rekord}), trail_count (trasy spełniające kryteria),
+            best - `limit` najlepszych par (trasa, dzień) oraz best_days -
+            `trail_limit` tras z najwyższym wynikiem w ich najlepszym dniu
+            (None - bez ograniczenia, także dla `limit`). Trasy to widoki wierszy z polami date,
+            comfort_index i weighted_score (oraz distance_km dla promienia).
+        """
+        dates = self._dates(start_date, end_date)
+        if weather is None:
+            with span("plan.weather"):
+                weather = self.recommender.data_handler.weather_api.get_weather_batch(
+                    [city], start_date, end_date).get(city, {})
+
+        plan: Dict[str, Any] = {"city": city, "start_date": start_date, "end_date": end_date,
+                                "dates": [], "skipped": {}, "weather": {}, "trail_count": 0,
+                                "best": [], "best_days": []}
+        for date in dates:
+            record = weather.get(date)
+            reason = ("brak danych pogodowych" if not record else
+                      WeatherUtils.weather_rejection(record, min_sunshine, max_precipitation,
+                                                     min_temperature, max_temperature))
+            if reason is not None:
+                plan["skipped"][date] = reason
+                continue
+            plan["dates"].append(date)
+            plan["weather"][date] = record
+
+        weight_calculator = WeightCalculator()
+        weight_calculator.set_weights(weights if weights is not None else self.recommender.weight_calculator.weights)
+
+        features = self.recommender._get_area_features(city, center, radius_km)
+        table = features["table"]
+        with span("recommend.filter"):
+            positions = np.flatnonzero(TrailCriteria(
+                difficulty=difficulty,
+                terrain_type=terrain_type,
+                min_length=min_length,
+                max_length=max_length,
+                category=category
+            ).mask(table))
+        plan["trail_count"] = len(positions)
+        if not plan["dates"] or not len(positions):
+            return plan
+
+        # Macierz dni x trasy: warunki dni jako kolumny, cechy tras jako wiersze. Komfort
+        # zależy od trasy tylko w terenie górskim (wysokość), pozostałe trasy dostają
+        # wartość dnia - te same liczby co pełne obliczenie, bez macierzowych pośredników
+        with span("plan.comfort"):
+            conditions = self._weather_arrays([plan["weather"][date] for date in plan["dates"]])
+            mountain = features["mountain"][positions]
+            comfort = np.empty((len(plan["dates"]), len(positions)))
+            comfort[:] = WeatherUtils.calculate_hiking_comfort_batch(*conditions)
+            if mountain.any():
+                comfort[:, mountain] = self.recommender._comfort_from_inputs(
+                    True, table.elevation_m[positions][mountain], *conditions)
+        with span("plan.score"):
+            scores = weight_calculator.calculate_weighted_scores(
+                table.difficulty[positions], table.length_km[positions],
+                features["terrain_score"][positions], comfort)
+            # Przy zerowej wadze pogody wynik nie zależy od dnia i ma kształt (trasy,)
+            scores = np.broadcast_to(scores, comfort.shape)
+
+        with span("plan.rank"):
+            trail_count = len(positions)
+            # Pary w kolejności (dzień, trasa) - przy remisie wygrywa wcześniejszy dzień
+            best_pairs = weight_calculator.top_positions(scores.ravel(), 0, limit)
+            # Najlepszy dzień każdej trasy (argmax zwraca pierwszy, czyli najwcześniejszy, z równych)
+            best_day = np.argmax(scores, axis=0)
+            columns = np.arange(trail_count)
+            best_scores = scores[best_day, columns]
+            best_trails = weight_calculator.top_positions(best_scores, 0, trail_limit)
+
+        distances = features.get("distance_km")
+
+        def rows(day_indices: np.ndarray, trail_indices: np.ndarray) -> List[Dict[str, Any]]:
+            selected = positions[trail_indices]
+            trails = table.rows(selected)
+            for trail, day, column, position in zip(trails, day_indices.tolist(), trail_indices.tolist(),
+                                                    selected.tolist()):
+                trail['date'] = plan["dates"][day]
+                trail['comfort_index'] = float(comfort[day, column])
+                trail['weighted_score'] = float(scores[day, column])
+                if distances is not None:
+                    trail['distance_km'] = round(float(distances[position]), 2)
+            return trails
+
+        plan["best"] = rows(best_pairs // trail_count, best_pairs % trail_count)
+        plan["best_days"] = rows(best_day[best_trails], best_trails)
+        return plan
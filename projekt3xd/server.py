@@ -0,0 +1,407 @@
+"""
+Usługa HTTP systemu rekomendacji szlaków turystycznych (aiohttp).
+
+    python server.py --host 127.0.0.1 --port 8080
+
+Dane o szlakach, indeksy i cache pogody są wczytywane raz, przy starcie,
+i współdzielone przez wszystkie zapytania. Filtrowanie, punktacja i pobieranie
+pogody działają w puli wątków, więc pętla zdarzeń nie jest blokowana.
+Do pracy bez sieci: api/stub_upstream.py i zmienne P3XD_OPEN_METEO_API, P3XD_OVERPASS_API.
+
+Endpointy:
+    GET/POST /recommend        rekomendacje dla jednego zapytania (parametry jak recommend_trails)
+    POST     /recommend/batch  {"queries": [...]} - wiele zapytań naraz (błąd zapytania: {"error": ...})
+    GET      /trails           szlaki według kryteriów, regionu lub promienia (offset, limit)
+    GET      /trails/{id}      jeden szlak
+    GET      /plan             najlepsze trasy i dni w oknie start_date - end_date (parametry jak plan_trips)
+    GET      /weather          pogoda dla miasta: date albo start_date i end_date
+    GET      /metrics          liczba zapytań, błędów i opóźnienia p50/p99 dla każdego endpointu
+    GET      /health
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+from aiohttp import web
+
+# Dodaj katalog projektu do ścieżki Pythona
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_root)
+
+from config import (CITY_COORDINATES, SERVER_HOST, SERVER_PORT, SERVER_WORKERS,
+                    SERVER_LATENCY_WINDOW)
+from data_handlers.trail_data import TrailDataHandler
+from recommendation.trail_recommender import QUERY_FIELDS, TrailRecommender
+from recommendation.trip_planner import PLAN_FIELDS, TripPlanner
+from utils.filters import TrailCriteria
+from utils.weight_calculator import DEFAULT_WEIGHTS, WeightCalculator
+
+# Typy parametrów przekazywanych w adresie zapytania
+INT_PARAMS = ("difficulty", "limit", "offset", "trail_limit")
+FLOAT_PARAMS = ("min_length", "max_length", "min_sunshine", "max_precipitation", "min_temperature",
+                "max_temperature", "radius_km", "lat", "lon")
+# Domyślny rozmiar strony wyników /trails
+DEFAULT_TRAILS_LIMIT = 50
+
+
+class LatencyStats:
+    """Liczniki zapytań i błędów oraz percentyle opóźnień ostatnich `window` zapytań endpointu."""
+
+    def __init__(self, window: int = SERVER_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+                self._counts[endpoint] = [0, 0]
+            samples.append(seconds)
+            self._counts[endpoint][0] += 1
+            self._counts[endpoint][1] += failed
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {endpoint: np.fromiter(values, dtype=np.float64, count=len(values))
+                       for endpoint, values in self._samples.items()}
+            counts = {endpoint: list(values) for endpoint, values in self._counts.items()}
+        report = {}
+        for endpoint, values in sorted(samples.items()):
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            report[endpoint] = {
+                "requests": counts[endpoint][0],
+                "errors": counts[endpoint][1],
+                "p50_ms": round(float(p50), 3),
+                "p99_ms": round(float(p99), 3),
+                "mean_ms": round(float(values.mean()) * 1000, 3),
+            }
+        return report
+
+
+def _json_default(value: Any) -> Any:
+    """Wiersze TrailTable (TrailRow) i skalary NumPy w odpowiedziach JSON."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Obiekt typu {type(value).__name__} nie jest serializowalny do JSON")
+
+
+_dumps = partial(json.dumps, ensure_ascii=False, default=_json_default)
+
+
+def _json(data: Any, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=_dumps({"error": message}), content_type="application/json")
+
+
+def _parse_params(params: Mapping[str, str]) -> Dict[str, Any]:
+    """Parametry adresu zamienione na typy (liczby, wagi "klucz:wartość,...", środek z lat/lon)."""
+    query: Dict[str, Any] = {}
+    for name, value in params.items():
+        if value == "":
+            continue
+        try:
+            if name in INT_PARAMS:
+                query[name] = int(value)
+            elif name in FLOAT_PARAMS:
+                query[name] = float(value)
+            elif name == "weights":
+                query[name] = {key.strip(): float(weight) for key, weight in
+                               (item.split(":", 1) for item in value.split(","))}
+            else:
+                query[name] = value
+        except ValueError:
+            raise _bad_request(f"Nieprawidłowa wartość parametru {name}: {value}")
+    if "lat" in query or "lon" in query:
+        if "lat" not in query or "lon" not in query:
+            raise _bad_request("Środek wyszukiwania wymaga obu parametrów: lat i lon")
+        query["center"] = (query.pop("lat"), query.pop("lon"))
+    return query
+
+
+def _check_date(value: Any, name: str = "date") -> str:
+    try:
+        datetime.strptime(str(value), "%Y-%m-%d")
+    except ValueError:
+        raise _bad_request(f"Nieprawidłowy format daty {name}: {value} (oczekiwano RRRR-MM-DD)")
+    return value
+
+
+def _check_city(city: Any) -> str:
+    if city not in CITY_COORDINATES:
+        raise _bad_request(f"Nieznane miasto: {city}. Dostępne: {', '.join(CITY_COORDINATES)}")
+    return city
+
+
+def _check_types(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Typy pól zapytania JSON jak przy parametrach adresu (INT_PARAMS, FLOAT_PARAMS, pozostałe - tekst)."""
+    for name, value in query.items():
+        if value is None or name == "weights":
+            continue
+        if name == "center":
+            try:
+                TrailDataHandler.get_center(center=value)
+            except (KeyError, TypeError, ValueError):
+                raise _bad_request(f'Nieprawidłowy środek wyszukiwania: {value} (oczekiwano {{"lat": ..., "lon": ...}})')
+            continue
+        if name in INT_PARAMS:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        elif name in FLOAT_PARAMS:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, str)
+        if not valid:
+            raise _bad_request(f"Nieprawidłowa wartość pola {name}: {value!r}")
+    return query
+
+
+def _validate_query(query: Any) -> Dict[str, Any]:
+    """Zapytanie rekomendacji (klucze QUERY_FIELDS); błędy zamieniane na HTTP 400."""
+    if not isinstance(query, dict):
+        raise _bad_request("Zapytanie musi być obiektem JSON")
+    unknown = set(query) - set(QUERY_FIELDS)
+    if unknown:
+        raise _bad_request(f"Nieznane pola zapytania: {', '.join(sorted(unknown))}")
+    if not query.get("city") or not query.get("date"):
+        raise _bad_request("Pola city i date są wymagane")
+    _check_types(query)
+    _check_city(query["city"])
+    _check_date(query["date"])
+    return _check_weights(query)
+
+
+def _check_weights(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Uzupełnia brakujące wagi wartościami DEFAULT_WEIGHTS i sprawdza podane."""
+    if query.get("weights") is None:
+        query["weights"] = dict(DEFAULT_WEIGHTS)
+    try:
+        WeightCalculator().set_weights(query["weights"])
+    except (ValueError, TypeError, AttributeError) as e:
+        raise _bad_request(f"Nieprawidłowe wagi: {e}")
+    return query
+
+
+class TrailService:
+    """
+    Stan usługi współdzielony przez zapytania: dane o szlakach, rekomendator,
+    pula wątków do obliczeń oraz statystyki opóźnień.
+    """
+
+    def __init__(self, data_handler: Optional[TrailDataHandler] = None,
+                 recommender: Optional[TrailRecommender] = None,
+                 workers: int = SERVER_WORKERS, refresh_policy: Optional[str] = None):
+        self.data_handler = data_handler
+        self.recommender = recommender
+        self.planner: Optional[TripPlanner] = None
+        self.refresh_policy = refresh_policy
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="p3xd-worker")
+        self.stats = LatencyStats()
+        self.started_at = time.time()
+
+    async def run(self, function: Callable, *args, **kwargs) -> Any:
+        """Wykonuje funkcję w puli wątków usługi."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    async def on_startup(self, app: web.Application) -> None:
+        # Dane wczytywane raz (w puli wątków) - pierwsze zapytanie nie płaci za start
+        if self.data_handler is None:
+            self.data_handler = await self.run(TrailDataHandler, refresh_policy=self.refresh_policy)
+        if self.recommender is None:
+            self.recommender = TrailRecommender(self.data_handler)
+        self.planner = TripPlanner(self.recommender)
+        started = time.perf_counter()
+        await self.run(self.recommender.warm_up)
+        print(f"Dane o szlakach przygotowane w {time.perf_counter() - started:.2f} s "
+              f"({len(self.data_handler.store.table)} szlaków)")
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        self.executor.shutdown(wait=True)
+
+    @web.middleware
+    async def metrics_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            resource = request.match_info.route.resource
+            endpoint = f"{request.method} {resource.canonical if resource is not None else 'unmatched'}"
+            self.stats.record(endpoint, time.perf_counter() - started, status >= 400)
+
+    async def _json_body(self, request: web.Request) -> Any:
+        try:
+            return await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise _bad_request("Treść zapytania nie jest poprawnym JSON")
+
+    async def recommend(self, request: web.Request) -> web.Response:
+        if request.method == "POST":
+            query = await self._json_body(request)
+        else:
+            query = _parse_params(request.query)
+        query = _validate_query(query)
+        errors: Dict[int, str] = {}
+        trails = (await self.run(self.recommender.recommend_batch, [query], errors))[0]
+        if errors:
+            raise _bad_request(errors[0])
+        return _json({"query": query, "count": len(trails), "trails": trails})
+
+    async def recommend_batch(self, request: web.Request) -> web.Response:
+        body = await self._json_body(request)
+        queries = body.get("queries") if isinstance(body, dict) else None
+        if not isinstance(queries, list):
+            raise _bad_request('Oczekiwano obiektu {"queries": [...]}')
+        # Każde zapytanie sprawdzane osobno - błędne nie odrzuca całej paczki
+        errors: Dict[int, str] = {}
+        valid: List[int] = []
+        for index, query in enumerate(queries):
+            try:
+                queries[index] = _validate_query(query)
+                valid.append(index)
+            except web.HTTPBadRequest as e:
+                errors[index] = json.loads(e.text)["error"]
+        run_errors: Dict[int, str] = {}
+        valid_results = await self.run(self.recommender.recommend_batch,
+                                       [queries[index] for index in valid], run_errors)
+        results: List[Any] = [None] * len(queries)
+        for position, index in enumerate(valid):
+            results[index] = valid_results[position]
+            if position in run_errors:
+                errors[index] = run_errors[position]
+        # Nieudane zapytanie dostaje {"error": ...} zamiast listy tras
+        for index, message in errors.items():
+            results[index] = {"error": message}
+        return _json({"count": len(results), "errors": len(errors), "results": results})
+
+    def _find_trails(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        table = self.data_handler.get_trail_table(query.get("city"), query.get("center"),
+                                                  query.get("radius_km"))
+        positions = np.flatnonzero(TrailCriteria(
+            difficulty=query.get("difficulty"),
+            terrain_type=query.get("terrain_type"),
+            min_length=query.get("min_length"),
+            max_length=query.get("max_length"),
+            category=query.get("category")
+        ).mask(table))
+        offset = max(0, query.get("offset", 0))
+        limit = max(0, query.get("limit", DEFAULT_TRAILS_LIMIT))
+        page = positions[offset:offset + limit]
+        return {"total": len(positions), "offset": offset,
+                "trails": [table.record(position) for position in page.tolist()]}
+
+    async def trails(self, request: web.Request) -> web.Response:
+        query = _parse_params(request.query)
+        if query.get("city") is not None:
+            _check_city(query["city"])
+        if query.get("center") is not None and query.get("radius_km") is None:
+            raise _bad_request("Wyszukiwanie wokół punktu wymaga parametru radius_km")
+        try:
+            return _json(await self.run(self._find_trails, query))
+        except ValueError as e:
+            raise _bad_request(str(e))
+
+    async def trail(self, request: web.Request) -> web.Response:
+        trail = await self.run(self.data_handler.get_trail_by_id, request.match_info["trail_id"])
+        if trail is None:
+            raise web.HTTPNotFound(text=_dumps({"error": "Nie znaleziono szlaku"}),
+                                   content_type="application/json")
+        return _json(trail)
+
+    async def plan(self, request: web.Request) -> web.Response:
+        query = _parse_params(request.query)
+        unknown = set(query) - set(PLAN_FIELDS)
+        if unknown:
+            raise _bad_request(f"Nieznane parametry: {', '.join(sorted(unknown))}")
+        _check_city(query.get("city"))
+        _check_date(query.get("start_date", ""), "start_date")
+        _check_date(query.get("end_date", ""), "end_date")
+        _check_weights(query)
+        try:
+            return _json(await self.run(self.planner.plan_trips, **query))
+        except ValueError as e:
+            raise _bad_request(str(e))
+
+    async def weather(self, request: web.Request) -> web.Response:
+        city = _check_city(request.query.get("city"))
+        weather_api = self.data_handler.weather_api
+        if "start_date" in request.query or "end_date" in request.query:
+            start_date = _check_date(request.query.get("start_date", ""), "start_date")
+            end_date = _check_date(request.query.get("end_date", ""), "end_date")
+            records = await self.run(weather_api.get_weather_batch, [city], start_date, end_date)
+            return _json({"city": city, "weather": records.get(city, {})})
+        date = _check_date(request.query.get("date", ""))
+        weather = await self.run(weather_api.get_weather_forecast, city, date)
+        if weather is None:
+            raise web.HTTPNotFound(text=_dumps({"error": f"Brak danych pogodowych dla {city} na dzień {date}"}),
+                                   content_type="application/json")
+        return _json({"city": city, "date": date, "weather": weather})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return _json({
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "trails": len(self.data_handler.store.table),
+            "weather_cache": self.data_handler.weather_api.cache.stats(),
+            "endpoints": self.stats.snapshot(),
+        })
+
+    async def health(self, request: web.Request) -> web.Response:
+        return _json({"status": "ok"})
+
+
+def create_app(service: Optional[TrailService] = None) -> web.Application:
+    """Aplikacja aiohttp z endpointami usługi (stan w TrailService)."""
+    service = service if service is not None else TrailService()
+    app = web.Application(middlewares=[service.metrics_middleware])
+    app["service"] = service
+    app.on_startup.append(service.on_startup)
+    app.on_cleanup.append(service.on_cleanup)
+    app.router.add_get("/recommend", service.recommend)
+    app.router.add_post("/recommend", service.recommend)
+    app.router.add_post("/recommend/batch", service.recommend_batch)
+    app.router.add_get("/trails", service.trails)
+    app.router.add_get("/trails/{trail_id}", service.trail)
+    app.router.add_get("/plan", service.plan)
+    app.router.add_get("/weather", service.weather)
+    app.router.add_get("/metrics", service.metrics)
+    app.router.add_get("/health", service.health)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS,
+                        help='Liczba wątków do obliczeń i pobierania danych')
+    parser.add_argument('--refresh-policy', choices=TrailDataHandler.REFRESH_POLICIES,
+                        help='Polityka odświeżania danych o szlakach (domyślnie z config.py)')
+    args = parser.parse_args()
+    service = TrailService(workers=args.workers, refresh_policy=args.refresh_policy)
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+# Dodaj katalog projektu do ścieżki Pythona
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from api.weather_api import WeatherAPI
+from api.weather_cache import WeatherCache
+from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_store import TrailStore
+from recommendation.trail_recommender import TrailRecommender
+
+TRAILS = [
+    {"id": "1", "name": "Dolina", "region": "Kraków", "length_km": 8.0, "elevation_m": 150.0,
+     "difficulty": 1, "terrain_type": "leśny", "tags": []},
+    {"id": "2", "name": "Grań", "region": "Kraków", "length_km": 14.0, "elevation_m": 900.0,
+     "difficulty": 3, "terrain_type": "górski", "tags": []},
+]
+WEATHER = {"temperature_min": 12.0, "temperature_max": 20.0, "precipitation": 0.0,
+           "sunshine_hours": 8.0, "cloud_cover": 30.0, "wind_speed": 10.0}
+
+
+@pytest.fixture
+def make_recommender(tmp_path):
+    """TrailRecommender nad podanymi trasami i prognozami ({(miasto, data): rekord}) bez sieci."""
+    def make(trails, weather=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = TrailDataHandler(refresh_policy="never")
+            handler.store = TrailStore(str(tmp_path / "trails_data.json"))
+            handler.store.save(trails)
+            handler.weather_api = WeatherAPI(cache=WeatherCache(persistent=False))
+        for (city, date), record in (weather or {}).items():
+            handler.weather_api.cache.put(handler.weather_api._cache_key(city, date), record)
+        return TrailRecommender(handler)
+    return make
@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+
+from utils.data_storage import DataStorage
+
+WRITERS = 4
+APPENDS = 50
+
+
+def _append(data_dir: str, writer: int) -> None:
+    # Mały próg kompaktowania - scalanie dziennika przeplata się z dopisywaniem innych procesów
+    storage = DataStorage(data_dir, compaction_min_bytes=256, max_bytes=None, max_age_hours=None)
+    for number in range(APPENDS):
+        storage.append_data("weather_cache.json", {f"{writer}-{number}": {"writer": writer}})
+
+
+def test_concurrent_appends_lose_no_writes(tmp_path):
+    processes = [multiprocessing.Process(target=_append, args=(str(tmp_path), writer))
+                 for writer in range(WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    storage = DataStorage(str(tmp_path), max_bytes=None, max_age_hours=None)
+    data = storage.load_data("weather_cache.json")
+    assert sorted(data) == sorted(f"{writer}-{number}" for writer in range(WRITERS)
+                                  for number in range(APPENDS))
+
+
+def test_reads_and_clear_leave_no_lock_files(tmp_path):
+    storage = DataStorage(str(tmp_path), max_bytes=None, max_age_hours=None)
+    storage.save_data_to_cache([1, 2], "trails_kraków.json")
+    storage.append_data("weather_cache.json", {"a": 1})
+    assert storage.load_data_from_cache("trails_kraków.json") == [1, 2]
+    assert storage.load_data_from_cache("trails_gdańsk.json") is None
+    (tmp_path / "weather_old.json.lock").write_bytes(b"")
+
+    storage.clear_cache("trails_kraków.json")
+    storage.clear_cache()
+
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".json.lock")]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith((".json", ".log"))]
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from api.overpass_stream import OverpassStreamParser, iter_overpass_elements
+
+ELEMENTS = [
+    {"type": "node", "id": 1, "lat": 50.06, "lon": 19.94, "tags": {"name": "Źródło \"Kasprowe\""}},
+    {"type": "way", "id": 2, "nodes": [1, 3], "tags": {"ele": -1.5e3, "oneway": True, "ref": None}},
+    {"type": "relation", "id": 3, "members": [{"type": "way", "ref": i, "role": ""} for i in range(200)],
+     "tags": {"name": "Szlak \\u00f3 ☃"}},
+]
+RESPONSE = json.dumps({"version": 0.6, "elements": ELEMENTS,
+                       "remark": "runtime remark: ok"}, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000, len(RESPONSE)])
+def test_elements_split_across_chunks_are_parsed(size):
+    chunks = [RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)]
+
+    assert list(iter_overpass_elements(chunks)) == ELEMENTS
+
+
+def test_malformed_element_raises_without_buffering_the_rest():
+    parser = OverpassStreamParser()
+
+    with pytest.raises(ValueError, match="Niepoprawny JSON"):
+        parser.feed(b'{"elements": [{"a": 1}, xx {"b": 2}, {"c": 3}, {"d": 4}, {"e": 5}, ')
+
+
+def test_truncated_response_is_reported_on_close():
+    parser = OverpassStreamParser()
+    elements = parser.feed(RESPONSE[:RESPONSE.index(b'"relation"') + 30])
+
+    assert elements == ELEMENTS[:2]
+    with pytest.raises(ValueError, match="Niekompletna"):
+        parser.close()
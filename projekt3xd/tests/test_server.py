@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from conftest import TRAILS, WEATHER
+from server import TrailService, _validate_query, create_app
+
+QUERY = {"city": "Kraków", "date": "2030-06-01"}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("difficulty", "x"), ("difficulty", 1.5), ("difficulty", True), ("radius_km", "abc"),
+    ("min_sunshine", [4]), ("terrain_type", 3), ("center", {"lat": 50.0}), ("center", "50,19"),
+])
+def test_query_with_wrong_field_type_is_rejected(field, value):
+    with pytest.raises(web.HTTPBadRequest):
+        _validate_query(dict(QUERY, **{field: value}))
+
+
+def test_query_with_typed_fields_is_accepted():
+    query = _validate_query(dict(QUERY, difficulty=2, radius_km=5, min_sunshine=4.5,
+                                 terrain_type="leśny", center={"lat": 50.0, "lon": 19.9}))
+    assert query["weights"]
+
+
+def test_batch_reports_per_query_errors(make_recommender):
+    recommender = make_recommender(TRAILS, {("Kraków", "2030-06-01"): WEATHER})
+    errors = {}
+
+    results = recommender.recommend_batch([QUERY, dict(QUERY, weights={"pogoda": 2.0}),
+                                           {"city": "Kraków"}], errors)
+
+    assert len(results[0]) == 2
+    assert sorted(errors) == [1, 2]
+    assert "Suma wag" in errors[1]
+
+
+def test_batch_endpoint_rejects_only_invalid_queries(make_recommender):
+    recommender = make_recommender(TRAILS, {("Kraków", "2030-06-01"): WEATHER})
+    service = TrailService(recommender.data_handler, recommender, workers=1)
+
+    async def post(queries):
+        async with TestClient(TestServer(create_app(service))) as client:
+            response = await client.post("/recommend/batch", json={"queries": queries})
+            return response.status, await response.json()
+
+    status, body = asyncio.run(post([dict(QUERY, difficulty="x"), QUERY, {"city": "Kraków"}]))
+
+    assert status == 200
+    assert body["errors"] == 2
+    assert "difficulty" in body["results"][0]["error"]
+    assert len(body["results"][1]) == 2
+    assert "wymagane" in body["results"][2]["error"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.geo import haversine_km
+from utils.spatial_index import SpatialIndex
+
+rng = np.random.default_rng(7)
+# Punkty rozrzucone po całej kuli oraz skupione przy antypołudniku
+LAT = np.concatenate([rng.uniform(-90, 90, 400), rng.uniform(40, 60, 200), [np.nan]])
+LON = np.concatenate([rng.uniform(-180, 180, 400), rng.uniform(170, 190, 200) - 360 * (rng.random(200) < 0.5),
+                      [10.0]])
+LON = np.where(LON > 180, LON - 360, LON)
+INDEX = SpatialIndex(LAT, LON, cell_km=250)
+
+
+def test_antimeridian_box_in_one_column_returns_each_point_once():
+    index = SpatialIndex([50.0], [10.2], cell_km=25)
+
+    assert index.within_bbox(40, 10.1, 60, 10.05).tolist() == [0]
+
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (50, 179.5, 300), (50, -179.5, 800), (0, 0, 2000), (89, 30, 500), (-45, 100, 5000), (10, 10, 0),
+])
+def test_within_radius_matches_brute_force(lat, lon, radius_km):
+    distances = haversine_km(lat, lon, LAT, LON)
+    expected = np.flatnonzero(distances <= radius_km)
+
+    positions, found = INDEX.within_radius(lat, lon, radius_km)
+
+    assert positions.tolist() == expected.tolist()
+    assert np.allclose(found, distances[expected])
+
+
+@pytest.mark.parametrize("min_lat, min_lon, max_lat, max_lon", [
+    (40, 170, 60, -170), (40, 179.9, 60, 179.8), (-90, 10.1, 90, 10.05), (0, -20, 30, 40), (45, 0, 55, 0),
+])
+def test_within_bbox_matches_brute_force(min_lat, min_lon, max_lat, max_lon):
+    inside = (LAT >= min_lat) & (LAT <= max_lat)
+    if min_lon > max_lon:
+        inside &= (LON >= min_lon) | (LON <= max_lon)
+    else:
+        inside &= (LON >= min_lon) & (LON <= max_lon)
+
+    assert INDEX.within_bbox(min_lat, min_lon, max_lat, max_lon).tolist() == np.flatnonzero(inside).tolist()
+
+
+@pytest.mark.parametrize("lat, lon, k", [(50, 180, 5), (50, -179.9, 40), (-60, 20, 3), (0, 0, 700)])
+def test_nearest_matches_brute_force(lat, lon, k):
+    distances = haversine_km(lat, lon, LAT, LON)
+    valid = np.flatnonzero(~np.isnan(distances))
+    expected = valid[np.lexsort((valid, distances[valid]))][:k]
+
+    positions, found = INDEX.nearest(lat, lon, k)
+
+    assert positions.tolist() == expected.tolist()
+    assert np.allclose(found, distances[expected])
@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+from api.overpass_client import RegionResult
+from data_handlers.trail_data import TrailDataHandler
+from data_handlers.trail_store import TrailStore
+
+
+class FakeIngest:
+    """Wyniki odświeżenia podane z góry ({region: trasy albo komunikat błędu})."""
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+
+    def refresh(self, regions):
+        results = {}
+        for region in regions:
+            results[region] = result = RegionResult(region)
+            outcome = self.outcomes.get(region, [])
+            if isinstance(outcome, str):
+                result.error = outcome
+            else:
+                result.trails = outcome
+        return results
+
+
+def _trail(trail_id, region):
+    return {"id": trail_id, "name": f"Szlak {trail_id}", "region": region, "length_km": 5.0,
+            "difficulty": 1, "terrain_type": "leśny", "tags": []}
+
+
+def test_refresh_keeps_previous_trails_only_for_failed_regions(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler = TrailDataHandler(refresh_policy="never")
+        handler.store = TrailStore(str(tmp_path / "trails_data.json"))
+        handler.store.save([_trail("1", "Kraków"), _trail("2", "Gdańsk"), _trail("3", "Warszawa")])
+        # Kraków: pobrany poprawnie, ale bez tras; Gdańsk: błąd pobierania
+        handler.ingest = FakeIngest({"Kraków": [], "Gdańsk": "HTTP 504",
+                                     "Warszawa": [_trail("4", "Warszawa")]})
+        handler._update_trails_data()
+
+    ids = sorted(trail["id"] for trail in handler.store.trails)
+    assert ids == ["2", "4"]
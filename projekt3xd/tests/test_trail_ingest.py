@@ -0,0 +1,158 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+from aiohttp import web
+
+from api import stub_upstream
+from api.trail_ingest import TrailIngest
+from api.trails_api import TrailsAPI
+
+REGIONS = ["Kraków", "Gdańsk"]
+
+
+class OverpassStub:
+    """Atrapa Overpass (api/stub_upstream.py) w osobnym wątku, z zapisem rodzajów zapytań."""
+
+    def __init__(self):
+        self.queries = []
+        self.fail_tiles = 0
+        self.loop = asyncio.new_event_loop()
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        started = threading.Event()
+        threading.Thread(target=self._serve, args=(started,), daemon=True).start()
+        started.wait(10)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/interpreter"
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        query = (await request.post()).get("data", "")
+        kind = "ids" if "(id:" in query else "tile"
+        self.queries.append(kind)
+        if kind == "tile" and self.fail_tiles > 0:
+            self.fail_tiles -= 1
+            return web.Response(status=504)
+        return await stub_upstream.overpass(request)
+
+    def _serve(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_route("*", "/api/interpreter", self._handle)
+        runner = web.AppRunner(app)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", self.port).start())
+        started.set()
+        self.loop.run_forever()
+
+
+@pytest.fixture(scope="module")
+def stub():
+    stub = OverpassStub()
+    yield stub
+    stub.loop.call_soon_threadsafe(stub.loop.stop)
+
+
+@pytest.fixture
+def ingest(stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stub.queries.clear()
+    stub.fail_tiles = 0
+    api = TrailsAPI(stub.url)
+    api.fetcher.max_retries = 0
+    return TrailIngest(api, state_file=str(tmp_path / "trails_ingest_state.json"))
+
+
+def _ids(result):
+    return sorted(trail["id"] for trail in result.trails)
+
+
+def _changed_elements(monkeypatch):
+    """Kraków: dwie drogi w nowej wersji (jedna z nową nazwą), jedna usunięta."""
+    original = stub_upstream.city_elements
+
+    def changed(city):
+        ways, nodes = original(city)
+        if city == "Kraków":
+            ways[0] = dict(ways[0], version=2, tags=dict(ways[0]["tags"], name="Zmieniony szlak"))
+            ways[1] = dict(ways[1], version=3)
+            removed = ways.pop(2)
+            changed.ids = [str(ways[0]["id"]), str(ways[1]["id"])]
+            changed.removed = str(removed["id"])
+        return ways, nodes
+
+    monkeypatch.setattr(stub_upstream, "city_elements", changed)
+    return changed
+
+
+def test_first_run_downloads_every_region(ingest, stub, tmp_path):
+    results = ingest.refresh(REGIONS)
+
+    for region in REGIONS:
+        assert results[region].ok
+        assert len(results[region].trails) == stub_upstream.STUB_TRAILS_PER_CITY
+        assert {trail["region"] for trail in results[region].trails} == {region}
+    assert "ids" in stub.queries
+    assert (tmp_path / "trails_ingest_state.json").exists()
+
+
+def test_unchanged_rerun_only_checks_tiles(ingest, stub):
+    first = ingest.refresh(REGIONS)
+    stub.queries.clear()
+
+    second = ingest.refresh(REGIONS)
+
+    assert set(stub.queries) == {"tile"}
+    for region in REGIONS:
+        assert second[region].ok
+        assert _ids(second[region]) == _ids(first[region])
+
+
+def test_changed_and_removed_ways_are_applied(ingest, stub, monkeypatch):
+    first = ingest.refresh(REGIONS)
+    changed = _changed_elements(monkeypatch)
+    stub.queries.clear()
+
+    results = ingest.refresh(REGIONS)
+
+    assert stub.queries.count("ids") == 1
+    kraków = {trail["id"]: trail for trail in results["Kraków"].trails}
+    assert sorted(kraków) == sorted(set(_ids(first["Kraków"])) - {changed.removed})
+    assert kraków[changed.ids[0]]["name"] == "Zmieniony szlak"
+    assert _ids(results["Gdańsk"]) == _ids(first["Gdańsk"])
+
+
+def test_failing_tile_keeps_its_trails(ingest, stub, monkeypatch):
+    first = ingest.refresh(REGIONS)
+    changed = _changed_elements(monkeypatch)
+    # Kafelki są sprawdzane w kolejności regionów - pierwszy kafelek należy do Krakowa
+    ingest.api.fetcher.max_concurrency = 1
+    stub.fail_tiles = 1
+
+    results = ingest.refresh(REGIONS)
+
+    assert not results["Kraków"].ok
+    assert "kafelek" in results["Kraków"].error
+    assert results["Gdańsk"].ok
+    # Droga usunięta z odpowiedzi była w niesprawdzonym kafelku - zostaje do następnego odświeżenia
+    assert changed.removed in _ids(results["Kraków"])
+    assert len(results["Kraków"].trails) == len(first["Kraków"].trails)
+
+    results = ingest.refresh(REGIONS)
+    assert results["Kraków"].ok
+    assert changed.removed not in _ids(results["Kraków"])
+
+
+def test_failing_tile_on_first_run_removes_nothing(ingest, stub):
+    ingest.api.fetcher.max_concurrency = 1
+    stub.fail_tiles = 1
+
+    results = ingest.refresh(REGIONS)
+
+    assert not results["Kraków"].ok
+    assert len(results["Kraków"].trails) == stub_upstream.STUB_TRAILS_PER_CITY
+    assert ingest.refresh(REGIONS)["Kraków"].ok
@@ -0,0 +1,61 @@
+import json
+
+from conftest import WEATHER
+from data_handlers.trail_merge import merge_trails
+from data_handlers.trail_store import TrailStore
+from utils.filters import TrailCriteria
+
+# Ten sam element OSM zwrócony dla trzech miast oraz relacja i jej droga (ta sama nazwa i długość)
+TRAILS = [
+    {"id": "34392", "name": "Wisła", "region": "Gdańsk", "length_km": 20.0, "difficulty": 2,
+     "terrain_type": "riverside", "tags": []},
+    {"id": "100", "name": "Bulwary", "region": "Kraków", "length_km": 4.0, "difficulty": 1,
+     "terrain_type": "miejski", "tags": []},
+    {"id": "34392", "name": "Wisła", "region": "Warszawa", "length_km": 20.0, "difficulty": 2,
+     "terrain_type": "riverside", "tags": []},
+    {"id": "34392", "name": "Wisła", "region": "Kraków", "length_km": 20.0, "difficulty": 2,
+     "terrain_type": "riverside", "tags": []},
+    {"id": "200", "name": "Śluza", "region": "Kraków", "length_km": 85.0, "difficulty": 3,
+     "terrain_type": "riverside", "tags": []},
+    {"id": "201", "name": "Śluza", "region": "Kraków", "length_km": 85.0, "difficulty": 3,
+     "terrain_type": "riverside", "tags": []},
+]
+REGIONS = ["Gdańsk", "Warszawa", "Kraków"]
+
+
+def test_merge_keeps_every_region():
+    merged = merge_trails(TRAILS)
+
+    assert [trail["id"] for trail in merged] == ["34392", "100", "200"]
+    assert merged[0]["region"] == "Gdańsk"
+    assert merged[0]["regions"] == REGIONS
+    assert "regions" not in merged[1] and "regions" not in merged[2]
+
+
+def test_merge_is_idempotent():
+    merged = merge_trails(TRAILS)
+    assert merge_trails(json.loads(json.dumps(merged))) == merged
+
+
+def test_merged_trail_is_found_in_each_of_its_regions(tmp_path):
+    store = TrailStore(str(tmp_path / "trails_data.json"))
+    store.save(merge_trails(TRAILS))
+
+    for region in REGIONS:
+        assert "34392" in [trail["id"] for trail in store.get_by_region(region)]
+        assert "34392" in [trail["id"] for trail in store.get_table(region)]
+        assert "34392" in [trail["id"] for trail in TrailCriteria(region=region.lower()).apply(store.table)]
+        assert "34392" in [trail["id"] for trail in TrailCriteria(region=region).apply(store.trails)]
+    assert store.count_by_region("Kraków") == 3
+    assert store.length_sum_by_region("Warszawa") == 20.0
+    assert "34392" not in [trail["id"] for trail in store.get_table("Wrocław")]
+
+
+def test_merged_trail_is_recommended_in_each_of_its_regions(make_recommender):
+    recommender = make_recommender(merge_trails(TRAILS),
+                                   {(region, "2030-06-01"): WEATHER for region in REGIONS})
+
+    results = recommender.recommend_batch([{"city": region, "date": "2030-06-01"} for region in REGIONS])
+
+    for region, trails in zip(REGIONS, results):
+        assert "34392" in [trail["id"] for trail in trails], region
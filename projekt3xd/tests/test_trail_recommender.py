@@ -0,0 +1,46 @@
+from conftest import TRAILS, WEATHER
+from utils.weather_utils import WeatherUtils
+
+
+def test_batch_query_without_weights_uses_default_weights(make_recommender):
+    recommender = make_recommender(TRAILS, {("Kraków", "2030-06-01"): WEATHER})
+
+    without_weights, equal_weights = recommender.recommend_batch([
+        {"city": "Kraków", "date": "2030-06-01"},
+        {"city": "Kraków", "date": "2030-06-01",
+         "weights": {"trudność": 0.25, "długość": 0.25, "pogoda": 0.25, "teren": 0.25}},
+    ])
+
+    assert [trail["id"] for trail in without_weights] == ["1", "2"]
+    assert [trail["weighted_score"] for trail in without_weights] == \
+        [trail["weighted_score"] for trail in equal_weights]
+
+
+def test_weather_criteria_reject_the_day(make_recommender):
+    recommender = make_recommender(TRAILS, {("Kraków", "2030-06-01"): WEATHER})
+    query = {"city": "Kraków", "date": "2030-06-01"}
+
+    results = recommender.recommend_batch([
+        dict(query, min_sunshine=6), dict(query, min_sunshine=10),
+        dict(query, max_precipitation=0), dict(query, min_temperature=18),
+        dict(query, max_temperature=10),
+    ])
+
+    assert [len(trails) for trails in results] == [2, 0, 2, 0, 0]
+    assert recommender.recommend_trails("Kraków", "2030-06-01", min_sunshine=10,
+                                        weights={"pogoda": 1.0}, export=False) == []
+    assert len(recommender.recommend_trails("Kraków", "2030-06-01", min_sunshine=6,
+                                            weights={"pogoda": 1.0}, export=False)) == 2
+
+
+def test_mountain_comfort_is_adjusted_for_elevation(make_recommender):
+    recommender = make_recommender(TRAILS, {("Kraków", "2030-06-01"): WEATHER})
+
+    trails = recommender.recommend_batch([{"city": "Kraków", "date": "2030-06-01"}])[0]
+
+    # Trasa górska na 900 m: 16°C - 5.4°C i opady x1.2 (tu 0 mm); pozostałe bez zmian
+    assert {trail["id"]: trail["comfort_index"] for trail in trails} == {
+        "1": WeatherUtils.calculate_hiking_comfort(WEATHER),
+        "2": WeatherUtils.calculate_hiking_comfort(dict(WEATHER, temperature_min=6.6, temperature_max=14.6)),
+    }
+    assert [trail["comfort_index"] for trail in trails] == [100.0, 73.6]
@@ -0,0 +1,54 @@
+import json
+
+from data_handlers.trail_store import TrailStore
+
+
+def _store(tmp_path, trails):
+    path = tmp_path / "trails_data.json"
+    path.write_text(json.dumps(trails, ensure_ascii=False), encoding="utf-8")
+    return TrailStore(str(path))
+
+
+def test_non_numeric_length_does_not_break_lookups(tmp_path):
+    store = _store(tmp_path, [
+        {"id": 1, "name": "A", "region": "Kraków", "length_km": "5 km", "difficulty": 1},
+        {"id": 2, "name": "B", "region": "Kraków", "length_km": "7.5", "difficulty": 2},
+    ])
+
+    assert [trail["id"] for trail in store.get_by_region("kraków")] == [1, 2]
+    assert store.get_by_id(1)["length_km"] == 0.0
+    assert store.length_sum_by_region("Kraków") == 7.5
+    assert [trail["id"] for trail in store.get_by_length(5, 10)] == [2]
+    assert store.table.length_km.tolist() == [0.0, 7.5]
+
+
+def test_loading_outdated_records_does_not_rewrite_the_file(tmp_path):
+    trails = [{"id": 1, "name": "A", "region": "Kraków", "length_km": 3.0, "difficulty": 1,
+               "category": "stara", "rules_version": "0.0"}]
+    store = _store(tmp_path, trails)
+    path = tmp_path / "trails_data.json"
+    raw = path.read_bytes()
+    mtime = path.stat().st_mtime_ns
+
+    assert store.get_by_id(1)["rules_version"] != "0.0"
+    assert store.table.category[0] != "stara"
+    assert path.read_bytes() == raw
+    assert path.stat().st_mtime_ns == mtime
+
+    store.save(store.trails)
+    assert json.loads(path.read_text(encoding="utf-8"))[0]["rules_version"] == store.get_by_id(1)["rules_version"]
+
+
+def test_truncated_snapshot_is_rebuilt_from_json(tmp_path):
+    trails = [{"id": i, "name": f"Trasa {i}", "region": "Kraków", "length_km": float(i), "difficulty": 1}
+              for i in range(1, 4)]
+    path = tmp_path / "trails_data.json"
+    path.write_text(json.dumps(trails, ensure_ascii=False), encoding="utf-8")
+    snapshot = tmp_path / "trails_data.bin"
+    assert len(TrailStore(str(path), str(snapshot)).table) == 3
+    snapshot.write_bytes(snapshot.read_bytes()[:-40])
+
+    store = TrailStore(str(path), str(snapshot))
+
+    assert store.table.length_km.tolist() == [1.0, 2.0, 3.0]
+    assert store.get_by_id(2)["name"] == "Trasa 2"
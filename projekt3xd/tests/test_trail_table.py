@@ -0,0 +1,39 @@
+import numpy as np
+
+from data_handlers.trail_table import TrailTable
+
+RECORDS = [
+    {"id": "1", "name": "Dolina", "region": "Kraków", "length_km": 5.0, "difficulty": 1,
+     "tags": ["las", "rzeka"]},
+    {"id": "2", "name": "Grań Żółta", "region": "Kraków", "length_km": 12.0, "difficulty": 3, "tags": []},
+    {"id": "30", "name": "", "region": "Gdańsk", "length_km": 3.5, "difficulty": 2, "tags": ["morze"]},
+]
+
+
+def test_take_copies_strings_and_tags_of_selected_rows():
+    table = TrailTable.from_records(RECORDS)
+
+    for positions in ([2, 0], [1], np.array([], dtype=np.int64), [True, False, True]):
+        taken = table.take(positions)
+        expected = np.flatnonzero(positions) if len(positions) == 3 else positions
+        assert [taken.ids[i] for i in range(len(taken))] == [RECORDS[p]["id"] for p in expected]
+        assert [taken.names[i] for i in range(len(taken))] == [RECORDS[p]["name"] for p in expected]
+        assert [taken.tags[i] for i in range(len(taken))] == [RECORDS[p]["tags"] for p in expected]
+
+
+def test_sparse_records_round_trip_without_defaults():
+    records = [
+        {"id": "1", "name": "Bez danych", "region": "Kraków", "terrain_type": None, "tags": []},
+        {"id": "2", "name": "Nulle", "region": "Kraków", "terrain_type": "leśny", "tags": [],
+         "coordinates": None, "length_km": None, "elevation_m": None, "difficulty": None},
+        {"id": "3", "name": "Pełna", "region": "Kraków", "terrain_type": "górski", "tags": ["szczyt"],
+         "coordinates": {"lat": 49.2, "lon": 19.9}, "length_km": 0.0, "elevation_m": 0.0, "difficulty": 2,
+         "category": "krótka", "estimated_time": 1.5, "rules_version": "1", "source": "osm"},
+    ]
+    table = TrailTable.from_records(records)
+
+    assert table.to_records() == records
+    assert "elevation_m" not in table.row(0) and "coordinates" not in table.row(0)
+    assert table.row(0).get("difficulty", "brak") == "brak"
+    assert table.row(1)["coordinates"] is None and table.row(1)["length_km"] is None
+    assert TrailTable.from_records(records).take([2, 0]).to_records() == [records[2], records[0]]
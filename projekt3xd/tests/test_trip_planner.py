@@ -0,0 +1,31 @@
+from conftest import TRAILS, WEATHER
+from recommendation.trip_planner import TripPlanner
+
+DATES = ("2030-06-01", "2030-06-02", "2030-06-03")
+
+
+def _planner(make_recommender):
+    weather = {date: dict(WEATHER, precipitation=float(day)) for day, date in enumerate(DATES)}
+    return TripPlanner(make_recommender(TRAILS)), weather
+
+
+def test_plan_with_zero_weather_weight(make_recommender):
+    planner, weather = _planner(make_recommender)
+
+    plan = planner.plan_trips("Kraków", DATES[0], DATES[-1], weather=weather,
+                              weights={"trudność": 0.5, "długość": 0.5, "pogoda": 0, "teren": 0})
+
+    assert plan["dates"] == list(DATES)
+    # Wynik nie zależy od dnia - przy remisie wygrywa najwcześniejszy dzień
+    assert [(trail["id"], trail["date"]) for trail in plan["best_days"]] == \
+        [("1", DATES[0]), ("2", DATES[0])]
+    assert len(plan["best"]) == len(DATES) * len(TRAILS)
+
+
+def test_plan_without_weights_uses_default_weights(make_recommender):
+    planner, weather = _planner(make_recommender)
+
+    plan = planner.plan_trips("Kraków", DATES[0], DATES[-1], weather=weather)
+
+    assert plan["best"][0]["date"] == DATES[0]
+    assert len(plan["best_days"]) == len(TRAILS)
@@ -0,0 +1,34 @@
+from api.weather_cache import WeatherCache
+from utils.data_storage import DataStorage
+
+
+def _storage(tmp_path):
+    return DataStorage(str(tmp_path), compaction_min_bytes=0, max_bytes=None, max_age_hours=None)
+
+
+def test_reload_keeps_at_most_max_entries_and_drops_expired(tmp_path):
+    writer = WeatherCache(_storage(tmp_path), max_entries=100)
+    for number in range(5):
+        writer.put(f"stary-{number}", {"day": number}, ttl_seconds=-1)
+    for number in range(5):
+        writer.put(f"nowy-{number}", {"day": number}, ttl_seconds=60 + number)
+
+    # Kompaktowanie przy dopisywaniu nie zostawia w pliku wygasłych wpisów
+    assert sorted(_storage(tmp_path).load_data("weather_cache.json")) == [f"nowy-{n}" for n in range(5)]
+
+    reader = WeatherCache(_storage(tmp_path), max_entries=2)
+    assert reader.get("nowy-4") == {"day": 4}
+    assert reader.get("stary-0") is None
+    assert reader.stats() == {"hits": 1, "misses": 1, "disk_hits": 1, "memory_entries": 2}
+
+
+def test_expired_entries_are_removed_from_the_file_on_load(tmp_path):
+    _storage(tmp_path).save_data("weather_cache.json", {
+        "stary": {"expires_at": 1.0, "data": {"day": 0}},
+        "nowy": {"expires_at": 2 ** 40, "data": {"day": 1}},
+    })
+
+    cache = WeatherCache(_storage(tmp_path))
+
+    assert cache.get("nowy") == {"day": 1}
+    assert list(_storage(tmp_path).load_data("weather_cache.json")) == ["nowy"]
@@ -0,0 +1,22 @@
+import pytest
+
+from utils.weight_calculator import DEFAULT_WEIGHTS, WeightCalculator
+
+
+@pytest.mark.parametrize("weights", [
+    {"trudność": float("nan"), "długość": 0.5, "pogoda": 0.5},
+    {"trudność": float("inf"), "długość": 0.5},
+    {"trudność": -0.5, "długość": 1.5},
+    {"trudność": 0.5},
+    {"widoki": 1.0},
+])
+def test_invalid_weights_are_rejected(weights):
+    calculator = WeightCalculator()
+    with pytest.raises(ValueError):
+        calculator.set_weights(weights)
+    assert calculator.weights == DEFAULT_WEIGHTS
+
+
+def test_missing_criteria_get_zero_weight():
+    assert WeightCalculator().set_weights({"pogoda": 1.0}) == \
+        {"trudność": 0.0, "długość": 0.0, "pogoda": 1.0, "teren": 0.0}
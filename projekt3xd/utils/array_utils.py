@@ -0,0 +1,38 @@
+import numpy as np
+
+# 2**27 + 1 - stała podziału Veltkampa dla liczb float64
+_SPLITTER = 134217729.0
+
+
+def _product_error(a: np.ndarray, b: float, product: np.ndarray) -> np.ndarray:
+    """Błąd zaokrąglenia iloczynu a * b (algorytm TwoProduct Dekkera), tak że a * b == product + błąd."""
+    t = _SPLITTER * a
+    a_high = t - (t - a)
+    a_low = a - a_high
+    t = _SPLITTER * b
+    b_high = t - (t - b)
+    b_low = b - b_high
+    return ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+
+
+def round_like_builtin(values, ndigits: int = 0) -> np.ndarray:
+    """
+    Zaokrągla tablicę dokładnie tak, jak wbudowane round(x, ndigits) dla float.
+
+    np.round mnoży przez 10**ndigits, więc przy wartościach bliskich połowie
+    (np. 2.675) może wybrać inną cyfrę niż round(), który zaokrągla dokładną
+    wartość dziesiętną. Tutaj kierunek zaokrąglenia wyznaczany jest z
+    dokładnego iloczynu (iloczyn + jego błąd), a remisy idą do parzystej cyfry.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = values * scale
+        error = _product_error(values, scale, scaled)
+        floor = np.floor(scaled)
+        fraction = scaled - floor
+        half = fraction == 0.5
+        round_up = (fraction > 0.5) | (half & (error > 0)) | (half & (error == 0) & (np.fmod(floor, 2) != 0))
+        # Zaokrąglenie nie zmienia znaku (round(-0.3) == -0.0)
+        rounded = np.copysign((floor + round_up) / scale, values)
+    return np.where(np.isfinite(values), rounded, values)
@@ -1,16 +1,71 @@
+import atexit
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Callable, Optional, List
+
+from config import (STORAGE_COMPACTION_MIN_BYTES, CACHE_MAX_BYTES, CACHE_MAX_AGE_HOURS,
+                    CACHE_MAINTENANCE_INTERVAL_SECONDS)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Rozszerzenie dziennika dopisywanych zmian pliku
+LOG_SUFFIX = ".log"
+# Plik blokady - jeden na katalog, a nie na plik cache, więc odczyty i usuwanie
+# plików nie zostawiają osieroconych blokad
+LOCK_FILE = ".lock"
+# Rozszerzenie blokad pojedynczych plików z wcześniejszych wersji (usuwane przez clear_cache)
+LEGACY_LOCK_SUFFIX = ".lock"
+# Plik ze statystykami cache (liczniki i czasy ostatniego dostępu do plików)
+STATS_FILE = ".cache_stats"
+COUNTERS = ("hits", "misses", "bytes_read", "bytes_written", "evictions", "evicted_bytes")
+
 
 class DataStorage:
-    """Klasa do zarządzania przechowywaniem danych w plikach cache."""
+    """
+    Klasa do zarządzania przechowywaniem danych w plikach cache.
 
-    def __init__(self, data_dir: str = "data"):
+    Każdy plik to bazowy dokument JSON oraz dziennik JSONL (`<plik>.log`),
+    w którym append_data dopisuje tylko nowe klucze - bez wczytywania
+    i przepisywania całego pliku. Odczyt składa dokument z bazy i dziennika;
+    gdy dziennik urośnie ponad rozmiar bazy (co najmniej
+    STORAGE_COMPACTION_MIN_BYTES), jest scalany z bazą (kompaktowanie).
+    Pliki bazowe są zapisywane atomowo (plik tymczasowy + rename), a dostęp
+    jest chroniony doradczą blokadą katalogu (plik LOCK_FILE), więc równoległe
+    procesy (np. update_data.py i main.py) nie nadpisują sobie zmian.
+
+    Katalog ma ograniczony rozmiar: pliki niezapisywane dłużej niż
+    max_age_hours są usuwane, a potem najdawniej używane, dopóki całość nie
+    zmieści się w max_bytes. Liczniki trafień, chybień i bajtów oraz czasy
+    ostatniego dostępu są zbierane w pamięci i zapisywane w pliku
+    STATS_FILE; polityka jest egzekwowana co maintenance_interval sekund.
+    """
+
+    def __init__(self, data_dir: str = "data",
+                 compaction_min_bytes: int = STORAGE_COMPACTION_MIN_BYTES,
+                 max_bytes: Optional[int] = CACHE_MAX_BYTES,
+                 max_age_hours: Optional[float] = CACHE_MAX_AGE_HOURS,
+                 maintenance_interval: float = CACHE_MAINTENANCE_INTERVAL_SECONDS):
         """Inicjalizuje obiekt DataStorage z określonym katalogiem danych."""
         self._data_dir = data_dir
+        self.compaction_min_bytes = compaction_min_bytes
+        self.max_bytes = max_bytes
+        self.max_age_hours = max_age_hours
+        self.maintenance_interval = maintenance_interval
+        self._stats_lock = threading.Lock()
+        self._pending_counters = dict.fromkeys(COUNTERS, 0)
+        self._pending_access: Dict[str, float] = {}
+        self._last_maintenance: Optional[float] = None
         if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
+            os.makedirs(data_dir, exist_ok=True)
+        atexit.register(self.flush_stats)
 
     @property
     def data_dir(self) -> str:
@@ -21,25 +76,170 @@ class DataStorage:
         """Pobiera pełną ścieżkę do pliku cache."""
         return os.path.join(self._data_dir, filename)
 
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """
+        Doradcza blokada katalogu danych (wspólna dla odczytu, wyłączna dla zapisu).
+
+        Blokady nie są zagnieżdżane - flock na osobno otwartym pliku
+        zablokowałby ten sam proces.
+        """
+        with open(self._get_cache_path(LOCK_FILE), 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                # msvcrt obsługuje tylko blokady wyłączne
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _write_atomic(self, filepath: str, data: Any, indent: int) -> None:
+        """Zapisuje JSON przez plik tymczasowy i rename - plik nigdy nie jest obcięty."""
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _size(self, filename: str) -> int:
+        """Łączny rozmiar pliku bazowego i dziennika w bajtach."""
+        size = 0
+        for path in (self._get_cache_path(filename), self._get_cache_path(filename) + LOG_SUFFIX):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def _record(self, filename: str, **counters: int) -> None:
+        """Zlicza operację na pliku i zapamiętuje czas dostępu (bez zapisu na dysk)."""
+        with self._stats_lock:
+            for name, value in counters.items():
+                self._pending_counters[name] += value
+            self._pending_access[filename] = time.time()
+
+    def _maintain(self) -> None:
+        """Co maintenance_interval sekund zapisuje statystyki i usuwa nadmiarowe pliki."""
+        now = time.monotonic()
+        with self._stats_lock:
+            if self._last_maintenance is not None and now - self._last_maintenance < self.maintenance_interval:
+                return
+            self._last_maintenance = now
+        if self.max_bytes is not None or self.max_age_hours is not None:
+            self.evict()
+        else:
+            self.flush_stats()
+
+    def _read(self, filename: str) -> Any:
+        """Dokument złożony z pliku bazowego i dziennika (bez blokady)."""
+        filepath = self._get_cache_path(filename)
+        data: Any = {}
+        if os.path.exists(filepath):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        log_path = filepath + LOG_SUFFIX
+        if os.path.exists(log_path) and isinstance(data, dict):
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        update = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Niedokończony wpis po przerwanym zapisie - pomijamy go
+                        continue
+                    if isinstance(update, dict):
+                        data.update(update)
+        return data
+
+    def _replace(self, filename: str, data: Any, indent: int = 4) -> None:
+        """Zastępuje cały dokument (bez blokady): nowa baza, pusty dziennik."""
+        filepath = self._get_cache_path(filename)
+        self._write_atomic(filepath, data, indent)
+        if os.path.exists(filepath + LOG_SUFFIX):
+            os.remove(filepath + LOG_SUFFIX)
+        self._record(filename, bytes_written=os.path.getsize(filepath))
+
+    def _remove(self, filename: str) -> int:
+        """Usuwa plik bazowy i dziennik (pod blokadą katalogu), zwraca liczbę zwolnionych bajtów."""
+        removed = 0
+        with self._locked():
+            for path in (self._get_cache_path(filename), self._get_cache_path(filename) + LOG_SUFFIX):
+                if os.path.exists(path):
+                    removed += os.path.getsize(path)
+                    os.remove(path)
+        return removed
+
     def save_data(self, filename: str, data: Dict[str, Any]) -> None:
         """Zapisuje dane do pliku JSON w określonym katalogu."""
-        filepath = self._get_cache_path(filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        self._maintain()
+        with self._locked():
+            self._replace(filename, data)
 
     def load_data(self, filename: str) -> Dict[str, Any]:
         """Wczytuje dane z pliku JSON z określonego katalogu."""
-        filepath = self._get_cache_path(filename)
-        if not os.path.exists(filepath):
+        self._maintain()
+        if not os.path.exists(self._get_cache_path(filename)) and \
+                not os.path.exists(self._get_cache_path(filename) + LOG_SUFFIX):
+            self._record(filename, misses=1)
             return {}
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with self._locked(exclusive=False):
+            data = self._read(filename)
+            self._record(filename, hits=1, bytes_read=self._size(filename))
+        return data
+
+    def append_data(self, filename: str, new_data: Dict[str, Any],
+                    keep: Optional[Callable[[str, Any], bool]] = None) -> None:
+        """
+        Dodaje nowe dane do istniejącego pliku JSON (jedna linia w dzienniku).
+
+        Przy kompaktowaniu zostają tylko wpisy, dla których keep(klucz, wartość)
+        jest prawdziwe (domyślnie wszystkie).
+        """
+        self._maintain()
+        filepath = self._get_cache_path(filename)
+        line = (json.dumps(new_data, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._locked():
+            with open(filepath + LOG_SUFFIX, 'a+b') as f:
+                # Wpis urwany przez przerwany zapis nie może skleić się z nowym
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+                f.flush()
+                log_size = os.fstat(f.fileno()).st_size
+            self._record(filename, bytes_written=len(line))
+            base_size = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+            if log_size > max(self.compaction_min_bytes, base_size):
+                self._compact(filename, keep)
+
+    def _compact(self, filename: str, keep: Optional[Callable[[str, Any], bool]] = None) -> None:
+        data = self._read(filename)
+        if keep is not None and isinstance(data, dict):
+            data = {key: value for key, value in data.items() if keep(key, value)}
+        self._replace(filename, data)
 
-    def append_data(self, filename: str, new_data: Dict[str, Any]) -> None:
-        """Dodaje nowe dane do istniejącego pliku JSON."""
-        existing_data = self.load_data(filename)
-        existing_data.update(new_data)
-        self.save_data(filename, existing_data)
+    def compact(self, filename: str, keep: Optional[Callable[[str, Any], bool]] = None) -> None:
+        """
+        Scala dziennik zmian z plikiem bazowym.
+
+        Z `keep` plik jest przepisywany także bez dziennika i zostają w nim tylko
+        wpisy, dla których keep(klucz, wartość) jest prawdziwe.
+        """
+        filepath = self._get_cache_path(filename)
+        with self._locked():
+            if os.path.exists(filepath + LOG_SUFFIX) or (keep is not None and os.path.exists(filepath)):
+                self._compact(filename, keep)
 
     def clear_data(self, filename: str) -> None:
         """Czyści dane w pliku JSON."""
@@ -47,84 +247,97 @@ class DataStorage:
 
     def get_all_files(self) -> List[str]:
         """Zwraca listę wszystkich plików w katalogu danych."""
-        return [f for f in os.listdir(self._data_dir) if f.endswith('.json')]
+        return sorted(self._cache_files())
 
     def save_data_to_cache(self, data: Any, filename: str) -> None:
         """Zapisuje dane do pliku JSON, łącząc z istniejącymi danymi jeśli są obecne."""
-        filepath = self._get_cache_path(filename)
-        
-        # Próba wczytania istniejących danych
-        existing_data = {}
-        if os.path.exists(filepath):
+        self._maintain()
+        with self._locked():
+            # Próba wczytania istniejących danych
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except json.JSONDecodeError:
-                pass
+                existing_data = self._read(filename)
+            except (OSError, json.JSONDecodeError):
+                existing_data = {}
 
-        # Przygotowanie nowego wpisu danych
-        new_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'data': data
-        }
+            # Przygotowanie nowego wpisu danych
+            new_entry = {
+                'timestamp': datetime.now().isoformat(),
+                'data': data
+            }
 
-        # Jeśli plik istnieje i zawiera listę, dodaj nowe dane
-        if isinstance(existing_data.get('data'), list):
-            existing_data['data'] = data  # Nadpisz stare dane nowymi
-        else:
-            existing_data = new_entry
+            # Jeśli plik istnieje i zawiera listę, dodaj nowe dane
+            if isinstance(existing_data, dict) and isinstance(existing_data.get('data'), list):
+                existing_data['data'] = data  # Nadpisz stare dane nowymi
+            else:
+                existing_data = new_entry
 
-        # Zapisz zaktualizowane dane
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
+            # Zapisz zaktualizowane dane (atomowo)
+            self._replace(filename, existing_data, indent=2)
 
     def load_data_from_cache(self, filename: str, max_age_hours: Optional[int] = None) -> Optional[Any]:
         """Wczytuje dane z pliku JSON jeśli istnieje i nie jest zbyt stary."""
+        self._maintain()
         filepath = self._get_cache_path(filename)
-        
+
         if not os.path.exists(filepath):
+            self._record(filename, misses=1)
             return None
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                cached = json.load(f)
+            with self._locked(exclusive=False):
+                cached = self._read(filename)
+                size = self._size(filename)
 
             if max_age_hours is not None:
                 cache_time = datetime.fromisoformat(cached['timestamp'])
                 if datetime.now() - cache_time > timedelta(hours=max_age_hours):
+                    self._record(filename, misses=1, bytes_read=size)
                     return None
 
-            return cached['data']
-        except (json.JSONDecodeError, KeyError, ValueError):
+            data = cached['data']
+        except (json.JSONDecodeError, KeyError, ValueError, TypeError):
+            self._record(filename, misses=1)
             return None
+        self._record(filename, hits=1, bytes_read=size)
+        return data
 
     def clear_cache(self, filename: str = None) -> None:
         """Czyści pliki cache. Jeśli filename jest None, czyści wszystkie pliki cache."""
         if filename:
-            filepath = self._get_cache_path(filename)
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            self._remove(filename)
         else:
             for file in os.listdir(self._data_dir):
                 if file.endswith('.json'):
-                    os.remove(os.path.join(self._data_dir, file))
+                    self.clear_cache(file)
+                elif file.endswith('.json' + LOG_SUFFIX):
+                    self.clear_cache(file[:-len(LOG_SUFFIX)])
+                elif file.endswith('.json' + LEGACY_LOCK_SUFFIX):
+                    # Blokady pojedynczych plików z wcześniejszych wersji
+                    try:
+                        os.remove(self._get_cache_path(file))
+                    except FileNotFoundError:
+                        pass
 
     def merge_json_files(self, output_file: str = "all_data.json") -> None:
-        """Łączy wszystkie pliki JSON w katalogu cache w jeden plik."""
+        """Łączy pliki cache tras i pogody (trails_*, weather_*) w jeden plik."""
         all_data = {
             'timestamp': datetime.now().isoformat(),
             'trails': [],
             'weather': {}
         }
 
-        for filename in os.listdir(self._data_dir):
-            if not filename.endswith('.json'):
+        for filename in sorted(os.listdir(self._data_dir)):
+            # Wczytujemy tylko pliki, które trafiają do wyniku
+            if not filename.endswith('.json') or filename == output_file:
+                continue
+            if not (filename.startswith('trails_') or filename.startswith('weather_')):
                 continue
 
-            filepath = self._get_cache_path(filename)
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    file_data = json.load(f)
+                with self._locked(exclusive=False):
+                    file_data = self._read(filename)
+                if not isinstance(file_data, dict):
+                    continue
 
                 if filename.startswith('trails_'):
                     # Dodaj dane o szlakach
@@ -136,10 +349,137 @@ class DataStorage:
                     if file_data.get('data'):
                         all_data['weather'][city] = file_data['data']
 
-            except (json.JSONDecodeError, KeyError):
+            except (json.JSONDecodeError, KeyError, OSError):
                 continue
 
         # Zapisz połączone dane
-        output_path = self._get_cache_path(output_file)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        with self._locked():
+            self._replace(output_file, all_data, indent=2)
+
+    def _read_stats(self) -> Dict[str, Any]:
+        """Zapisane statystyki (bez blokady); pusty zestaw, gdy pliku brak lub jest uszkodzony."""
+        stats: Dict[str, Any] = {}
+        try:
+            with open(self._get_cache_path(STATS_FILE), 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+        if not isinstance(stats, dict):
+            stats = {}
+        stats.setdefault('counters', {})
+        stats.setdefault('accessed', {})
+        return stats
+
+    def _update_stats(self, counters: Dict[str, int], accessed: Dict[str, float],
+                      forget: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Dopisuje liczniki i czasy dostępu do pliku statystyk, zwraca stan po zmianie."""
+        with self._locked():
+            stats = self._read_stats()
+            for name, value in counters.items():
+                stats['counters'][name] = stats['counters'].get(name, 0) + value
+            for filename, accessed_at in accessed.items():
+                stats['accessed'][filename] = max(accessed_at, stats['accessed'].get(filename, 0))
+            for filename in forget or ():
+                stats['accessed'].pop(filename, None)
+            if any(counters.values()) or accessed or forget:
+                self._write_atomic(self._get_cache_path(STATS_FILE), stats, indent=2)
+        return stats
+
+    def flush_stats(self) -> None:
+        """Zapisuje zebrane w pamięci liczniki i czasy dostępu do pliku statystyk."""
+        with self._stats_lock:
+            counters, self._pending_counters = self._pending_counters, dict.fromkeys(COUNTERS, 0)
+            accessed, self._pending_access = self._pending_access, {}
+        if not any(counters.values()) and not accessed:
+            return
+        if not os.path.isdir(self._data_dir):
+            return
+        try:
+            self._update_stats(counters, accessed)
+        except OSError as e:
+            print(f"Błąd podczas zapisu statystyk cache: {e}")
+
+    def _cache_files(self) -> Dict[str, Dict[str, float]]:
+        """Pliki cache (baza + dziennik) z łącznym rozmiarem i czasem ostatniego zapisu."""
+        files: Dict[str, Dict[str, float]] = {}
+        for entry in os.scandir(self._data_dir):
+            if entry.name.endswith('.json'):
+                filename = entry.name
+            elif entry.name.endswith('.json' + LOG_SUFFIX):
+                filename = entry.name[:-len(LOG_SUFFIX)]
+            else:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            info = files.setdefault(filename, {'bytes': 0, 'modified': 0.0})
+            info['bytes'] += stat.st_size
+            info['modified'] = max(info['modified'], stat.st_mtime)
+        return files
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statystyki cache: liczniki (trafienia, chybienia, bajty odczytane,
+        zapisane i usunięte), łączny rozmiar oraz lista plików z rozmiarem,
+        czasem ostatniego zapisu i dostępu (od najświeższego dostępu).
+        """
+        self.flush_stats()
+        with self._locked(exclusive=False):
+            stored = self._read_stats()
+        files = []
+        for filename, info in self._cache_files().items():
+            files.append({
+                'name': filename,
+                'bytes': int(info['bytes']),
+                'modified': info['modified'],
+                'accessed': max(stored['accessed'].get(filename, 0), info['modified'])
+            })
+        files.sort(key=lambda file: file['accessed'], reverse=True)
+
+        counters = {name: stored['counters'].get(name, 0) for name in COUNTERS}
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'counters': counters,
+            'hit_ratio': counters['hits'] / lookups if lookups else None,
+            'total_bytes': sum(file['bytes'] for file in files),
+            'max_bytes': self.max_bytes,
+            'max_age_hours': self.max_age_hours,
+            'files': files
+        }
+
+    def evict(self) -> List[str]:
+        """
+        Egzekwuje politykę cache: usuwa pliki niezapisywane dłużej niż
+        max_age_hours, a następnie najdawniej używane (LRU), dopóki łączny
+        rozmiar przekracza max_bytes. Zwraca nazwy usuniętych plików.
+        """
+        self.flush_stats()
+        with self._locked(exclusive=False):
+            accessed = self._read_stats()['accessed']
+        files = self._cache_files()
+
+        victims = []
+        if self.max_age_hours is not None:
+            cutoff = time.time() - self.max_age_hours * 3600
+            victims = [filename for filename, info in files.items() if info['modified'] < cutoff]
+        if self.max_bytes is not None:
+            remaining = [filename for filename in files if filename not in victims]
+            total = sum(files[filename]['bytes'] for filename in remaining)
+            remaining.sort(key=lambda filename: max(accessed.get(filename, 0), files[filename]['modified']))
+            for filename in remaining:
+                if total <= self.max_bytes:
+                    break
+                victims.append(filename)
+                total -= files[filename]['bytes']
+
+        evicted_bytes = 0
+        for filename in victims:
+            evicted_bytes += self._remove(filename)
+        # Czasy dostępu usuniętych (lub skasowanych poza DataStorage) plików nie są już potrzebne
+        forget = [filename for filename in accessed if filename in victims or filename not in files]
+        try:
+            self._update_stats({'evictions': len(victims), 'evicted_bytes': evicted_bytes}, {}, forget)
+        except OSError as e:
+            print(f"Błąd podczas zapisu statystyk cache: {e}")
+        return victims
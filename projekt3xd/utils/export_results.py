@@ -1,27 +1,71 @@
 import json
 import csv
-from typing import List, Dict, Any, Optional
+import atexit
+import itertools
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime
 
+from config import EXPORT_FORMATS, EXPORT_QUEUE_SIZE
+from data_handlers.trail_table import TrailRow
+from utils.profiling import timed
+
+# Obsługiwane formaty eksportu
+SUPPORTED_FORMATS = ("txt", "json", "csv")
+
+# Jedna sekcja wyników: (miasto, data, trasy, pogoda)
+Section = Tuple[str, str, List[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def _validate_formats(formats: Sequence[str]) -> Tuple[str, ...]:
+    formats = tuple(fmt.lower() for fmt in formats)
+    unknown = [fmt for fmt in formats if fmt not in SUPPORTED_FORMATS]
+    if unknown:
+        raise ValueError(f"Nieznane formaty eksportu: {', '.join(unknown)}")
+    return formats
+
+
 class ResultExporter:
+    _sequence = itertools.count(1)
+
     @staticmethod
     def export_results(city: str, date: str, trails: List[Dict[str, Any]], 
-                      weather: Optional[Dict[str, Any]] = None):
+                      weather: Optional[Dict[str, Any]] = None,
+                      formats: Optional[Sequence[str]] = None):
         """
-        Eksportuje wyniki rekomendacji do różnych formatów plików.
+        Eksportuje wyniki rekomendacji do różnych formatów plików (synchronicznie).
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ResultExporter.write_file_set([(city, date, trails, weather)], formats)
+
+    @staticmethod
+    @timed("export.write")
+    def write_file_set(sections: List[Section], formats: Optional[Sequence[str]] = None):
+        """
+        Zapisuje jeden zestaw plików (TXT, JSON, CSV) dla wszystkich sekcji.
+
+        Nazwy plików zawierają znacznik czasu z mikrosekundami i numer
+        kolejny, więc dwa eksporty w tej samej sekundzie nie nadpisują się.
+        """
+        formats = _validate_formats(EXPORT_FORMATS if formats is None else formats)
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(ResultExporter._sequence)}"
         
         # Zapisz do TXT
-        ResultExporter._save_to_txt(city, date, trails, weather, timestamp)
+        if "txt" in formats:
+            for city, date, trails, weather in sections:
+                ResultExporter._save_to_txt(city, date, trails, weather, timestamp)
         
         # Zapisz do JSON
-        ResultExporter._save_to_json(city, date, trails, weather, timestamp)
+        if "json" in formats:
+            ResultExporter._save_to_json(sections, timestamp)
         
         # Zapisz do CSV
-        ResultExporter._save_to_csv(city, date, trails, weather, timestamp)
+        if "csv" in formats:
+            ResultExporter._save_to_csv(sections, timestamp)
         
     @staticmethod
+    @timed("export.txt")
     def _save_to_txt(city: str, date: str, trails: List[Dict[str, Any]], 
                      weather: Dict[str, Any], timestamp: str):
         """Zapisuje rekomendacje do pliku result.txt."""
@@ -70,22 +114,32 @@ class ResultExporter:
             print(f"Błąd podczas zapisywania do pliku TXT: {e}")
             
     @staticmethod
-    def _save_to_json(city: str, date: str, trails: List[Dict[str, Any]], 
-                      weather: Dict[str, Any], timestamp: str):
-        """Zapisuje rekomendacje do pliku JSON."""
+    @timed("export.json")
+    def _save_to_json(sections: List[Section], timestamp: str):
+        """Zapisuje rekomendacje wszystkich sekcji do jednego pliku JSON."""
         try:
+            generated_at = datetime.now().isoformat()
             data = {
                 "metadata": {
-                    "city": city,
-                    "date": date,
-                    "generated_at": datetime.now().isoformat()
+                    "cities": [city for city, _, _, _ in sections],
+                    "generated_at": generated_at
                 },
-                "weather": weather,
-                "trails": trails
+                "results": [
+                    {
+                        "metadata": {
+                            "city": city,
+                            "date": date,
+                            "generated_at": generated_at
+                        },
+                        "weather": weather,
+                        "trails": [dict(trail) for trail in trails]
+                    }
+                    for city, date, trails, weather in sections
+                ]
             }
             
             filename = f"recommendations_{timestamp}.json"
-            with open(filename, "w", encoding="utf-8") as f:
+            with open(filename, "x", encoding="utf-8") as f:
                 json.dump(data, f, ensure_ascii=False, indent=4)
                 
             print(f"Rekomendacje zostały zapisane do pliku {filename}")
@@ -94,12 +148,12 @@ class ResultExporter:
             print(f"Błąd podczas zapisywania do pliku JSON: {e}")
             
     @staticmethod
-    def _save_to_csv(city: str, date: str, trails: List[Dict[str, Any]], 
-                     weather: Dict[str, Any], timestamp: str):
-        """Zapisuje rekomendacje do pliku CSV."""
+    @timed("export.csv")
+    def _save_to_csv(sections: List[Section], timestamp: str):
+        """Zapisuje rekomendacje wszystkich sekcji do jednego pliku CSV."""
         try:
             filename = f"recommendations_{timestamp}.csv"
-            with open(filename, "w", newline='', encoding="utf-8") as f:
+            with open(filename, "x", newline='', encoding="utf-8") as f:
                 writer = csv.writer(f)
                 
                 # Zapisz nagłówki
@@ -108,21 +162,128 @@ class ResultExporter:
                 writer.writerow(headers)
                 
                 # Zapisz dane tras
-                for trail in trails:
-                    row = [
-                        trail.get('name', ''),
-                        trail.get('region', ''),
-                        trail.get('length_km', ''),
-                        f"{trail.get('difficulty', '')}/3",
-                        trail.get('terrain_type', ''),
-                        trail.get('category', '').upper(),
-                        f"{trail.get('comfort_index', '')}/100" if 'comfort_index' in trail else '',
-                        f"{trail.get('weighted_score', '')}/100" if 'weighted_score' in trail else '',
-                        f"{trail.get('estimated_time', '')}"
-                    ]
-                    writer.writerow(row)
+                for _, _, trails, _ in sections:
+                    for trail in trails:
+                        row = [
+                            trail.get('name', ''),
+                            trail.get('region', ''),
+                            trail.get('length_km', ''),
+                            f"{trail.get('difficulty', '')}/3",
+                            trail.get('terrain_type', ''),
+                            trail.get('category', '').upper(),
+                            f"{trail.get('comfort_index', '')}/100" if 'comfort_index' in trail else '',
+                            f"{trail.get('weighted_score', '')}/100" if 'weighted_score' in trail else '',
+                            f"{trail.get('estimated_time', '')}"
+                        ]
+                        writer.writerow(row)
                     
             print(f"Rekomendacje zostały zapisane do pliku {filename}")
             
         except Exception as e:
             print(f"Błąd podczas zapisywania do pliku CSV: {e}")
+
+
+class BackgroundExporter:
+    """
+    Eksport wyników w osobnym wątku, poza ścieżką obsługi zapytania.
+
+    submit() kopiuje wyniki i wstawia je do ograniczonej kolejki
+    (EXPORT_QUEUE_SIZE); gdy kolejka jest pełna, submit czeka na zwolnienie
+    miejsca. Sekcje zgłoszone wewnątrz `with exporter.run():` trafiają do
+    jednego, wspólnego zestawu plików. flush() czeka na zapis wszystkich
+    zgłoszonych wyników, a close() (wywoływane też przy wyjściu z programu)
+    dodatkowo zatrzymuje wątek.
+    """
+
+    _shared: Optional["BackgroundExporter"] = None
+    _shared_lock = threading.Lock()
+    _STOP = object()
+
+    def __init__(self, formats: Optional[Sequence[str]] = None,
+                 queue_size: int = EXPORT_QUEUE_SIZE):
+        self.formats = _validate_formats(EXPORT_FORMATS if formats is None else formats)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._run_sections: Optional[List[Section]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @classmethod
+    def shared(cls) -> "BackgroundExporter":
+        """Wspólna instancja używana domyślnie przez TrailRecommender."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.close)
+            return cls._shared
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="result-exporter", daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        while True:
+            sections = self._queue.get()
+            try:
+                if sections is self._STOP:
+                    return
+                ResultExporter.write_file_set(sections, self.formats)
+            except Exception as e:
+                print(f"Błąd podczas eksportu wyników: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, item):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Eksporter wyników został zamknięty")
+            self._ensure_thread()
+        self._queue.put(item)
+
+    def submit(self, city: str, date: str, trails: List[Dict[str, Any]],
+               weather: Optional[Dict[str, Any]] = None):
+        """
+        Zgłasza wyniki do eksportu.
+
+        Trasy są kopiowane od razu (późniejsze zmiany nie trafią do plików);
+        dla widoków wierszy TrailTable kopiowana jest tylko nakładka, a
+        rekordy budowane są dopiero w wątku eksportu.
+        """
+        snapshot = [trail.snapshot() if isinstance(trail, TrailRow) else dict(trail) for trail in trails]
+        section = (city, date, snapshot, dict(weather) if weather else weather)
+        with self._lock:
+            if self._run_sections is not None:
+                self._run_sections.append(section)
+                return
+        self._enqueue([section])
+
+    @contextmanager
+    def run(self):
+        """Wszystkie wyniki zgłoszone w bloku trafiają do jednego zestawu plików."""
+        with self._lock:
+            if self._run_sections is not None:
+                raise RuntimeError("Eksport zbiorczy jest już rozpoczęty")
+            self._run_sections = []
+        try:
+            yield self
+        finally:
+            with self._lock:
+                sections, self._run_sections = self._run_sections, None
+            if sections:
+                self._enqueue(sections)
+
+    def flush(self):
+        """Czeka, aż wszystkie zgłoszone wyniki zostaną zapisane."""
+        self._queue.join()
+
+    def close(self):
+        """Zapisuje oczekujące wyniki i zatrzymuje wątek eksportu."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
@@ -1,59 +1,135 @@
-from typing import List, Dict, Any, Callable, Optional
-from functools import reduce
+from typing import List, Dict, Any, Callable, Mapping, Optional, Union
+
+import numpy as np
+
+from data_handlers.trail_table import TrailTable, normalize_key, trail_regions
+
+
+class TrailCriteria:
+    """
+    Kryteria filtrowania szlaków (None oznacza brak ograniczenia).
+
+    compile() łączy wszystkie warunki w jeden predykat sprawdzany w jednym
+    przebiegu, a mask() zamienia je na wyrażenie na maskach NumPy dla TrailTable.
+    Region, typ terenu i kategoria są porównywane bez względu na wielkość liter;
+    trasa połączona z kilku regionów spełnia kryterium każdego z nich (pole regions).
+    """
+
+    def __init__(self,
+                 region: Optional[str] = None,
+                 min_length: Optional[float] = None,
+                 max_length: Optional[float] = None,
+                 difficulty: Optional[int] = None,
+                 terrain_type: Optional[str] = None,
+                 category: Optional[str] = None):
+        self.region = region
+        self.min_length = min_length
+        self.max_length = max_length
+        self.difficulty = difficulty
+        self.terrain_type = terrain_type
+        self.category = category
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in (self.region, self.min_length, self.max_length,
+                                               self.difficulty, self.terrain_type, self.category))
+
+    def compile(self) -> Callable[[Mapping[str, Any]], bool]:
+        """Zwraca jeden predykat sprawdzający wszystkie kryteria dla rekordu szlaku."""
+        region = normalize_key(self.region) if self.region is not None else None
+        terrain_type = normalize_key(self.terrain_type) if self.terrain_type is not None else None
+        category = normalize_key(self.category) if self.category is not None else None
+        min_length = self.min_length
+        max_length = self.max_length
+        difficulty = self.difficulty
+        check_length = min_length is not None or max_length is not None
+
+        def predicate(trail: Mapping[str, Any]) -> bool:
+            if difficulty is not None and trail.get('difficulty') != difficulty:
+                return False
+            if check_length:
+                length = trail.get('length_km') or 0
+                if min_length is not None and length < min_length:
+                    return False
+                if max_length is not None and length > max_length:
+                    return False
+            if region is not None and all(normalize_key(value) != region
+                                          for value in trail_regions(trail)):
+                return False
+            if terrain_type is not None and normalize_key(trail.get('terrain_type')) != terrain_type:
+                return False
+            if category is not None and normalize_key(trail.get('category')) != category:
+                return False
+            return True
+
+        return predicate
+
+    def mask(self, table: TrailTable) -> np.ndarray:
+        """Maska logiczna wierszy TrailTable spełniających kryteria."""
+        mask = np.ones(len(table), dtype=bool)
+        if self.difficulty is not None:
+            mask &= table.difficulty == self.difficulty
+        if self.min_length is not None or self.max_length is not None:
+            # Brak długości (NaN) liczony jak 0 km, tak jak w predykacie rekordów
+            length = np.where(np.isnan(table.length_km), 0.0, table.length_km)
+            if self.min_length is not None:
+                mask &= length >= self.min_length
+            if self.max_length is not None:
+                mask &= length <= self.max_length
+        if self.region is not None:
+            mask &= table.region_mask(self.region)
+        if self.terrain_type is not None:
+            mask &= table.terrain_type.mask_equal(self.terrain_type)
+        if self.category is not None:
+            mask &= table.category.mask_equal(self.category)
+        return mask
+
+    def apply(self, trails: Union[TrailTable, List[Mapping[str, Any]]]) -> List[Mapping[str, Any]]:
+        """Filtruje listę rekordów lub TrailTable (wynik: widoki wierszy) w jednym przebiegu."""
+        if isinstance(trails, TrailTable):
+            return trails.rows(np.flatnonzero(self.mask(trails)))
+        if self.is_empty():
+            return list(trails)
+        predicate = self.compile()
+        return [trail for trail in trails if predicate(trail)]
+
 
 class BaseFilter:
     """Bazowa klasa dla filtrów."""
-    
+
+    @staticmethod
+    def fuse(filters: List[Callable]) -> Callable[[Any], bool]:
+        """Łączy listę filtrów w jeden predykat (przerywa przy pierwszym niespełnionym)."""
+        def predicate(item: Any) -> bool:
+            for filter_func in filters:
+                if not filter_func(item):
+                    return False
+            return True
+        return predicate
+
     @staticmethod
     def apply_filters(items: List[Dict[str, Any]], 
                      filters: List[Callable]) -> List[Dict[str, Any]]:
-        """Aplikuje listę filtrów do listy elementów."""
-        return reduce(
-            lambda items, filter_func: list(filter(filter_func, items)),
-            filters,
-            items
-        )
+        """Aplikuje listę filtrów do listy elementów w jednym przebiegu."""
+        if not filters:
+            return list(items)
+        predicate = BaseFilter.fuse(filters)
+        return [item for item in items if predicate(item)]
 
 class TrailsFilter(BaseFilter):
     """Klasa do filtrowania szlaków turystycznych."""
 
     @classmethod
     def filter_by_criteria(cls,
-                         trails: List[Dict[str, Any]],
+                         trails: Union[TrailTable, List[Dict[str, Any]]],
                          region: Optional[str] = None,
                          min_length: Optional[float] = None,
                          max_length: Optional[float] = None,
                          difficulty: Optional[int] = None,
                          terrain_type: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Filtruje szlaki na podstawie wielu kryteriów używając programowania funkcyjnego."""
-        filter_functions = []
-        
-        if region:
-            filter_functions.append(
-                lambda trail: trail['region'].lower() == region.lower()
-            )
-            
-        if min_length is not None:
-            filter_functions.append(
-                lambda trail: trail['length_km'] >= min_length
-            )
-            
-        if max_length is not None:
-            filter_functions.append(
-                lambda trail: trail['length_km'] <= max_length
-            )
-            
-        if difficulty is not None:
-            filter_functions.append(
-                lambda trail: trail['difficulty'] == difficulty
-            )
-            
-        if terrain_type is not None:
-            filter_functions.append(
-                lambda trail: trail.get('terrain_type', '').lower() == terrain_type.lower()
-            )
-            
-        return cls.apply_filters(trails, filter_functions)
+        """Filtruje szlaki na podstawie wielu kryteriów (skompilowany predykat lub maska NumPy)."""
+        criteria = TrailCriteria(region=region or None, min_length=min_length, max_length=max_length,
+                                 difficulty=difficulty, terrain_type=terrain_type)
+        return criteria.apply(trails)
     
     @classmethod
     def filter_by_weather(cls,
@@ -86,4 +162,7 @@ class TrailsFilter(BaseFilter):
                 lambda _: weather.get('sunshine_hours', 0) >= min_sunshine
             )
             
-        return cls.apply_filters(trails, filter_functions)
\ No newline at end of file
+        # Warunki zależą tylko od pogody, więc wystarczy sprawdzić je raz dla wszystkich tras
+        if not BaseFilter.fuse(filter_functions)(None):
+            return []
+        return list(trails)
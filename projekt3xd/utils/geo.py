@@ -0,0 +1,19 @@
+import numpy as np
+
+# Średni promień Ziemi w kilometrach
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Odległość po kole wielkim (w km) między punktami podanymi w stopniach.
+
+    Argumenty mogą być liczbami lub tablicami NumPy (z rozgłaszaniem),
+    więc wszystkie odcinki liczone są w jednym wektorowym wywołaniu.
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,171 @@
+import functools
+import json
+import re
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional
+
+from config import VERBOSITY
+
+# Poziom szczegółowości, od którego wypisywane są komunikaty o każdej trasie
+VERBOSE_DETAILS = 2
+# Prefiks nazw metryk w formacie Prometheus
+METRIC_PREFIX = "p3xd"
+PROFILE_FORMATS = ("json", "prometheus")
+
+_verbosity = VERBOSITY
+# Wspólny, pusty kontekst zwracany przez span(), gdy pomiary są wyłączone
+_NULL_SPAN = nullcontext()
+
+
+def set_verbosity(level: int) -> None:
+    global _verbosity
+    _verbosity = level
+
+
+def is_verbose(level: int = VERBOSE_DETAILS) -> bool:
+    """True, gdy ustawiony poziom szczegółowości komunikatów jest co najmniej `level`."""
+    return _verbosity >= level
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Profiler:
+    """
+    Zbiera czasy nazwanych etapów (liczba wywołań, suma, maksimum).
+
+    Nazwy etapów są kropkowane według źródła (np. "overpass.fetch",
+    "recommend.score"). Etapy mogą być zagnieżdżone - czas etapu
+    wewnętrznego wlicza się też do etapu zewnętrznego. Pomiary z wielu
+    wątków (eksport w tle, pula usługi HTTP) są sumowane pod blokadą.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+        self._started: Optional[float] = None
+
+    def enable(self) -> None:
+        self._started = time.perf_counter()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+        self._started = time.perf_counter() if self.enabled else None
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                self._stages[name] = [1, seconds, seconds]
+            else:
+                stage[0] += 1
+                stage[1] += seconds
+                if seconds > stage[2]:
+                    stage[2] = seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Etap -> {count, total_seconds, max_seconds}, od najdłuższego łącznie."""
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: item[1][1], reverse=True)
+            return {name: {"count": count, "total_seconds": total, "max_seconds": longest}
+                    for name, (count, total, longest) in stages}
+
+    def wall_seconds(self) -> float:
+        return time.perf_counter() - self._started if self._started is not None else 0.0
+
+    def report(self) -> str:
+        """Czytelne podsumowanie: czas łączny, średni i maksymalny każdego etapu oraz udział w czasie pracy."""
+        wall = self.wall_seconds()
+        lines = [f"=== Profil wykonania ({wall:.3f} s; etapy zagnieżdżone wliczają się do nadrzędnych) ===",
+                 f"{'etap':<28} {'wywołań':>8} {'łącznie ms':>12} {'średnio ms':>11} {'maks. ms':>10} {'udział':>7}"]
+        for name, stage in self.stats().items():
+            total, count = stage["total_seconds"], stage["count"]
+            share = f"{total / wall * 100:6.1f}%" if wall > 0 else "      -"
+            lines.append(f"{name:<28} {count:8d} {total * 1000:12.2f} {total / count * 1000:11.3f} "
+                         f"{stage['max_seconds'] * 1000:10.2f} {share}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps({"wall_seconds": self.wall_seconds(), "stages": self.stats()},
+                          ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Metryki w formacie tekstowym Prometheus (summary: _sum/_count oraz maksimum jako gauge)."""
+        stats = self.stats()
+        lines = [f"# HELP {METRIC_PREFIX}_stage_seconds Czas trwania etapów przetwarzania",
+                 f"# TYPE {METRIC_PREFIX}_stage_seconds summary"]
+        for name, stage in stats.items():
+            label = _escape_label(name)
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{label}"}} {stage["total_seconds"]:.9f}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{label}"}} {stage["count"]}')
+        lines += [f"# HELP {METRIC_PREFIX}_stage_max_seconds Najdłuższe pojedyncze wykonanie etapu",
+                  f"# TYPE {METRIC_PREFIX}_stage_max_seconds gauge"]
+        for name, stage in stats.items():
+            lines.append(f'{METRIC_PREFIX}_stage_max_seconds{{stage="{_escape_label(name)}"}} '
+                         f'{stage["max_seconds"]:.9f}')
+        lines += [f"# HELP {METRIC_PREFIX}_wall_seconds Czas pracy od włączenia pomiarów",
+                  f"# TYPE {METRIC_PREFIX}_wall_seconds gauge",
+                  f"{METRIC_PREFIX}_wall_seconds {self.wall_seconds():.9f}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: Optional[str] = None) -> None:
+        """Zapisuje metryki do pliku; bez `fmt` format wynika z rozszerzenia (.json lub Prometheus)."""
+        fmt = fmt or ("json" if path.lower().endswith(".json") else "prometheus")
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"Nieznany format metryk: {fmt}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json() if fmt == "json" else self.to_prometheus())
+
+
+def _escape_label(value: str) -> str:
+    return re.sub(r'(["\\])', r'\\\1', value).replace("\n", "\\n")
+
+
+# Wspólny profiler procesu (włączany przez main.py --profile)
+PROFILER = Profiler()
+
+
+def span(name: str):
+    """
+    Kontekst mierzący czas etapu `name`.
+
+    Przy wyłączonym profilerze zwraca wspólny pusty kontekst, więc koszt
+    to jedno sprawdzenie flagi.
+    """
+    if not PROFILER.enabled:
+        return _NULL_SPAN
+    return _Span(PROFILER, name)
+
+
+def timed(name: str) -> Callable:
+    """Dekorator mierzący czas każdego wywołania funkcji jako etap `name`."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any):
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+            with _Span(PROFILER, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
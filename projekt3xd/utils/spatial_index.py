@@ -0,0 +1,171 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from config import SPATIAL_INDEX_CELL_KM
+from utils.geo import EARTH_RADIUS_KM, haversine_km
+
+# Długość jednego stopnia szerokości geograficznej (km) i połowa obwodu Ziemi
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+# Margines (w stopniach) poszerzający wybór komórek - punkty na granicy obszaru nie mogą
+# wypaść przez błąd zaokrąglenia
+_MARGIN_DEGREES = 1e-7
+
+
+class SpatialIndex:
+    """
+    Indeks przestrzenny punktów (lat, lon) oparty na siatce komórek.
+
+    Komórki siatki mają bok `cell_km` kilometrów wzdłuż południka (tyle samo
+    stopni w obu kierunkach), a punkty są posortowane po numerze komórki.
+    Komórki jednego wiersza siatki leżą obok siebie, więc zakres komórek
+    w wierszu to jeden ciągły wycinek tablicy znaleziony przez searchsorted.
+    Kandydaci z wybranych komórek są sprawdzani wektorowo (haversine albo
+    porównanie współrzędnych). Punkty bez współrzędnych (NaN) są pomijane.
+
+    Wyniki to pozycje punktów w tablicach przekazanych do konstruktora.
+    """
+
+    def __init__(self, lat, lon, cell_km: float = SPATIAL_INDEX_CELL_KM):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.size = len(lat)
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._rows = int(math.ceil(180 / self.cell_deg))
+        self._columns = int(math.ceil(360 / self.cell_deg))
+
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        cells = self._row(lat[valid]) * self._columns + self._column(lon[valid])
+        order = np.argsort(cells, kind='stable')
+        self._cells = cells[order]
+        self._positions = valid[order]
+        # Współrzędne w kolejności komórek - kandydaci są czytani ciągłymi wycinkami
+        self._lat = lat[self._positions]
+        self._lon = lon[self._positions]
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _row(self, lat: np.ndarray) -> np.ndarray:
+        rows = np.floor((lat + 90) / self.cell_deg).astype(np.int64)
+        return np.clip(rows, 0, self._rows - 1)
+
+    def _column(self, lon: np.ndarray) -> np.ndarray:
+        columns = np.floor(np.mod(lon + 180, 360) / self.cell_deg).astype(np.int64)
+        return np.clip(columns, 0, self._columns - 1)
+
+    # Wersje dla pojedynczego punktu zapytania - bez narzutu wywołań NumPy na skalarach
+    def _row_of(self, lat: float) -> int:
+        return min(max(math.floor((lat + 90) / self.cell_deg), 0), self._rows - 1)
+
+    def _column_of(self, lon: float) -> int:
+        return min(max(math.floor(((lon + 180) % 360) / self.cell_deg), 0), self._columns - 1)
+
+    def _column_ranges(self, min_lon: float, max_lon: float) -> List[Tuple[int, int]]:
+        """Zakresy kolumn (włącznie) dla przedziału długości; przez antypołudnik - dwa zakresy."""
+        if max_lon - min_lon >= 360:
+            return [(0, self._columns - 1)]
+        start = (min_lon + 180) % 360
+        end = start + (max_lon - min_lon)
+        if end < 360:
+            return [(self._column_of(start - 180), self._column_of(end - 180))]
+        first = self._column_of(start - 180)
+        last = self._column_of(end - 360 - 180)
+        if last >= first:
+            # Oba końce w tej samej (lub dalszej) kolumnie - osobne zakresy zdublowałyby punkty
+            return [(0, self._columns - 1)]
+        return [(first, self._columns - 1), (0, last)]
+
+    def _candidates(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        """Indeksy (w kolejności komórek) punktów z komórek pokrywających prostokąt."""
+        rows = np.arange(self._row_of(min_lat), self._row_of(max_lat) + 1, dtype=np.int64)
+        starts, ends = [], []
+        for first, last in self._column_ranges(min_lon, max_lon):
+            starts.append(np.searchsorted(self._cells, rows * self._columns + first, 'left'))
+            ends.append(np.searchsorted(self._cells, rows * self._columns + last, 'right'))
+        starts = np.concatenate(starts)
+        lengths = np.concatenate(ends) - starts
+        # Sklejenie wycinków bez pętli: kolejne indeksy + przesunięcie początku wycinka
+        offsets = np.cumsum(lengths) - lengths
+        return np.arange(int(lengths.sum()), dtype=np.int64) + np.repeat(starts - offsets, lengths)
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Punkty w odległości co najwyżej radius_km od (lat, lon).
+
+        Returns:
+            (pozycje rosnąco, odległości w km)
+        """
+        if radius_km < 0 or not len(self._positions):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        angle = radius_km / EARTH_RADIUS_KM
+        delta_lat = math.degrees(angle) + _MARGIN_DEGREES
+        min_lat, max_lat = lat - delta_lat, lat + delta_lat
+        cos_lat = math.cos(math.radians(lat))
+        if angle >= math.pi or min_lat <= -90 or max_lat >= 90 or math.sin(angle) >= cos_lat:
+            # Koło obejmuje biegun - wszystkie długości geograficzne
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            # Dokładny zakres długości dla czaszy kulistej o promieniu kątowym `angle`
+            delta_lon = math.degrees(math.asin(math.sin(angle) / cos_lat)) + _MARGIN_DEGREES
+            min_lon, max_lon = lon - delta_lon, lon + delta_lon
+
+        candidates = self._candidates(max(min_lat, -90.0), min(max_lat, 90.0), min_lon, max_lon)
+        distances = haversine_km(lat, lon, self._lat[candidates], self._lon[candidates])
+        inside = distances <= radius_km
+        positions = self._positions[candidates[inside]]
+        order = np.argsort(positions, kind='stable')
+        return positions[order], distances[inside][order]
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """
+        Pozycje (rosnąco) punktów w prostokącie współrzędnych (granice włącznie).
+
+        Gdy min_lon > max_lon, prostokąt przechodzi przez antypołudnik.
+        """
+        if min_lat > max_lat or not len(self._positions):
+            return np.empty(0, dtype=np.int64)
+        crosses = min_lon > max_lon
+        candidates = self._candidates(min_lat, max_lat, min_lon, max_lon + 360 if crosses else max_lon)
+        lat = self._lat[candidates]
+        lon = self._lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat)
+        if crosses:
+            inside &= (lon >= min_lon) | (lon <= max_lon)
+        else:
+            inside &= (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(self._positions[candidates[inside]])
+
+    def nearest(self, lat: float, lon: float, k: int,
+                max_radius_km: float = HALF_CIRCUMFERENCE_KM) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k punktów najbliższych (lat, lon), nie dalszych niż max_radius_km.
+
+        Początkowy promień wynika z gęstości punktów w komórce środka (tak,
+        by zmieściło się w nim około k punktów) i jest podwajany, aż w kole
+        znajdzie się co najmniej k punktów - punkty spoza koła są dalej niż
+        każdy w środku.
+
+        Returns:
+            (pozycje, odległości w km) od najbliższego; remisy według pozycji
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        cell = self._row_of(lat) * self._columns + self._column_of(lon)
+        in_cell = int(np.searchsorted(self._cells, cell, 'right') - np.searchsorted(self._cells, cell, 'left'))
+        radius = self.cell_km
+        if in_cell > k:
+            # Komórka o boku cell_km (wschód-zachód: cell_km * cos(lat)) z in_cell punktami
+            area = self.cell_km ** 2 * max(math.cos(math.radians(lat)), 1e-6)
+            radius = 1.5 * math.sqrt(k * area / (math.pi * in_cell))
+        radius = min(radius, max_radius_km)
+        while True:
+            positions, distances = self.within_radius(lat, lon, radius)
+            if len(positions) >= k or radius >= min(max_radius_km, HALF_CIRCUMFERENCE_KM):
+                break
+            radius = min(radius * 2, max_radius_km)
+        order = np.lexsort((positions, distances))[:k]
+        return positions[order], distances[order]
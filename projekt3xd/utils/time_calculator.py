@@ -4,6 +4,9 @@ class TimeCalculator:
     """
     Klasa do obliczania szacowanego czasu przejścia trasy.
     """
+
+    # Wersja reguł - zmiana mnożników wymaga zwiększenia wersji, żeby zapisane czasy zostały przeliczone
+    RULES_VERSION = 1
     
     @staticmethod
     def calculate_time(trail: Dict[str, Any]) -> float:
@@ -36,9 +39,9 @@ class TimeCalculator:
             'mixed': 0.8        # Teren mieszany - 80% normalnego tempa
         }
         
-        difficulty = trail.get('difficulty', 1)
-        terrain_type = trail.get('terrain_type', 'mixed').lower()
-        length = trail.get('length_km', 0)
+        difficulty = trail.get('difficulty') or 1
+        terrain_type = (trail.get('terrain_type') or 'mixed').lower()
+        length = trail.get('length_km') or 0
         
         # Oblicz efektywną prędkość
         effective_speed = (base_speed * 
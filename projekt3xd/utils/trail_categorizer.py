@@ -0,0 +1,61 @@
+from typing import Dict, Any
+
+
+class TrailCategorizer:
+    """
+    Klasa do przypisywania tras do kategorii (rodzinna, widokowa, sportowa, ekstremalna).
+    """
+
+    # Wersja reguł - zmiana reguł wymaga zwiększenia wersji, żeby zapisane kategorie zostały przeliczone
+    RULES_VERSION = 1
+
+    @staticmethod
+    def categorize(trail: Dict[str, Any]) -> str:
+        """
+        Kategoryzuje trasę na podstawie jej charakterystyki.
+        
+        Kryteria:
+        - rodzinna: łatwe (trudność 1), krótkie trasy (<5km), małe przewyższenie (<200m)
+        - widokowa: punkty widokowe, trasy turystyczne ze sceneriami
+        - sportowa: średnie/długie trasy (5-15km), średnia trudność
+        - ekstremalna: trudne trasy, duże przewyższenie, długie dystanse
+        """
+        difficulty = trail.get('difficulty') or 1
+        length = trail.get('length_km') or 0
+        elevation = trail.get('elevation_m') or 0
+        tags = trail.get('tags') or []
+        description = str(trail.get('description', '')).lower()
+        
+        # Zaczynamy od sprawdzenia trasy rodzinnej (najprostsze kryteria)
+        if difficulty == 1 and length < 5 and elevation < 200:
+            if (any(tag in ['leisure', 'park', 'playground', 'family'] for tag in tags) or
+                any(keyword in description for keyword in ['rodzin', 'łatw', 'spokojna', 'dziec'])):
+                return "rodzinna"
+            
+        # Następnie sprawdzamy trasę widokową
+        if (length < 15 and  # Trasy widokowe zazwyczaj nie są zbyt długie
+            (any(tag in ['viewpoint', 'scenic', 'tourism', 'view_point', 'panorama'] for tag in tags) or
+             any(keyword in description for keyword in ['widok', 'panoram', 'scenic', 'krajobraz', 'punkt widokowy']))):
+            return "widokowa"
+            
+        # Sprawdzamy trasę ekstremalną
+        if (difficulty == 3 or length > 15 or elevation > 800 or
+            any(tag in ['climbing', 'alpine', 'via_ferrata', 'extreme'] for tag in tags) or
+            any(keyword in description for keyword in ['ekstre', 'trudna', 'wymagając', 'alpejsk'])):
+            return "ekstremalna"
+            
+        # Jeśli trasa ma średnią trudność i długość, klasyfikujemy jako sportową
+        if ((difficulty == 2 and 5 <= length <= 15) or
+            any(keyword in description for keyword in ['sport', 'aktyw', 'kondycyj', 'wysiłk'])):
+            return "sportowa"
+            
+        # Jeśli nie pasuje do żadnej kategorii, przypisujemy na podstawie długości i trudności
+        if length < 5:
+            return "rodzinna"
+        elif length > 15 or difficulty == 3:
+            return "ekstremalna"
+        elif difficulty == 2 or 5 <= length <= 15:
+            return "sportowa"
+        else:
+            # Jeśli naprawdę nie możemy określić, dajemy widokową jako najbezpieczniejszą opcję
+            return "widokowa"
@@ -1,5 +1,7 @@
 from typing import List, Dict, Any
 
+from utils.filters import TrailCriteria
+
 class TrailFilter:
     @staticmethod
     def filter_trails(
@@ -12,7 +14,7 @@ class TrailFilter:
         Filtruje szlaki na podstawie podanych kryteriów.
         
         Args:
-            trails: Lista słowników z danymi o szlakach
+            trails: Lista słowników z danymi o szlakach lub TrailTable
             min_length: Minimalna długość szlaku w km
             max_length: Maksymalna długość szlaku w km
             difficulty: Wymagany poziom trudności (1-3)
@@ -20,19 +22,9 @@ class TrailFilter:
         Returns:
             Lista przefiltrowanych szlaków
         """
-        filtered = trails
-
-        # Filtrowanie po długości
-        filtered = [
-            trail for trail in filtered
-            if min_length <= trail.get('length_km', 0) <= max_length
-        ]
-
-        # Filtrowanie po trudności jeśli określona
-        if difficulty is not None:
-            filtered = [
-                trail for trail in filtered
-                if trail.get('difficulty') == difficulty
-            ]
-
-        return filtered 
\ No newline at end of file
+        criteria = TrailCriteria(
+            min_length=min_length,
+            max_length=None if max_length == float('inf') else max_length,
+            difficulty=difficulty
+        )
+        return criteria.apply(trails)
@@ -1,6 +1,10 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
+from utils.array_utils import round_like_builtin
+
 class WeatherUtils:
     """Klasa narzędzi do przetwarzania danych pogodowych."""
 
@@ -127,4 +131,86 @@ class WeatherUtils:
             cloud_score * 0.25  # Zachmurzenie ma najmniejszy wpływ
         )
             
-        return round(comfort_index, 1)
\ No newline at end of file
+        return round(comfort_index, 1)
+
+    @staticmethod
+    def comfort_inputs(weather_data: Dict[str, Any]) -> Tuple[float, float, float]:
+        """
+        Zwraca (temperatura, opady, zachmurzenie) odczytane z danych pogodowych
+        w taki sam sposób jak w calculate_hiking_comfort.
+        """
+        temp_min = weather_data.get('temperature_min')
+        temp_max = weather_data.get('temperature_max')
+        if temp_min is not None and temp_max is not None:
+            temp = (temp_min + temp_max) / 2
+        else:
+            temp = weather_data.get('temperature', 20)
+        return temp, weather_data.get('precipitation', 0), weather_data.get('cloud_cover', 50)
+
+    @staticmethod
+    def weather_rejection(weather_data: Optional[Dict[str, Any]],
+                          min_sunshine: Optional[float] = None,
+                          max_precipitation: Optional[float] = None,
+                          min_temperature: Optional[float] = None,
+                          max_temperature: Optional[float] = None) -> Optional[str]:
+        """
+        Powód odrzucenia dnia przez kryteria pogodowe (None - dzień spełnia kryteria).
+
+        Temperatura i opady są odczytywane jak w comfort_inputs. Bez danych
+        pogodowych dzień jest odrzucany tylko wtedy, gdy podano jakieś kryterium.
+        """
+        limits = (min_sunshine, max_precipitation, min_temperature, max_temperature)
+        if all(limit is None for limit in limits):
+            return None
+        if not weather_data:
+            return "brak danych pogodowych"
+        temperature, precipitation, _ = WeatherUtils.comfort_inputs(weather_data)
+        sunshine = weather_data.get('sunshine_hours')
+        checks = (
+            (min_sunshine, sunshine, lambda value: value >= min_sunshine, "za mało słońca"),
+            (max_precipitation, precipitation, lambda value: value <= max_precipitation, "za duże opady"),
+            (min_temperature, temperature, lambda value: value >= min_temperature, "za zimno"),
+            (max_temperature, temperature, lambda value: value <= max_temperature, "za ciepło"),
+        )
+        for limit, value, check, reason in checks:
+            if limit is None:
+                continue
+            if value is None:
+                return "brak danych pogodowych do sprawdzenia kryteriów"
+            if not check(value):
+                return reason
+        return None
+
+    @staticmethod
+    def calculate_hiking_comfort_batch(temperature, precipitation, cloud_cover) -> np.ndarray:
+        """
+        Wektorowa wersja calculate_hiking_comfort dla tablic warunków pogodowych.
+
+        Argumenty są rozgłaszane (broadcasting), więc można podać np. temperatury
+        o kształcie (dni, 1) i poprawki wysokościowe o kształcie (1, trasy).
+        Wyniki są identyczne z wersją skalarną, łącznie z zaokrągleniem.
+        """
+        temp = np.asarray(temperature, dtype=np.float64)
+        precip = np.asarray(precipitation, dtype=np.float64)
+        cloud = np.asarray(cloud_cover, dtype=np.float64)
+
+        # Gałęzie jak w wersji skalarnej; NaN trafia do ostatniej gałęzi, a fmax
+        # (zamiast maximum) daje 0 tak jak max(0, nan) w Pythonie
+        temp_score = np.where(
+            temp < 15, 100 - (15 - temp) * 15,
+            np.where(temp <= 18, 100.0, 100 - (temp - 18) * 18)
+        )
+        np.fmax(temp_score, 0, out=temp_score)
+        precip_score = np.fmax(0, 100 - (precip * 40))
+        cloud_score = np.select(
+            [cloud < 20, (cloud >= 20) & (cloud <= 40), cloud < 60],
+            [80.0, 100.0, 60.0],
+            np.fmax(0, 100 - ((cloud - 60) * 2))
+        )
+
+        comfort_index = (
+            temp_score * 0.4 +
+            precip_score * 0.35 +
+            cloud_score * 0.25
+        )
+        return round_like_builtin(comfort_index, 1)
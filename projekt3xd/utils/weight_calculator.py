@@ -1,4 +1,22 @@
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from data_handlers.trail_table import TrailTable
+from utils.array_utils import round_like_builtin
+
+# Punkty za typ terenu (pozostałe typy: TERRAIN_DEFAULT_SCORE)
+TERRAIN_SCORES = {
+    'górski': 90,    # Trasy górskie
+    'leśny': 85,     # Trasy leśne
+    'nizinny': 80,   # Trasy nizinne
+    'miejski': 70    # Trasy miejskie
+}
+TERRAIN_DEFAULT_SCORE = 75
+
+# Wagi domyślne (równe) - używane, gdy zapytanie nie podaje własnych wag
+DEFAULT_WEIGHTS = {'trudność': 0.25, 'długość': 0.25, 'pogoda': 0.25, 'teren': 0.25}
 
 class WeightCalculator:
     """
@@ -6,12 +24,9 @@ class WeightCalculator:
     """
     
     def __init__(self):
-        self.weights = {
-            'trudność': 0.0,
-            'długość': 0.0,
-            'pogoda': 0.0,
-            'teren': 0.0
-        }
+        # Poprawne wagi od początku (suma 1.0) - set_weights(self.weights) zawsze się powiedzie
+        self.weights = dict(DEFAULT_WEIGHTS)
+
     def get_weights_from_user(self) -> Dict[str, float]:
         """
         Pobiera wagi od użytkownika dla różnych kryteriów.
@@ -50,6 +65,26 @@ class WeightCalculator:
                     print("Podaj poprawną liczbę dziesiętną")
         
         return self.weights
+
+    def set_weights(self, weights: Mapping[str, float]) -> Dict[str, float]:
+        """
+        Ustawia wagi bez pytania użytkownika (np. dla zapytań wsadowych).
+
+        Brakujące kryteria dostają wagę 0.0. Wagi muszą być skończonymi
+        liczbami nieujemnymi, a ich suma musi wynosić 1.0.
+        """
+        unknown = set(weights) - set(self.weights)
+        if unknown:
+            raise ValueError(f"Nieznane kryteria wag: {', '.join(sorted(unknown))}")
+        values = {criterion: float(weights.get(criterion, 0.0)) for criterion in self.weights}
+        if not all(math.isfinite(weight) for weight in values.values()):
+            raise ValueError("Wagi muszą być skończonymi liczbami")
+        if any(weight < 0 for weight in values.values()):
+            raise ValueError("Wagi nie mogą być ujemne")
+        if abs(sum(values.values()) - 1.0) > 0.01:
+            raise ValueError("Suma wag musi wynosić 1.0")
+        self.weights.update(values)
+        return self.weights
     
     def calculate_weighted_score(self, trail: Dict[str, Any], weather: Dict[str, Any]) -> float:
         """
@@ -81,23 +116,136 @@ class WeightCalculator:
         
         # Składnik terenu (bonus dla preferowanego typu)
         if self.weights['teren'] > 0:
-            terrain_scores = {
-                'górski': 90,    # Trasy górskie
-                'leśny': 85,     # Trasy leśne
-                'nizinny': 80,   # Trasy nizinne
-                'miejski': 70    # Trasy miejskie
-            }
             terrain_type = trail.get('terrain_type', '').lower()
-            terrain_score = terrain_scores.get(terrain_type, 75)  # Domyślnie 75 dla innych typów
+            terrain_score = TERRAIN_SCORES.get(terrain_type, TERRAIN_DEFAULT_SCORE)  # Domyślnie 75 dla innych typów
             score += terrain_score * self.weights['teren']
             
         return round(score, 2)
     
+    def calculate_weighted_scores(self, difficulty, length_km, terrain_score,
+                                  comfort_index=None) -> np.ndarray:
+        """
+        Wektorowa wersja calculate_weighted_score dla tablic cech tras.
+
+        terrain_score to punkty za teren (TERRAIN_SCORES), comfort_index może
+        zawierać NaN dla tras bez indeksu komfortu. Składniki są dodawane
+        w tej samej kolejności co w wersji skalarnej, więc wyniki są identyczne.
+        comfort_index może mieć więcej wymiarów niż cechy tras (np. macierz
+        dni x trasy) - wynik ma wtedy jego kształt.
+        """
+        difficulty = np.asarray(difficulty, dtype=np.float64)
+        length = np.asarray(length_km, dtype=np.float64)
+        # Brak wartości w TrailTable (trudność -1, długość NaN) - domyślne 1 i 0 jak w wersji skalarnej
+        difficulty = np.where(difficulty < 0, 1.0, difficulty)
+        length = np.where(np.isnan(length), 0.0, length)
+        score = np.zeros(difficulty.shape)
+
+        if self.weights['trudność'] > 0:
+            score += (4 - difficulty) * 33.33 * self.weights['trudność']
+
+        if self.weights['długość'] > 0:
+            length_score = np.select([length < 5, length <= 15, length <= 25], [70.0, 100.0, 80.0], 60.0)
+            score += length_score * self.weights['długość']
+
+        if self.weights['pogoda'] > 0 and comfort_index is not None:
+            comfort = np.asarray(comfort_index, dtype=np.float64)
+            # Dodanie 0.0 nie zmienia wyniku, więc trasy bez indeksu zachowują się jak w wersji skalarnej;
+            # bez += wynik przyjmuje kształt macierzy komfortu (rozgłaszanie)
+            score = score + np.where(np.isnan(comfort), 0.0, comfort * self.weights['pogoda'])
+
+        if self.weights['teren'] > 0:
+            score += np.asarray(terrain_score, dtype=np.float64) * self.weights['teren']
+
+        return round_like_builtin(score, 2)
+
+    def score_trails(self, trails: Union[TrailTable, Sequence[Mapping[str, Any]]],
+                     comfort_index: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        Oblicza tablicę ważonych wyników dla listy tras lub całej TrailTable.
+
+        Dla TrailTable cechy są czytane bezpośrednio z kolumn (bez tworzenia
+        rekordów), a indeks komfortu trzeba podać jako tablicę.
+        """
+        if isinstance(trails, TrailTable):
+            return self.calculate_weighted_scores(trails.difficulty, trails.length_km,
+                                                  self.terrain_scores(trails), comfort_index)
+
+        if comfort_index is None:
+            comfort_index = [trail.get('comfort_index', np.nan) for trail in trails]
+        return self.calculate_weighted_scores(
+            [trail.get('difficulty', 1) for trail in trails],
+            [trail.get('length_km', 0) for trail in trails],
+            [TERRAIN_SCORES.get(trail.get('terrain_type', '').lower(), TERRAIN_DEFAULT_SCORE)
+             for trail in trails],
+            comfort_index
+        )
+
+    @staticmethod
+    def terrain_scores(table: TrailTable) -> np.ndarray:
+        """Punkty za teren (TERRAIN_SCORES) dla każdego wiersza TrailTable."""
+        category_scores = np.array(
+            [TERRAIN_SCORES.get(str(terrain).lower(), TERRAIN_DEFAULT_SCORE)
+             for terrain in table.terrain_type.categories] + [TERRAIN_DEFAULT_SCORE],
+            dtype=np.float64
+        )
+        # Kod -1 (brak typu terenu) wskazuje na ostatni element - wartość domyślną
+        return category_scores[table.terrain_type.codes]
+
+    @staticmethod
+    def top_positions(scores: np.ndarray, offset: int = 0, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Pozycje tras z wynikami malejąco, strona [offset, offset + limit).
+
+        Remisy są rozstrzygane deterministycznie: wcześniejsza pozycja na
+        liście wejściowej wygrywa (tak jak przy stabilnym sortowaniu). Przy
+        ograniczonym limicie używane jest argpartition, więc koszt to O(n)
+        wyboru plus O(K log K) sortowania K = offset + limit najlepszych.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        offset = max(0, offset)
+        needed = len(scores) if limit is None else min(len(scores), offset + max(0, limit))
+        if needed <= offset:
+            return np.empty(0, dtype=np.int64)
+
+        if needed < len(scores):
+            # Próg = K-ty największy wynik; wszystkie większe wyniki wchodzą na pewno,
+            # a spośród równych progowi - te o najmniejszych pozycjach
+            threshold = -np.partition(-scores, needed - 1)[needed - 1]
+            above = np.flatnonzero(scores > threshold)
+            ties = np.flatnonzero(scores == threshold)[:needed - len(above)]
+            selected = np.concatenate((above, ties))
+        else:
+            selected = np.arange(len(scores))
+
+        order = np.lexsort((selected, -scores[selected]))
+        return selected[order][offset:needed]
+
+    def rank_trails(self, trails: Union[TrailTable, Sequence[Mapping[str, Any]]],
+                    weather: Optional[Dict[str, Any]] = None,
+                    offset: int = 0, limit: Optional[int] = 20,
+                    comfort_index: Optional[Sequence[float]] = None) -> List[Mapping[str, Any]]:
+        """
+        Zwraca stronę najlepszych tras (offset/limit) według ważonego wyniku.
+
+        Wyniki liczone są wektorowo, a weighted_score jest zapisywany tylko
+        w zwróconych trasach (dla TrailTable - w widokach wierszy).
+        """
+        scores = self.score_trails(trails, comfort_index)
+        positions = self.top_positions(scores, offset, limit).tolist()
+        if isinstance(trails, TrailTable):
+            page = trails.rows(positions)
+        else:
+            page = [trails[position] for position in positions]
+        for trail, position in zip(page, positions):
+            trail['weighted_score'] = float(scores[position])
+        return page
+
     def sort_trails_by_weights(self, trails: List[Dict[str, Any]], weather: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Sortuje trasy według ich ważonych wyników.
         """
-        for trail in trails:
-            trail['weighted_score'] = self.calculate_weighted_score(trail, weather)
-            
-        return sorted(trails, key=lambda x: x.get('weighted_score', 0), reverse=True)
+        scores = self.score_trails(trails)
+        for trail, score in zip(trails, scores.tolist()):
+            trail['weighted_score'] = score
+
+        return [trails[position] for position in self.top_positions(scores).tolist()]